@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# scripts/backfill.py
+"""
+Bulk-load recorded readings into the SCGDI history (src/backfill.py).
+
+Sources (one or more files, auto-detected):
+- JSONL, one MQTT message per line: {"topic": "scgdi/motor/electrical", "payload": {...}}
+  or a bare payload (electrical / environment / vibration, current or legacy
+  format; --asset tells which motor when the fleet has more than one);
+- another scgdi_history.sqlite at the current schema (run migrate_db.py on a copy first).
+
+Payloads are validated with src/model.py, sorted, de-duplicated against what the
+history already holds (re-loading a file is a no-op) and written in large
+transactions (--block samples each), raw samples and rollups.
+
+Two modes:
+- direct (default): writes into --db / DB_PATH through Storage. Use it while the
+  server is stopped; a running server would not see the new samples in its
+  in-memory recent history. The newest loaded value of each variable also goes
+  to the warm-start snapshot (last_value) when it is newer than the saved one.
+- --endpoint: asks the running server to load the files itself (OPC UA method
+  Backfill). Paths are as seen by the server, relative to its BACKFILL_DIR. The
+  server updates a variable only when the loaded value is newer than its current one.
+
+FLEET_CONFIG (same file as the server) maps fleet topics to assets.
+
+Usage:
+  poetry run python scripts/backfill.py gateway_dump.jsonl
+  poetry run python scripts/backfill.py motor7.jsonl --asset Motor0007 --block 500000
+  poetry run python scripts/backfill.py other/scgdi_history.sqlite --db ./scgdi_history.sqlite
+  poetry run python scripts/backfill.py gateway_dump.jsonl --endpoint opc.tcp://localhost:4840/scgdi/motor50cv
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from src.backfill import DEFAULT_BLOCK, Backfill  # noqa: E402
+from src.fleet import asset_specs  # noqa: E402
+from src.partitions import EVENTS, RAW, ROLLUP  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+
+async def load_direct(args) -> int:
+    storage = Storage(
+        args.db,
+        partition_span=int(os.getenv("STORAGE_PARTITION_SPAN", "86400")),
+        retention={
+            RAW: float(os.getenv("RETENTION_RAW_DAYS", "30")) * 86400,
+            ROLLUP: float(os.getenv("RETENTION_ROLLUP_DAYS", "365")) * 86400,
+            EVENTS: float(os.getenv("RETENTION_EVENT_DAYS", "90")) * 86400,
+        },
+        recent_samples=0,
+    )
+    await storage.init()
+    rc = 0
+    try:
+        loader = Backfill(storage, asset_specs(os.getenv("FLEET_CONFIG", "")), args.asset, args.block)
+        for path in args.files:
+            t0 = time.perf_counter()
+            try:
+                stats = await loader.load(path)
+            except (OSError, ValueError, sqlite3.Error) as exc:
+                print(f"[ERR] {path}: {exc}")
+                rc = 2
+                continue
+            # Servidor parado: o warm start (last_value) passa a ter o valor carregado, se for mais novo
+            await storage.save_last_values([(sid, ts, v) for sid, (ts, v) in loader.latest.items() if v is not None])
+            elapsed = time.perf_counter() - t0
+            print(f"[BACKFILL] {path}: {stats} in {elapsed:.2f} s ({stats['written'] / max(elapsed, 1e-9):.0f} samples/s)")
+    finally:
+        await storage.close()
+    return rc
+
+
+async def load_remote(args) -> int:
+    from asyncua import Client, ua
+
+    rc = 0
+    async with Client(args.endpoint, timeout=args.timeout) as client:
+        idx = await client.get_namespace_index(os.getenv("OPCUA_NAMESPACE_URI", "http://scgdi.local/motor50cv"))
+        for path in args.files:
+            t0 = time.perf_counter()
+            try:
+                written = await client.nodes.objects.call_method(f"{idx}:Backfill", path)
+            except ua.UaStatusCodeError as exc:
+                print(f"[ERR] {path}: {exc}")
+                rc = 2
+                continue
+            print(f"[BACKFILL] {path}: {written} samples written by the server in {time.perf_counter() - t0:.2f} s")
+    return rc
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+", help="JSONL or SQLite files to load")
+    parser.add_argument("--db", type=str, default=None, help="Target sqlite DB (default: from .env DB_PATH)")
+    parser.add_argument("--asset", type=str, default=None, help="Asset of bare payload lines (default: the only asset)")
+    parser.add_argument("--block", type=int, default=DEFAULT_BLOCK, help="Samples per transaction")
+    parser.add_argument("--endpoint", type=str, default=None, help="Load through a running server's Backfill method")
+    parser.add_argument("--timeout", type=float, default=600, help="OPC UA request timeout with --endpoint (s)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logger.remove()
+    if args.endpoint:
+        return asyncio.run(load_remote(args))
+    args.db = args.db or os.getenv("DB_PATH", "./scgdi_history.sqlite")
+    return asyncio.run(load_direct(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# scripts/bench_backfill.py
+"""
+Backfill benchmark: one day of recorded gateway payloads loaded with src/backfill.py.
+
+Generates --hours of JSONL for --assets motors ({"topic", "payload"} lines, the
+format recorded from the broker), electrical and vibration every --period
+seconds and environment every 10 periods, ending an hour ago. A --shuffle
+fraction of the lines is swapped with a neighbour up to a minute away
+(gateways flushing out of order). The file is then loaded twice into a fresh
+DB: the second load must write nothing (every sample is already stored).
+
+Reported:
+  messages / samples      size of the file
+  load_s, samples/s       first load (validation + sort + dedupe + write)
+  reload_s, duplicates    second load of the same file
+  rows                    var_history rows afterwards (= samples)
+  replay_s (--replay-baseline)
+                          the same messages through the per-message path of the
+                          MQTT handler (add_samples + add_rollup per payload)
+
+Usage:
+  poetry run python scripts/bench_backfill.py
+  poetry run python scripts/bench_backfill.py --assets 5 --period 5 --replay-baseline
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from src.backfill import Backfill  # noqa: E402
+from src.fleet import asset_specs  # noqa: E402
+from src.model import PAYLOAD_KINDS, VARIABLES  # noqa: E402
+from src.publisher import ELEC_FMT, ENV_FMT, VIB_FMT  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+
+def _iso(t: datetime) -> str:
+    return t.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def generate(path: str, args, assets) -> int:
+    rnd = random.Random(args.seed)
+    t_end = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+    steps = int(args.hours * 3600 / args.period)
+    t0 = t_end - timedelta(seconds=steps * args.period)
+    lines = []
+    for k in range(steps):
+        ts = _iso(t0 + timedelta(seconds=k * args.period))
+        for name, topics in assets:
+            v = 220 + rnd.uniform(-3, 3)
+            i = 60 + rnd.uniform(-2, 2)
+            p = 3 ** 0.5 * v * i * 0.9 / 1000
+            elec = ELEC_FMT % (ts, v, v + 0.4, v - 0.4, i, i + 0.1, i - 0.1, p, p * 0.3, p * 1.05,
+                               k * 0.01, k * 0.003, k * 0.011, 0.9, 60 + rnd.uniform(-0.05, 0.05))
+            lines.append(json.dumps({"topic": topics["electrical"][0], "payload": json.loads(elec)}))
+            vib = VIB_FMT % (ts, rnd.uniform(0.5, 2.0), rnd.uniform(0.5, 2.0))
+            lines.append(json.dumps({"topic": topics["vibration"][0], "payload": json.loads(vib)}))
+            if k % 10 == 0:
+                env = ENV_FMT % (ts, 25 + rnd.uniform(-1, 1), 50 + rnd.uniform(-5, 5), 45 + rnd.uniform(-2, 2))
+                lines.append(json.dumps({"topic": topics["environment"][0], "payload": json.loads(env)}))
+    # Fora de ordem: troca com um vizinho até ~1 min à frente
+    reach = max(1, int(60 / args.period)) * 2 * len(assets)
+    for _ in range(int(len(lines) * args.shuffle)):
+        a = rnd.randrange(len(lines))
+        b = min(len(lines) - 1, a + rnd.randint(1, reach))
+        lines[a], lines[b] = lines[b], lines[a]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+async def backfill(db_path: str, path: str, assets) -> tuple:
+    storage = Storage(db_path, recent_samples=0)
+    await storage.init()
+    try:
+        t = time.perf_counter()
+        stats = await Backfill(storage, assets).load(path)
+        return time.perf_counter() - t, stats
+    finally:
+        await storage.close()
+
+
+async def replay(db_path: str, path: str, assets) -> float:
+    """Caminho por mensagem do handler MQTT: valida, uma chamada de add_samples/add_rollup por payload."""
+    routes = {topic: (name, kind) for name, topics in assets for kind, ts in topics.items() for topic in ts}
+    fields = {}
+    for group, name, field, key, _, _ in VARIABLES:
+        fields.setdefault(group, []).append((name, field, key))
+    storage = Storage(db_path, recent_samples=0)
+    await storage.init()
+    try:
+        t = time.perf_counter()
+        sids = {}
+        with open(path) as f:
+            for line in f:
+                msg = json.loads(line)
+                name, kind = routes[msg["topic"]]
+                model, group = PAYLOAD_KINDS[kind]
+                p = model.model_validate(msg["payload"])
+                if (name, group) not in sids:
+                    sids[(name, group)] = [await storage.series_id(f"{name}.{group}.{n}") for n, _, _ in fields[group]]
+                values = [
+                    (sid, getattr(p, field).get(key, 0.0) if key is not None else getattr(p, field))
+                    for sid, (_, field, key) in zip(sids[(name, group)], fields[group])
+                ]
+                ts_s = p.timestamp.timestamp()
+                await storage.add_samples([(sid, ts_s, v) for sid, v in values])
+                await storage.add_rollup(p.timestamp, values)
+        await storage.flush()
+        return time.perf_counter() - t
+    finally:
+        await storage.close()
+
+
+def count_rows(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = [t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'var_history%'")]
+        return sum(conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables)
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=1)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--period", type=float, default=1.0, help="Electrical/vibration period (s)")
+    parser.add_argument("--shuffle", type=float, default=0.01, help="Fraction of lines moved out of order")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replay-baseline", action="store_true")
+    args = parser.parse_args()
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet = os.path.join(tmp, "fleet.json")
+        with open(fleet, "w") as f:
+            json.dump({"assets": [{"name": f"Motor{n:04d}"} for n in range(args.assets)]}, f)
+        assets = list(asset_specs(fleet if args.assets > 1 else ""))
+        path = os.path.join(tmp, "dump.jsonl")
+        t = time.perf_counter()
+        messages = generate(path, args, assets)
+        print(f"[GEN] {messages} messages, {os.path.getsize(path) / 1e6:.1f} MB in {time.perf_counter() - t:.1f} s")
+
+        db = os.path.join(tmp, "backfill.sqlite")
+        load_s, stats = asyncio.run(backfill(db, path, assets))
+        print(f"[LOAD] {stats['samples']} samples in {load_s:.2f} s ({stats['written'] / load_s:.0f} samples/s), "
+              f"invalid={stats['invalid']} unrouted={stats['unrouted']} duplicates={stats['duplicates']}")
+        reload_s, stats2 = asyncio.run(backfill(db, path, assets))
+        print(f"[RELOAD] {reload_s:.2f} s, written={stats2['written']} duplicates={stats2['duplicates']}")
+        rows = count_rows(db)
+        print(f"[ROWS] var_history={rows} (expected {stats['written']})")
+        ok = rows == stats["written"] and stats2["written"] == 0
+
+        if args.replay_baseline:
+            replay_s = asyncio.run(replay(os.path.join(tmp, "replay.sqlite"), path, assets))
+            print(f"[REPLAY] per-message path: {replay_s:.2f} s ({load_s and replay_s / load_s:.1f}x the backfill)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
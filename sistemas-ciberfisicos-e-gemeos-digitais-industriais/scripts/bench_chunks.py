@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# scripts/bench_chunks.py
+"""
+Sealed-chunk benchmark: var_chunks blocks (src/chunks.py) vs raw var_history rows.
+
+Writes --days of publisher-like samples (every --period seconds with a few ms of
+timestamp jitter, the publisher's uniform noise around each nominal value) for
+the 19 motor variables into two fresh DBs through Storage: one keeps raw rows,
+the other seals every closed partition into compressed blocks. Then reads one
+series back through HistorySQLite.read_node_history from both.
+
+Reported:
+  bytes_sample   used DB pages / samples (raw rows, sealed blocks; --v1-baseline:
+                 the v1 schema with text timestamps and paths)
+  ratio          raw (or v1) bytes per sample / sealed bytes per sample
+  scan_ms        full-range and 1 h HistoryRead(Raw) of one series
+                 (the results must be identical)
+  points_ms      the storage part of the full-range read (rows / block decode),
+                 without building the DataValues
+
+Usage:
+  poetry run python scripts/bench_chunks.py
+  poetry run python scripts/bench_chunks.py --days 7 --period 1 --chunk 2048 --v1-baseline
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from asyncua import ua  # noqa: E402
+from bench_deadband import PUBLISHER  # noqa: E402
+from src.history_sqlite import HistorySQLite  # noqa: E402
+from src.migrations import to_epoch_us  # noqa: E402
+from src.partitions import RAW  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def samples(days: int, period: float):
+    """[(ts epoch s, [valor por variável])] com jitter de alguns ms no timestamp."""
+    rnd = random.Random(5)
+    base = to_epoch_us(T0) / 1e6
+    out = []
+    for k in range(int(days * 86400 / period)):
+        ts = base + k * period + rnd.uniform(0, 0.005)
+        out.append((ts, [nominal + rnd.uniform(-noise, noise) for nominal, noise in PUBLISHER.values()]))
+    return out
+
+
+def used_bytes(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        pages, free, size = (conn.execute(f"PRAGMA {p}").fetchone()[0] for p in ("page_count", "freelist_count", "page_size"))
+    finally:
+        conn.close()
+    return (pages - free) * size
+
+
+async def fill(db_path: str, data, seal: bool, chunk: int):
+    storage = Storage(db_path, chunk_samples=chunk, maintenance_interval=0.01)
+    await storage.init()
+    sids = [await storage.series_id(f"Motor50CV.Var.{name}") for name in PUBLISHER]
+    for ts, values in data:
+        await storage.add_samples([(sid, ts, v) for sid, v in zip(sids, values)])
+    await storage.flush()
+    if seal:
+        # Dados no passado: as partições já nascem fechadas. Selar só depois da
+        # carga, como no servidor (que sela partições que não recebem mais dados)
+        storage.seal_after = 0
+        while storage.partitions.tables(RAW):
+            await asyncio.sleep(0.05)
+    return storage, sids
+
+
+async def best_ms(call, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = await call()
+        best = min(best, time.perf_counter() - t)
+    return best * 1e3, result
+
+
+async def scan(history: HistorySQLite, node: ua.NodeId, start: datetime, end: datetime):
+    ms, (values, _) = await best_ms(lambda: history.read_node_history(node, start, end, 0))
+    return ms, [(v.SourceTimestamp, v.Value.Value) for v in values]
+
+
+def v1_bytes(db_path: str, data) -> int:
+    """Mesmas amostras no schema v1 (ts ISO-8601 e caminho em texto por linha)."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE var_history (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, path TEXT NOT NULL, "
+        "value REAL, extra TEXT)"
+    )
+    names = [f"Motor50CV.Var.{name}" for name in PUBLISHER]
+    conn.executemany(
+        "INSERT INTO var_history (ts, path, value, extra) VALUES (?, ?, ?, '{}')",
+        ((datetime.fromtimestamp(ts, timezone.utc).isoformat(), path, v)
+         for ts, values in data for path, v in zip(names, values)),
+    )
+    conn.commit()
+    conn.close()
+    return used_bytes(db_path)
+
+
+async def run(args) -> int:
+    data = samples(args.days, args.period)
+    n = len(data) * len(PUBLISHER)
+    end = T0 + timedelta(days=args.days)
+    hour = (T0 + timedelta(hours=args.days * 12), T0 + timedelta(hours=args.days * 12 + 1))
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {}
+        for label, seal in (("raw", False), ("sealed", True)):
+            path = os.path.join(workdir, f"{label}.sqlite")
+            t = time.perf_counter()
+            storage, sids = await fill(path, data, seal, args.chunk)
+            write_s = time.perf_counter() - t
+            history = HistorySQLite(storage, max_page_size=n)
+            await history.init()
+            node = ua.NodeId(1, 2)
+            history.bind_series(node, sids[0])
+            full_ms, full = await scan(history, node, T0, end)
+            hour_ms, one = await scan(history, node, *hour)
+            async with storage.readers.snapshot() as db:
+                points_ms, _ = await best_ms(lambda: history._points(db, sids[0], to_epoch_us(T0), to_epoch_us(end)))
+            await history.stop()
+            await storage.close()
+            results[label] = (used_bytes(path) / n, write_s, full_ms, hour_ms, points_ms, full, one)
+        v1 = v1_bytes(os.path.join(workdir, "v1.sqlite"), data) / n if args.v1_baseline else None
+
+    raw, sealed = results["raw"], results["sealed"]
+    assert raw[5:] == sealed[5:], "sealed blocks diverged from raw rows"
+    print(f"samples        {n} ({len(PUBLISHER)} series, {args.days} days every {args.period:g} s)")
+    print(f"{'':14} {'bytes_sample':>12} {'write_s':>8} {'scan_ms full':>13} {'scan_ms 1h':>11} {'points_ms':>10}")
+    for label, (bps, write_s, full_ms, hour_ms, points_ms, *_) in results.items():
+        print(f"{label:14} {bps:>12.2f} {write_s:>8.2f} {full_ms:>13.2f} {hour_ms:>11.3f} {points_ms:>10.2f}")
+    print(f"ratio          {raw[0] / sealed[0]:.1f}x vs raw rows")
+    if v1 is not None:
+        print(f"v1 rows        {v1:>12.2f} bytes/sample, ratio {v1 / sealed[0]:.1f}x")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--period", type=float, default=5.0, help="Seconds between samples")
+    parser.add_argument("--chunk", type=int, default=1024, help="Samples per block")
+    parser.add_argument("--v1-baseline", action="store_true", help="Also size the v1 row format")
+    args = parser.parse_args()
+    logger.remove()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
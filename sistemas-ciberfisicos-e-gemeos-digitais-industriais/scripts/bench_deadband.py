@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# scripts/bench_deadband.py
+"""
+Exception/compression historization benchmark (src/deadband.py, model.DEADBANDS).
+
+Replays publisher-like signals for every variable: the publisher's uniform noise
+around its nominal value plus, for --events of the run, real process changes
+(a slow drift and a step of several deadbands). Each sample goes through
+DeadbandFilter exactly as MotorOPCUAServer._set_and_store does.
+
+Reported per variable:
+  node_writes   samples written to the OPC UA node (data-change notifications)
+  stored        points archived by the swinging door (+ max-interval forced points)
+  reduction     samples / stored
+  max_err       worst distance between a received sample and the linear
+                interpolation of the stored points
+  tol           the variable's deadband at nominal value (max_err must not exceed it)
+
+Usage:
+  poetry run python scripts/bench_deadband.py
+  poetry run python scripts/bench_deadband.py --samples 17280 --period 5 --max-interval 300
+"""
+from __future__ import annotations
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.deadband import DeadbandFilter  # noqa: E402
+from src.model import DEADBANDS, HIST_MAX_INTERVAL  # noqa: E402
+
+# (nominal, ruído ±) como em src/publisher.py
+PUBLISHER = {
+    "VoltageA": (220.0, 2.0), "VoltageB": (220.0, 2.0), "VoltageC": (220.0, 2.0),
+    "CurrentA": (10.0, 0.3), "CurrentB": (10.0, 0.3), "CurrentC": (10.0, 0.3),
+    "PowerActive": (4500.0, 50.0), "PowerReactive": (500.0, 30.0), "PowerApparent": (4600.0, 50.0),
+    "EnergyActive": (10002.5, 2.5), "EnergyReactive": (1201.0, 1.0), "EnergyApparent": (10202.5, 2.5),
+    "PowerFactor": (0.95, 0.01), "Frequency": (60.0, 0.05),
+    "Temperature": (34.0, 1.0), "Humidity": (55.0, 3.0), "CaseTemperature": (40.0, 2.0),
+    "Axial": (0.10, 0.03), "Radial": (0.12, 0.03),
+}
+
+
+def signal(nominal: float, noise: float, tol: float, n: int, period: float, events: float, rnd: random.Random):
+    """Ruído do publisher; na janela de eventos, deriva de 10 deadbands seguida de degrau de 5 deadbands."""
+    start = int(n * (1 - events) / 2)
+    width = max(1, int(n * events))
+    out = []
+    for i in range(n):
+        base = nominal
+        k = i - start
+        if 0 <= k < width:
+            base += 10 * tol * k / width
+        elif k >= width:
+            base += 5 * tol
+        out.append((i * period, base + rnd.uniform(-noise, noise)))
+    return out
+
+
+def max_error(samples, stored) -> float:
+    times = [t for t, _ in stored]
+    worst = 0.0
+    for t, v in samples:
+        j = bisect.bisect_right(times, t)
+        if j == 0:
+            continue
+        t0, v0 = stored[j - 1]
+        if j == len(stored) or t0 == t:
+            ref = v0
+        else:
+            t1, v1 = stored[j]
+            ref = v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+        worst = max(worst, abs(ref - v))
+    return worst
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=17_280, help="Samples per variable (17280 = 1 day at 5 s)")
+    parser.add_argument("--period", type=float, default=5.0, help="Publish period (s)")
+    parser.add_argument("--max-interval", type=float, default=HIST_MAX_INTERVAL)
+    parser.add_argument("--events", type=float, default=0.05, help="Share of the run with real process changes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    print(f"{'variable':>16} {'samples':>8} {'node_writes':>12} {'stored':>7} {'reduction':>10} {'max_err':>9} {'tol':>8}")
+    tot_in = tot_w = tot_s = 0
+    elapsed = 0.0
+    for name, abs_db, pct_db in DEADBANDS:
+        nominal, noise = PUBLISHER[name]
+        flt = DeadbandFilter(abs_db, pct_db, args.max_interval)
+        tol = flt.deadband(nominal)
+        samples = signal(nominal, noise, tol, args.samples, args.period, args.events, rnd)
+
+        t0 = time.perf_counter()
+        writes, stored = 0, []
+        for t, v in samples:
+            writes += flt.report(v, t)
+            stored.extend(flt.archive(v, t))
+        stored.extend(flt.pending())
+        elapsed += time.perf_counter() - t0
+
+        err = max_error(samples, stored)
+        # Tolerância do pct avaliada no valor do pivô, que varia com o sinal
+        limit = max(flt.deadband(v) for _, v in stored)
+        assert err <= limit + 1e-9, f"{name}: erro {err} acima do deadband {limit}"
+        tot_in, tot_w, tot_s = tot_in + len(samples), tot_w + writes, tot_s + len(stored)
+        print(f"{name:>16} {len(samples):>8} {writes:>12} {len(stored):>7} {len(samples) / len(stored):>9.1f}x "
+              f"{err:>9.4g} {tol:>8.4g}")
+
+    print(f"{'total':>16} {tot_in:>8} {tot_w:>12} {tot_s:>7} {tot_in / tot_s:>9.1f}x")
+    print(f"node writes cut {tot_in / tot_w:.1f}x; filter cost {elapsed / tot_in * 1e6:.2f} us/sample")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# scripts/bench_decode.py
+"""
+Micro-benchmark of the MQTT payload decode path.
+
+Compares, per message, the previous pipeline (json.loads -> _normalize_* dict ->
+Model(**data)) with the current one (Model.model_validate_json on the raw bytes,
+legacy formats handled by the model validators), for the three payload types in
+canonical and legacy format.
+
+Usage:
+  poetry run python scripts/bench_decode.py
+  poetry run python scripts/bench_decode.py --number 50000 --repeat 7
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.model import ElectricalPayload, EnvironmentPayload, VibrationPayload  # noqa: E402
+
+TS = "2025-08-14T12:00:00+00:00"
+
+SAMPLES = {
+    "electrical": (
+        ElectricalPayload,
+        {
+            "timestamp": TS,
+            "voltage": {"a": 221.3, "b": 219.8, "c": 220.4},
+            "current": {"a": 9.8, "b": 10.1, "c": 9.9},
+            "power": {"active": 6400.0, "reactive": 1200.0, "apparent": 6511.5},
+            "energy": {"active": 1520.2, "reactive": 310.7, "apparent": 1551.6},
+            "powerFactor": 0.95,
+            "frequency": 60.0,
+        },
+        {"Voltage": 220.0, "Current": 10.0, "Power": 6400.0},
+    ),
+    "environment": (
+        EnvironmentPayload,
+        {"timestamp": TS, "temperature": 24.5, "humidity": 55.0, "caseTemperature": 41.2},
+        {"Temperature": 24.5, "Humidity": 55.0, "CaseTemperature": 41.2},
+    ),
+    "vibration": (
+        VibrationPayload,
+        {"timestamp": TS, "axial": 0.12, "radial": 0.09},
+        {"Accell_X": 0.12, "Accell_Y": 0.09, "Accell_Z": 0.98},
+    ),
+}
+
+
+# Pipeline anterior (cópia fiel de server.py antes da validação em passo único)
+
+def _old_normalize_electrical(data: dict) -> dict:
+    if any(k in data for k in ("Voltage", "Current", "Power")):
+        v = data.get("Voltage", 0.0)
+        i = data.get("Current", 0.0)
+        p = data.get("Power", 0.0)
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "voltage": {"a": v, "b": v, "c": v},
+            "current": {"a": i, "b": i, "c": i},
+            "power": {"active": p, "reactive": 0.0, "apparent": p},
+            "energy": {"active": 0.0, "reactive": 0.0, "apparent": 0.0},
+            "powerFactor": 0.95,
+            "frequency": 60.0,
+        }
+    return data
+
+
+def _old_normalize_environment(data: dict) -> dict:
+    if any(k in data for k in ("Temperature", "Humidity", "CaseTemperature")):
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "temperature": data.get("Temperature", 0.0),
+            "humidity": data.get("Humidity", 0.0),
+            "caseTemperature": data.get("CaseTemperature", 0.0),
+        }
+    return data
+
+
+def _old_normalize_vibration(data: dict) -> dict:
+    if any(k in data for k in ("Accell_X", "Accell_Y", "Accell_Z")):
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "axial": float(data.get("Accell_X", 0.0)),
+            "radial": float(data.get("Accell_Y", 0.0)),
+        }
+    return data
+
+
+OLD_NORMALIZE = {
+    "electrical": _old_normalize_electrical,
+    "environment": _old_normalize_environment,
+    "vibration": _old_normalize_vibration,
+}
+
+
+def bench(fn, number: int, repeat: int) -> float:
+    """Melhor tempo por chamada, em microssegundos."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20_000, help="Messages per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'payload':<12} {'format':<10} {'old µs/msg':>11} {'new µs/msg':>11} {'speedup':>8}")
+    for name, (model, canonical, legacy) in SAMPLES.items():
+        normalize = OLD_NORMALIZE[name]
+        for fmt, sample in (("canonical", canonical), ("legacy", legacy)):
+            raw = json.dumps(sample).encode()
+
+            # Os dois caminhos precisam produzir o mesmo modelo (exceto o timestamp gerado no legado)
+            old_p = model(**normalize(json.loads(raw)))
+            new_p = model.model_validate_json(raw)
+            assert old_p.model_dump(exclude={"timestamp"}) == new_p.model_dump(exclude={"timestamp"})
+
+            old = bench(lambda: model(**normalize(json.loads(raw))), args.number, args.repeat)
+            new = bench(lambda: model.model_validate_json(raw), args.number, args.repeat)
+            print(f"{name:<12} {fmt:<10} {old:>11.2f} {new:>11.2f} {old / new:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# scripts/bench_e2e.py
+"""
+End-to-end benchmark: MQTT publish -> server -> OPC UA subscriber.
+
+Runs the real server (python -m src.server) as a child process against a
+fresh temp DB and a generated FLEET_CONFIG of --assets motors, with the
+in-process broker from scripts/mqtt_broker.py on a free port. This process
+publishes electrical/vibration/environment payloads for all assets at --rate
+messages/s for --warmup + --duration seconds, and an asyncua client subscribed
+to VoltageA of the first --probes assets measures how long each published
+value takes to become visible over OPC UA.
+
+VoltageA alternates between 214 and 226 V on every electrical message, so each
+one leaves the 2% deadband (and stays inside the ±10% alarm limits). Payload
+bytes are pre-generated; only the timestamp (wall clock at publish, which the
+server keeps as SourceTimestamp) is spliced in per message.
+
+Reported:
+  offered_msg_s     messages/s actually published during the window
+  sustained_msg_s   window messages / time until the last of them is visible
+                    over OPC UA (includes draining any backlog)
+  latency p50/p99   publish -> DataChange received by the client, in ms
+                    (sampled by the --publishing-interval of the subscription)
+  rows_s            samples written to history (var_history + sealed chunks)
+                    per second of load, counted in the DB after a clean stop
+  server_cpu_pct    CPU of the server process during the window (100 = 1 core)
+  rss_mb max/final  resident memory of the server process
+
+Results go to --output as JSON (parameters, git revision, Python version); with
+--baseline an earlier result file is compared and the run fails (exit 1) when
+throughput drops or p99 latency grows by more than --tolerance percent.
+
+Usage:
+  poetry run python scripts/bench_e2e.py
+  poetry run python scripts/bench_e2e.py --assets 100 --rate 2000 --duration 30
+  poetry run python scripts/bench_e2e.py --output e2e_new.json --baseline e2e_old.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from loguru import logger  # noqa: E402
+
+from asyncua import Client  # noqa: E402
+from bench_fleet import free_tcp_port  # noqa: E402
+from mqtt_broker import Broker  # noqa: E402
+from src.partitions import CHUNKS, EVENTS, RAW, load_catalog  # noqa: E402
+from src.sqlite_pool import connect_readonly, snapshot  # noqa: E402
+
+NAMESPACE = "http://scgdi.local/motor50cv"
+PROBE_LOW, PROBE_HIGH, MARKER = 214.0, 226.0, 236.0  # V: sempre fora do deadband de 2%
+VARIANTS = 16       # payloads pré-gerados por ativo e tipo
+TICK_S = 0.01       # passo do gerador
+ENV_EVERY = 5       # environment a cada 5 rodadas de electrical + vibration
+READY_TIMEOUT_S = 120.0
+
+# Métricas comparadas com --baseline: (chave, maior é melhor)
+COMPARED = (("sustained_msg_s", True), ("latency_p50_ms", False), ("latency_p99_ms", False), ("rows_s", True))
+
+
+def electrical(rnd: random.Random, voltage_a: float) -> dict:
+    return {
+        "timestamp": "@TS@",
+        "voltage": {"a": voltage_a, "b": 220.0 + rnd.uniform(-6, 6), "c": 220.0 + rnd.uniform(-6, 6)},
+        "current": {k: 10.0 + rnd.uniform(-0.3, 0.3) for k in "abc"},
+        "power": {"active": 4500 + rnd.uniform(-90, 90), "reactive": 500 + rnd.uniform(-30, 30),
+                  "apparent": 4600 + rnd.uniform(-90, 90)},
+        "energy": {"active": 10000 + rnd.uniform(0, 5), "reactive": 1200 + rnd.uniform(0, 2),
+                   "apparent": 10200 + rnd.uniform(0, 5)},
+        "powerFactor": 0.95 + rnd.uniform(-0.02, 0.02),
+        "frequency": 60.0 + rnd.uniform(-0.1, 0.1),
+    }
+
+
+def template(payload: dict) -> Tuple[bytes, bytes]:
+    pre, _, post = json.dumps(payload).encode().partition(b"@TS@")
+    return pre, post
+
+
+def schedule(names: List[str], rnd: random.Random) -> List[Tuple[str, List[Tuple[bytes, bytes]]]]:
+    """Uma volta do gerador: (tópico, variantes) na ordem de publicação."""
+    elec = {n: [template(electrical(rnd, PROBE_LOW if k % 2 else PROBE_HIGH)) for k in range(VARIANTS)] for n in names}
+    vib = {n: [template({"timestamp": "@TS@", "axial": 0.10 + rnd.uniform(-0.03, 0.03),
+                         "radial": 0.12 + rnd.uniform(-0.03, 0.03)}) for _ in range(VARIANTS)] for n in names}
+    env = {n: [template({"timestamp": "@TS@", "temperature": 34.0 + rnd.uniform(-1, 1), "humidity": 55.0 + rnd.uniform(-3, 3),
+                         "caseTemperature": 40.0 + rnd.uniform(-1, 1)}) for _ in range(VARIANTS)] for n in names}
+    out = []
+    for r in range(ENV_EVERY):
+        for n in names:
+            out.append((f"scgdi/{n}/electrical", elec[n][r:] + elec[n][:r]))  # VoltageA alterna a cada mensagem
+            out.append((f"scgdi/{n}/vibration", vib[n]))
+        if r == 0:
+            out.extend((f"scgdi/{n}/environment", env[n]) for n in names)
+    return out
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def proc_rss(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def proc_cpu_s(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rpartition(")")[2].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")  # utime + stime
+
+
+def git_rev() -> str:
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT)
+    return out.stdout.strip() or "unknown"
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Probe:
+    """Handler da assinatura OPC UA: latência de cada DataChange e último valor por nó."""
+
+    def __init__(self):
+        self.recording = False
+        self.latencies: List[float] = []
+        self.last: Dict[str, float] = {}
+
+    def datachange_notification(self, node, val, data):  # noqa: ANN001
+        received = time.time()
+        src = data.monitored_item.Value.SourceTimestamp
+        if src is not None and self.recording:
+            if src.tzinfo is None:
+                src = src.replace(tzinfo=timezone.utc)
+            self.latencies.append(received - src.timestamp())
+        self.last[node.nodeid.to_string()] = val
+
+
+def count_rows(db_path: str) -> Dict[str, int]:
+    conn = connect_readonly(db_path)
+    try:
+        with snapshot(conn):
+            catalog = load_catalog(conn)
+
+            def total(cls: str, select: str = "count(*)") -> int:
+                return sum(conn.execute(f'SELECT {select} FROM "{t}"').fetchone()[0] or 0 for t in catalog.tables(cls))
+
+            return {"samples": total(RAW) + total(CHUNKS, "sum(samples)"), "events": total(EVENTS)}
+    finally:
+        conn.close()
+
+
+async def connect_client(url: str, deadline: float) -> Client:
+    while True:
+        client = Client(url)
+        try:
+            await client.connect()
+            return client
+        except (OSError, asyncio.TimeoutError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+async def publish_for(broker: Broker, plan, seconds: float, rate: float, counter: List[int]) -> float:
+    """Publica a `rate` msgs/s por `seconds`; devolve a duração real."""
+    start = time.perf_counter()
+    sent = 0
+    n = len(plan)
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed
+        due = min(int(elapsed * rate) - sent, int(rate * 0.1) + 1)  # atraso acumulado: no máximo 100 ms de rajada
+        for _ in range(max(0, due)):
+            k = counter[0]
+            topic, variants = plan[k % n]
+            pre, post = variants[(k // n) % VARIANTS]
+            broker.publish(topic, pre + now_iso().encode() + post)
+            counter[0] = k + 1
+        sent += max(0, due)
+        await broker.drain()
+        await asyncio.sleep(TICK_S)
+
+
+async def run(args, workdir: str) -> dict:
+    names = [f"Motor{i:04d}" for i in range(args.assets)]
+    cfg_path = os.path.join(workdir, "fleet.json")
+    with open(cfg_path, "w") as f:
+        json.dump({"assets": names}, f)
+    db_path = os.path.join(workdir, "e2e.sqlite")
+    broker = await Broker("127.0.0.1", 0).start()
+    url = f"opc.tcp://127.0.0.1:{free_tcp_port()}/scgdi/e2e"
+    env = dict(os.environ, FLEET_CONFIG=cfg_path, DB_PATH=db_path, OPCUA_ENDPOINT=url,
+               MQTT_HOST="127.0.0.1", MQTT_PORT=str(broker.port), MQTT_CLIENT_ID="scgdi-e2e")
+    log_path = os.path.join(workdir, "server.log")
+    with open(log_path, "wb") as log:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "src.server", cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    rss_max = 0
+    sampling = True
+
+    async def sample_rss():
+        nonlocal rss_max
+        while sampling:
+            try:
+                rss_max = max(rss_max, proc_rss(proc.pid))
+            except OSError:
+                return
+            await asyncio.sleep(0.25)
+
+    client = None
+    try:
+        deadline = time.monotonic() + READY_TIMEOUT_S
+        t_ready = time.perf_counter()
+        client = await connect_client(url, deadline)
+        await asyncio.wait_for(broker.subscribed.wait(), max(1.0, deadline - time.monotonic()))
+        ready_s = time.perf_counter() - t_ready
+        rss_task = asyncio.create_task(sample_rss())
+
+        idx = await client.get_namespace_index(NAMESPACE)
+        objects = client.nodes.objects
+        probes = [await objects.get_child([f"{idx}:{n}", f"{idx}:Electrical", f"{idx}:VoltageA"])
+                  for n in names[:args.probes]]
+        handler = Probe()
+        sub = await client.create_subscription(args.publishing_interval, handler)
+        await sub.subscribe_data_change(probes)
+
+        plan = schedule(names, random.Random(args.seed))
+        counter = [0]
+        t_load = time.perf_counter()
+        await publish_for(broker, plan, args.warmup, args.rate, counter)
+        handler.recording = True
+        cpu0, first = proc_cpu_s(proc.pid), counter[0]
+        t_window = time.perf_counter()
+        offered_s = await publish_for(broker, plan, args.duration, args.rate, counter)
+        window_msgs = counter[0] - first
+
+        # Marcador: último valor de cada sonda; visível = tudo antes dele foi processado
+        pre, post = template(electrical(random.Random(0), MARKER))
+        for n in names[:args.probes]:
+            broker.publish(f"scgdi/{n}/electrical", pre + now_iso().encode() + post)
+        keys = [p.nodeid.to_string() for p in probes]
+        drain_deadline = time.perf_counter() + args.drain_timeout
+        while not all(handler.last.get(k) == MARKER for k in keys):
+            if time.perf_counter() > drain_deadline:
+                raise TimeoutError(f"backlog not drained in {args.drain_timeout:g} s (see {log_path})")
+            await asyncio.sleep(0.005)
+        t_done = time.perf_counter()
+        cpu = proc_cpu_s(proc.pid) - cpu0
+        handler.recording = False
+        rss_final = proc_rss(proc.pid)
+        sampling = False
+        await rss_task
+        await sub.delete()
+    finally:
+        sampling = False
+        if client is not None:
+            await client.disconnect()
+        if proc.returncode is None:
+            proc.send_signal(signal.SIGINT)  # encerramento normal: grava o que está na fila
+            try:
+                await asyncio.wait_for(proc.wait(), 60)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        await broker.stop()
+
+    rows = count_rows(db_path)
+    lat = [x * 1e3 for x in handler.latencies]
+    return {
+        "ready_s": round(ready_s, 3),
+        "messages": counter[0],
+        "offered_msg_s": round(window_msgs / offered_s, 1),
+        "sustained_msg_s": round(window_msgs / (t_done - t_window), 1),
+        "drain_s": round(t_done - t_window - offered_s, 3),
+        "latency_samples": len(lat),
+        "latency_p50_ms": round(statistics.median(lat), 2) if lat else None,
+        "latency_p99_ms": round(percentile(lat, 0.99), 2) if lat else None,
+        "latency_max_ms": round(max(lat), 2) if lat else None,
+        "samples": rows["samples"],
+        "events": rows["events"],
+        "rows_s": round(rows["samples"] / (t_done - t_load), 1),
+        "server_cpu_pct": round(cpu / (t_done - t_window) * 100, 1),
+        "rss_max_mb": round(rss_max / 1e6, 1),
+        "rss_final_mb": round(rss_final / 1e6, 1),
+    }
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path) as f:
+        base = json.load(f)
+    print(f"baseline       {baseline_path} (git {base.get('git', '?')})")
+    ok = True
+    for key, higher_is_better in COMPARED:
+        old, new = base["results"].get(key), results.get(key)
+        if not old or new is None:
+            continue
+        delta = (new - old) / old * 100
+        worse = -delta if higher_is_better else delta
+        flag = "REGRESSION" if worse > tolerance else ""
+        ok = ok and not flag
+        print(f"  {key:18} {old:>10} -> {new:>10} ({delta:+.1f}%) {flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=10, help="Motors in the generated FLEET_CONFIG")
+    parser.add_argument("--rate", type=float, default=500, help="Aggregate MQTT messages/s over all assets")
+    parser.add_argument("--duration", type=float, default=10, help="Measured window (s)")
+    parser.add_argument("--warmup", type=float, default=3, help="Load before the window (s)")
+    parser.add_argument("--probes", type=int, default=10, help="Assets whose VoltageA the OPC UA client subscribes to")
+    parser.add_argument("--publishing-interval", type=float, default=10, help="Subscription publishing interval (ms)")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Max wait for the backlog after the window (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_e2e.json", help="JSON results file")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=10, help="Allowed regression vs --baseline (%%)")
+    args = parser.parse_args()
+    args.probes = max(1, min(args.probes, args.assets))
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, workdir))
+
+    report = {
+        "benchmark": "e2e",
+        "timestamp": now_iso(),
+        "git": git_rev(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"load           {args.assets} assets, {args.rate:g} msg/s for {args.duration:g} s "
+          f"(+{args.warmup:g} s warmup), {args.probes} probes")
+    for key, value in results.items():
+        print(f"  {key:18} {value}")
+    print(f"saved          {args.output}")
+    if args.baseline:
+        return 0 if compare(results, args.baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# scripts/bench_fleet.py
+"""
+Fleet scaling benchmark: one MotorOPCUAServer hosting N assets.
+
+For each fleet size a fresh process builds the address space from a generated
+FLEET_CONFIG, then replays --cycles publish cycles (electrical + vibration for
+every asset each cycle, environment on the first one) through the ingest queue,
+exactly as MQTT messages would arrive. No broker is needed.
+
+Reported per fleet size:
+  init_s        address space + history setup time
+  rss_mb        resident memory after the load
+  kb_asset      marginal RSS after init per extra asset, relative to the smallest fleet
+  cpu_ms_cycle  process CPU time per asset per publish cycle (all threads)
+  cpu_pct_5s    share of one core per asset at the 5 s publish rate
+
+Usage:
+  poetry run python scripts/bench_fleet.py
+  poetry run python scripts/bench_fleet.py --assets 1 10 100 500 --cycles 5
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+PUBLISH_PERIOD_S = 5.0
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def free_tcp_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def electrical(ts: str, rnd: random.Random) -> dict:
+    return {
+        "timestamp": ts,
+        "voltage": {k: 220.0 + rnd.uniform(-2.0, 2.0) for k in "abc"},
+        "current": {k: 10.0 + rnd.uniform(-0.3, 0.3) for k in "abc"},
+        "power": {"active": 4500 + rnd.uniform(-50, 50), "reactive": 500 + rnd.uniform(-30, 30),
+                  "apparent": 4600 + rnd.uniform(-50, 50)},
+        "energy": {"active": 10000 + rnd.uniform(0, 5), "reactive": 1200 + rnd.uniform(0, 2),
+                   "apparent": 10200 + rnd.uniform(0, 5)},
+        "powerFactor": 0.95 + rnd.uniform(-0.01, 0.01),
+        "frequency": 60.0 + rnd.uniform(-0.05, 0.05),
+    }
+
+
+async def run_child(n_assets: int, cycles: int, workdir: str) -> dict:
+    names = [f"Motor{i:04d}" for i in range(n_assets)]
+    cfg_path = os.path.join(workdir, "fleet.json")
+    with open(cfg_path, "w") as f:
+        json.dump({"assets": names}, f)
+    os.environ.update({
+        "FLEET_CONFIG": cfg_path,
+        "DB_PATH": os.path.join(workdir, "bench.sqlite"),
+        "OPCUA_ENDPOINT": f"opc.tcp://127.0.0.1:{free_tcp_port()}/scgdi/fleet",
+    })
+
+    from loguru import logger
+    logger.remove()
+    from src.server import MotorOPCUAServer
+
+    # Mensagens pré-serializadas: o custo medido é só o do servidor
+    rnd = random.Random(42)
+    # Timestamps recentes: dentro da retenção, as amostras são gravadas de fato
+    t0 = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(seconds=PUBLISH_PERIOD_S * cycles)
+    messages = []
+    for c in range(cycles):
+        ts = (t0 + timedelta(seconds=PUBLISH_PERIOD_S * c)).isoformat()
+        for name in names:
+            messages.append((f"scgdi/{name}/electrical", json.dumps(electrical(ts, rnd)).encode()))
+            messages.append((f"scgdi/{name}/vibration", json.dumps(
+                {"timestamp": ts, "axial": 0.10 + rnd.uniform(-0.03, 0.03), "radial": 0.12 + rnd.uniform(-0.03, 0.03)}
+            ).encode()))
+            if c == 0:
+                messages.append((f"scgdi/{name}/environment", json.dumps(
+                    {"timestamp": ts, "temperature": 34.0, "humidity": 55.0, "caseTemperature": 40.0}
+                ).encode()))
+
+    app = MotorOPCUAServer()
+    t_init = time.perf_counter()
+    await app.init()
+    init_s = time.perf_counter() - t_init
+    rss_init = rss_bytes()
+
+    async with app.server:
+        app.ingest.start()
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        for topic, payload in messages:
+            await app.ingest.put(topic, payload, key=app.router.match(topic).key)
+        await app.ingest.stop()
+        wall = time.perf_counter() - wall0
+        await app.storage.flush()
+        cpu = time.process_time() - cpu0
+    await app.storage.close()
+
+    stats = app.ingest.stats()
+    cpu_per_asset_cycle = cpu / cycles / n_assets
+    return {
+        "assets": n_assets,
+        "variables": sum(len(a.registry) for a in app.assets.values()),
+        "messages": len(messages),
+        "failed": stats["failed"],
+        "init_s": round(init_s, 3),
+        "rss_mb": round(rss_bytes() / 1e6, 1),
+        "rss_init": rss_init,
+        "msg_per_s": round(len(messages) / wall, 1),
+        "cpu_ms_cycle": round(cpu_per_asset_cycle * 1e3, 3),
+        "cpu_pct_5s": round(cpu_per_asset_cycle / PUBLISH_PERIOD_S * 100, 4),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--cycles", type=int, default=5, help="Publish cycles replayed per fleet size")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        with tempfile.TemporaryDirectory() as workdir:
+            print(json.dumps(asyncio.run(run_child(args.child, args.cycles, workdir))))
+        return 0
+
+    cols = ("assets", "variables", "messages", "init_s", "rss_mb", "kb_asset", "msg_per_s", "cpu_ms_cycle", "cpu_pct_5s")
+    print(" ".join(f"{c:>12}" for c in cols))
+    base = None
+    for n in sorted(args.assets):
+        # Um processo por tamanho de frota, para medir memória sem interferência
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(n), "--cycles", str(args.cycles)],
+            capture_output=True, text=True, cwd=ROOT,
+        )
+        if out.returncode != 0:
+            print(out.stderr, file=sys.stderr)
+            return out.returncode
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        if base is None:
+            base = row
+        row["kb_asset"] = (
+            round((row["rss_init"] - base["rss_init"]) / (n - base["assets"]) / 1e3, 1) if n > base["assets"] else "-"
+        )
+        print(" ".join(f"{row[c]:>12}" for c in cols))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# scripts/bench_recent.py
+"""
+Recent-history benchmark: trend-screen HistoryRead(Raw) served from the
+in-memory ring buffers (src/recent.py) vs the same read from SQLite.
+
+Writes --minutes of samples every --period seconds for the 19 motor variables
+through Storage (ring buffers of --capacity samples per series), then reads the
+last 5, 15 and 60 minutes of one series through HistorySQLite.read_node_history:
+from memory (first read builds the DataValues, later reads reuse them) and from
+disk (ring buffers switched off). The results must be identical.
+
+Reported:
+  hot_first_ms   first read from memory (DataValues built from the ring)
+  hot_ms         repeated read from memory (the trend screen refreshing)
+  disk_ms        the same read from SQLite
+  stats          RecentHistory.stats(): series, samples, bytes, hits, misses
+
+Usage:
+  poetry run python scripts/bench_recent.py
+  poetry run python scripts/bench_recent.py --minutes 180 --period 0.5 --capacity 8192
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from asyncua import ua  # noqa: E402
+from bench_deadband import PUBLISHER  # noqa: E402
+from src.history_sqlite import HistorySQLite  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+WINDOWS = (5, 15, 60)  # minutos
+REPEAT = 20
+
+
+async def best_ms(call, repeat: int = REPEAT):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = await call()
+        best = min(best, time.perf_counter() - t)
+    return best * 1e3, result
+
+
+def as_points(result):
+    values, cont = result
+    return [(v.SourceTimestamp, v.Value.Value) for v in values], cont
+
+
+async def run(args) -> int:
+    rnd = random.Random(7)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    t0 = now - timedelta(minutes=args.minutes)
+    n = int(args.minutes * 60 / args.period)
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        storage = Storage(os.path.join(workdir, "recent.sqlite"), recent_samples=args.capacity)
+        await storage.init()
+        sids = [await storage.series_id(f"Motor50CV.Var.{name}") for name in PUBLISHER]
+        base = t0.timestamp()
+        for k in range(n):
+            ts = base + k * args.period
+            await storage.add_samples([
+                (sid, ts, nominal + rnd.uniform(-noise, noise)) for sid, (nominal, noise) in zip(sids, PUBLISHER.values())
+            ])
+        await storage.flush()
+
+        history = HistorySQLite(storage, max_page_size=n)
+        await history.init()
+        node = ua.NodeId(1, 2)
+        history.bind_series(node, sids[0])
+        recent = storage.recent
+        for minutes in WINDOWS:
+            start = now - timedelta(minutes=minutes)
+
+            def read():
+                return history.read_node_history(node, start, now, 0)
+
+            t = time.perf_counter()
+            hot = await read()
+            first_ms = (time.perf_counter() - t) * 1e3
+            hits = recent.hits
+            hot_ms, hot = await best_ms(read)
+            served = recent.hits > hits
+            capacity, recent.capacity = recent.capacity, 0  # desliga: tudo vai ao disco
+            disk_ms, disk = await best_ms(read)
+            recent.capacity = capacity
+            assert as_points(hot) == as_points(disk), f"ring buffer diverged from SQLite ({minutes} min)"
+            rows.append((minutes, len(hot[0]), served, first_ms, hot_ms, disk_ms))
+        stats = recent.stats()
+        await history.stop()
+        await storage.close()
+
+    print(f"samples        {n * len(sids)} ({len(sids)} series, {args.minutes} min every {args.period:g} s), "
+          f"capacity {args.capacity}/series")
+    print(f"{'window':>8} {'points':>7} {'memory':>7} {'hot_first_ms':>13} {'hot_ms':>8} {'disk_ms':>8} {'speedup':>8}")
+    for minutes, points, served, first_ms, hot_ms, disk_ms in rows:
+        print(f"{minutes:>6} m {points:>7} {'yes' if served else 'no':>7} {first_ms:>13.3f} {hot_ms:>8.3f} "
+              f"{disk_ms:>8.3f} {disk_ms / hot_ms:>7.0f}x")
+    print(f"stats          {stats}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=int, default=120, help="History written before the reads")
+    parser.add_argument("--period", type=float, default=1.0, help="Seconds between samples")
+    parser.add_argument("--capacity", type=int, default=4096, help="Ring buffer samples per series")
+    args = parser.parse_args()
+    logger.remove()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# scripts/bench_retention.py
+"""
+Retention benchmark: partition expiry (DROP TABLE) while ingest keeps running.
+
+Writes --days of samples every --period seconds for --series variables through
+Storage (raw rows + rollups), with the retention clock following the newest
+sample, so partitions older than --retention days expire while data is still
+coming in. After each simulated day the DB size is sampled: once the window is
+full it must stop growing, since dropped partitions free pages that new ones reuse.
+
+Reported:
+  size_mb per day         file size (flat after --retention days)
+  drop_ms                 time the writer spent on each expired partition
+  max_put_ms              worst wait of a producer on the storage queue (ingest stall)
+  delete_ms (--delete-baseline)
+                          the same expiry done as DELETE of one day from a single table
+
+Usage:
+  poetry run python scripts/bench_retention.py
+  poetry run python scripts/bench_retention.py --days 10 --retention 3 --series 50 --delete-baseline
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from src.migrations import to_epoch_us  # noqa: E402
+from src.partitions import RAW, ROLLUP, EVENTS  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+DAY_US = 86_400 * 1_000_000
+
+
+class SimStorage(Storage):
+    """Storage com o relógio da retenção no último timestamp gravado, e tempo de cada DROP."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.now_us = to_epoch_us(T0)
+        self.drops_ms = []
+
+    def _now_us(self) -> int:
+        return self.now_us
+
+    async def _expire_one(self) -> bool:
+        t = time.perf_counter()
+        dropped = await super()._expire_one()
+        if dropped:
+            self.drops_ms.append((time.perf_counter() - t) * 1e3)
+        return dropped
+
+
+async def run(args, db_path: str) -> dict:
+    keep = args.retention * 86400
+    storage = SimStorage(db_path, retention={RAW: keep, ROLLUP: keep, EVENTS: keep}, maintenance_interval=0.05)
+    await storage.init()
+    sids = [await storage.series_id(f"Motor.Electrical.Var{i}") for i in range(args.series)]
+    rnd = random.Random(1)
+    per_day = int(86400 / args.period)
+    sizes, max_put = [], 0.0
+    t = time.perf_counter()
+    for day in range(args.days):
+        for k in range(per_day):
+            ts_us = to_epoch_us(T0) + day * DAY_US + round(k * args.period * 1e6)
+            values = [(sid, 220.0 + rnd.uniform(-2, 2)) for sid in sids]
+            storage.now_us = ts_us
+            t_put = time.perf_counter()
+            await storage.add_samples([(sid, ts_us / 1e6, v) for sid, v in values])
+            await storage.add_rollup(ts_us, values)
+            max_put = max(max_put, time.perf_counter() - t_put)
+        await storage.flush()
+        await asyncio.sleep(0.2)  # deixa o writer expirar o que venceu
+        sizes.append(os.path.getsize(db_path))
+    elapsed = time.perf_counter() - t
+    partitions = len(storage.partitions.tables(RAW))
+    await storage.close()
+    return {
+        "sizes": sizes,
+        "drops_ms": storage.drops_ms,
+        "max_put_ms": max_put * 1e3,
+        "rows": args.days * per_day * args.series,
+        "elapsed": elapsed,
+        "partitions": partitions,
+    }
+
+
+def delete_baseline(args, db_path: str) -> float:
+    """Tabela única com retention+1 dias: tempo do DELETE do dia mais antigo."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE var_history (series_id INTEGER NOT NULL, ts INTEGER NOT NULL, value REAL, extra TEXT, "
+        "PRIMARY KEY (series_id, ts)) WITHOUT ROWID"
+    )
+    rnd = random.Random(1)
+    per_day = int(86400 / args.period)
+    for day in range(args.retention + 1):
+        rows = [
+            (sid, to_epoch_us(T0) + day * DAY_US + round(k * args.period * 1e6), 220.0 + rnd.uniform(-2, 2), None)
+            for k in range(per_day) for sid in range(args.series)
+        ]
+        conn.executemany("INSERT INTO var_history VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    t = time.perf_counter()
+    conn.execute("DELETE FROM var_history WHERE ts < ?", (to_epoch_us(T0) + DAY_US,))
+    conn.commit()
+    elapsed = (time.perf_counter() - t) * 1e3
+    conn.close()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=8)
+    parser.add_argument("--retention", type=int, default=3, help="Days kept for every class")
+    parser.add_argument("--period", type=float, default=10.0, help="Seconds between samples")
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--delete-baseline", action="store_true", help="Also time a one-day DELETE on a single table")
+    args = parser.parse_args()
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        res = asyncio.run(run(args, os.path.join(workdir, "retention.sqlite")))
+        delete_ms = delete_baseline(args, os.path.join(workdir, "single.sqlite")) if args.delete_baseline else None
+
+    print(f"rows           {res['rows']}  ({res['rows'] / res['elapsed']:.0f} rows/s)")
+    print(f"partitions     {res['partitions']} raw partitions left (retention {args.retention} days)")
+    for day, size in enumerate(res["sizes"], 1):
+        print(f"day {day:>3}        size_mb {size / 1e6:8.2f}")
+    drops = res["drops_ms"]
+    if drops:
+        print(f"drops          {len(drops)}  drop_ms avg {sum(drops) / len(drops):.2f} max {max(drops):.2f}")
+    print(f"max_put_ms     {res['max_put_ms']:.2f}")
+    if delete_ms is not None:
+        print(f"delete_ms      {delete_ms:.2f} (one day from a single table)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# scripts/bench_rollup.py
+"""
+Rollup benchmark: 30-day trend query from var_rollup vs scanning var_history.
+
+Fills a fresh DB through Storage with --days of samples every --period seconds
+for --series variables (raw rows + rollups, the same items the server enqueues),
+then answers a HistoryRead(Processed) Average at 1 h intervals for one series
+with HistorySQLite.read_processed (served from var_rollup) and with the
+equivalent GROUP BY over var_history (both spread over daily partitions).
+
+Reported:
+  write_s                 time to persist everything (--write-baseline: also without rollup upkeep)
+  rows_rollup / rows_raw  rows each query reads
+  query_ms                latency of each query
+
+Usage:
+  poetry run python scripts/bench_rollup.py
+  poetry run python scripts/bench_rollup.py --days 7 --period 5 --series 3 --write-baseline
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from asyncua import ua  # noqa: E402
+from src.history_sqlite import AVERAGE, HistorySQLite  # noqa: E402
+from src.migrations import to_epoch_us  # noqa: E402
+from src.partitions import RAW, ROLLUP  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def fill(db_path: str, days: int, period: float, n_series: int, rollup: bool) -> tuple:
+    storage = Storage(db_path)
+    await storage.init()
+    sids = [await storage.series_id(f"Motor.Electrical.Var{i}") for i in range(n_series)]
+    rnd = random.Random(1)
+    n = int(days * 86400 / period)
+    t = time.perf_counter()
+    for k in range(n):
+        ts_us = to_epoch_us(T0) + round(k * period * 1e6)
+        values = [(sid, 220.0 + rnd.uniform(-2, 2)) for sid in sids]
+        await storage.add_samples([(sid, ts_us / 1e6, v) for sid, v in values])
+        if rollup:
+            await storage.add_rollup(ts_us, values)
+    await storage.flush()
+    elapsed = time.perf_counter() - t
+    return storage, sids, elapsed, n * n_series
+
+
+async def run(args) -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        write_raw_s = None
+        if args.write_baseline:
+            raw_storage, _, write_raw_s, _ = await fill(
+                os.path.join(workdir, "raw.sqlite"), args.days, args.period, args.series, False
+            )
+            await raw_storage.close()
+        storage, sids, write_s, samples = await fill(
+            os.path.join(workdir, "bench.sqlite"), args.days, args.period, args.series, True
+        )
+        history = HistorySQLite(storage)
+        await history.init()
+        node = ua.NodeId(1, 2)
+        history.bind_series(node, sids[0])
+
+        end = T0 + timedelta(days=args.days)
+        t = time.perf_counter()
+        values, _ = await history.read_processed(node, T0, end, 3600_000, AVERAGE)
+        rollup_ms = (time.perf_counter() - t) * 1e3
+
+        lo, hi = to_epoch_us(T0), to_epoch_us(end)
+        parts = storage.partitions
+        conn = sqlite3.connect(storage.db_path)
+        rows_rollup = sum(conn.execute(
+            f'SELECT COUNT(*) FROM "{table}" WHERE resolution = 3600 AND series_id = ? AND bucket >= ? AND bucket < ?',
+            (sids[0], lo, hi),
+        ).fetchone()[0] for table in parts.overlapping(ROLLUP, lo, hi - 1))
+        t = time.perf_counter()
+        raw = []
+        for table in parts.overlapping(RAW, lo, hi - 1):
+            # Partições de 1 dia guardam horas inteiras: cada GROUP BY fecha suas horas
+            raw.extend(conn.execute(
+                f'SELECT (ts - ?) / 3600000000 AS h, AVG(value) FROM "{table}" '
+                "WHERE series_id = ? AND ts >= ? AND ts < ? GROUP BY h ORDER BY h",
+                (lo, sids[0], lo, hi),
+            ))
+        raw_ms = (time.perf_counter() - t) * 1e3
+        rows_raw = sum(conn.execute(
+            f'SELECT COUNT(*) FROM "{table}" WHERE series_id = ? AND ts >= ? AND ts < ?', (sids[0], lo, hi)
+        ).fetchone()[0] for table in parts.overlapping(RAW, lo, hi - 1))
+        conn.close()
+
+        worst = max(abs(dv.Value.Value - avg) for dv, (_, avg) in zip(values, raw))
+        assert len(values) == len(raw) and worst < 1e-9, "rollup average diverged from var_history"
+        await history.stop()
+        await storage.close()
+
+    print(f"samples        {samples}")
+    if write_raw_s is None:
+        print(f"write_s        {write_s:.2f}")
+    else:
+        print(f"write_s        {write_s:.2f} (raw only {write_raw_s:.2f}, +{(write_s / write_raw_s - 1) * 100:.0f}% for rollups)")
+    print(f"intervals      {len(values)}")
+    print(f"rows_rollup    {rows_rollup:>10}   query_ms {rollup_ms:8.2f}")
+    print(f"rows_raw       {rows_raw:>10}   query_ms {raw_ms:8.2f}")
+    print(f"speedup        {raw_ms / rollup_ms:.0f}x")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--period", type=float, default=1.0, help="Seconds between samples")
+    parser.add_argument("--series", type=int, default=1)
+    parser.add_argument("--write-baseline", action="store_true", help="Also time the same load without rollups")
+    args = parser.parse_args()
+    logger.remove()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
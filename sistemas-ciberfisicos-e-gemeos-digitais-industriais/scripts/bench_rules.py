@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# scripts/bench_rules.py
+"""
+Alarm rule evaluation benchmark: vectorized AlarmEngine vs per-condition Python loop.
+
+Builds the rule table of N assets (model.VARIABLES + model.ALARM_RULES, no OPC UA
+server involved) and evaluates publish cycles in which every asset reports its
+electrical, environment and vibration payloads. --violations sets the share of
+samples pushed past their limits, which exercises the state machine path.
+The Python reference is the per-condition loop the engine replaced; both must
+produce the same transitions.
+
+Usage:
+  poetry run python scripts/bench_rules.py
+  poetry run python scripts/bench_rules.py --assets 1 100 1000 --cycles 20 --violations 0.01
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.alarms import ACKNOWLEDGED, ACTIVE, CLEARED, INACTIVE, RAISED, RETURNED, AlarmEngine  # noqa: E402
+from src.model import ALARM_HYSTERESIS, ALARM_RULES, SEVERITY, VARIABLES  # noqa: E402
+from src.registry import VarEntry  # noqa: E402
+
+NOMINAL = {"Voltage": 220.0, "Current": 9.5, "CaseTemperature": 40.0, "Axial": 0.1, "Radial": 0.12}
+
+
+class _Registry:
+    """Só o que AlarmEngine.add_asset usa de VariableRegistry (sem nós OPC UA)."""
+
+    def __init__(self, asset: str):
+        self.groups = {}
+        for group, name, field, key, low, high in VARIABLES:
+            e = VarEntry(name, group, f"{asset}.{group}.{name}", field, key, SimpleNamespace(nodeid=None), 0, low, high)
+            self.groups.setdefault(group, []).append(e)
+        self.groups = {g: tuple(es) for g, es in self.groups.items()}
+
+
+class PyCondition:
+    """Referência: a máquina de estados condição a condição, como era avaliada antes da tabela NumPy."""
+
+    def __init__(self, pos: int, side: str, limit: float, hysteresis: float, on_delay: float = 0.0, off_delay: float = 0.0):
+        self.pos, self.side, self.limit, self.hysteresis = pos, side, limit, hysteresis
+        self.on_delay, self.off_delay = on_delay, off_delay
+        self.state = INACTIVE
+        self._violating_since: Optional[float] = None
+        self._normal_since: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in (ACTIVE, ACKNOWLEDGED)
+
+    def update(self, value: float, ts: float) -> Optional[str]:
+        if self.side == "high":
+            violating, normal = value > self.limit, value < self.limit - self.hysteresis
+        else:
+            violating, normal = value < self.limit, value > self.limit + self.hysteresis
+
+        if not self.active:
+            if not violating:
+                self._violating_since = None
+                return None
+            if self._violating_since is None:
+                self._violating_since = ts
+            if ts - self._violating_since < self.on_delay:
+                return None
+            self.state, self._violating_since, self._normal_since = ACTIVE, None, None
+            return RAISED
+
+        if not normal:
+            self._normal_since = None
+            return None
+        if self._normal_since is None:
+            self._normal_since = ts
+        if ts - self._normal_since < self.off_delay:
+            return None
+        self.state = INACTIVE if self.state == ACKNOWLEDGED else CLEARED
+        self._normal_since = None
+        return RETURNED
+
+
+def build(n_assets: int):
+    engine = AlarmEngine()
+    py = {}
+    for i in range(n_assets):
+        asset = f"Motor{i:04d}"
+        reg = _Registry(asset)
+        engine.add_asset(asset, reg, ALARM_RULES, SEVERITY, hysteresis=ALARM_HYSTERESIS)
+        for group, entries in reg.groups.items():
+            conds = []
+            for var, side, *_ in ALARM_RULES:
+                for pos, e in enumerate(entries):
+                    if e.name == var:
+                        limit = e.high if side == "high" else e.low
+                        conds.append(PyCondition(pos, side, limit, abs(limit) * ALARM_HYSTERESIS))
+            py[(asset, group)] = conds
+    engine.compile()
+    return engine, py
+
+
+def cycles_of(n_assets: int, cycles: int, violations: float, seed: int = 7):
+    rnd = random.Random(seed)
+    out = []
+    for c in range(cycles):
+        blocks = []
+        for i in range(n_assets):
+            asset = f"Motor{i:04d}"
+            for group in ("Electrical", "Environment", "Vibration"):
+                values = []
+                for g, name, *_ in VARIABLES:
+                    if g != group:
+                        continue
+                    base = next((v for k, v in NOMINAL.items() if name.startswith(k)), 1.0)
+                    bump = 1.3 if rnd.random() < violations else 1.0
+                    values.append(base * bump * (1 + rnd.uniform(-0.01, 0.01)))
+                blocks.append((asset, group, values, float(c * 5)))
+        out.append(blocks)
+    return out
+
+
+def as_engine_blocks(engine: AlarmEngine, cycles):
+    """Blocos no formato de AlarmEngine.evaluate (o servidor já os produz assim por payload)."""
+    return [[(engine.block_id(a, g), values, ts) for a, g, values, ts in blocks] for blocks in cycles]
+
+
+def run_python(py, cycles) -> List[str]:
+    out = []
+    for blocks in cycles:
+        for asset, group, values, ts in blocks:
+            for cond in py[(asset, group)]:
+                t = cond.update(values[cond.pos], ts)
+                if t is not None:
+                    out.append(t)
+    return out
+
+
+def run_vectorized(engine: AlarmEngine, cycles) -> List[str]:
+    out = []
+    for blocks in cycles:
+        out.extend(t for _c, t in engine.evaluate(blocks))
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--violations", type=float, default=0.01, help="Share of samples beyond their limits")
+    args = parser.parse_args()
+
+    print(f"{'assets':>7} {'rules':>7} {'python ms/cycle':>16} {'numpy ms/cycle':>15} {'speedup':>8} {'transitions':>12}")
+    for n in args.assets:
+        cycles = cycles_of(n, args.cycles, args.violations)
+        engine, py = build(n)
+        engine_cycles = as_engine_blocks(engine, cycles)
+
+        t0 = time.perf_counter()
+        ref = run_python(py, cycles)
+        t_py = (time.perf_counter() - t0) / args.cycles
+
+        t0 = time.perf_counter()
+        got = run_vectorized(engine, engine_cycles)
+        t_np = (time.perf_counter() - t0) / args.cycles
+
+        assert sorted(ref) == sorted(got), "vectorized engine diverged from the reference"
+        print(f"{n:>7} {len(engine.conditions):>7} {t_py * 1e3:>16.3f} {t_np * 1e3:>15.3f} {t_py / t_np:>7.2f}x {len(got):>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
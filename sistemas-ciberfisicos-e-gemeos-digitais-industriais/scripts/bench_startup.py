@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# scripts/bench_startup.py
+"""
+Startup benchmark: time from launching the server until a client reads a value.
+
+For each --assets count (1 = the single Motor50CV tree; more = a generated
+FLEET_CONFIG), runs the real server (python -m src.server) against a fresh temp
+DB, with its own OPCUA_ASPACE_CACHE directory and the in-process broker from
+scripts/mqtt_broker.py. The first start is cold (empty DB, no cached standard
+address space); the next --runs starts reuse both, as a restart would. Each
+start is timed from spawning the process (interpreter and imports included)
+until an asyncua client connects and reads VoltageA of the last asset; the
+server is then stopped with SIGINT.
+
+Reported per asset count:
+  cold_s      first start
+  warm_s      median of the restarts
+  server_s    median of the startup total the server logs ("Startup em ..."),
+              from main() until the endpoint listens; the phases of the last
+              restart are shown too (port check, storage, opcua, nodes, ...)
+
+Results go to --output as JSON; with --baseline an earlier result file is
+compared and the run fails (exit 1) when a time grows by more than --tolerance
+percent.
+
+Usage:
+  poetry run python scripts/bench_startup.py
+  poetry run python scripts/bench_startup.py --assets 1,100,500 --runs 5
+  poetry run python scripts/bench_startup.py --output startup_new.json --baseline startup_old.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from loguru import logger  # noqa: E402
+
+from asyncua import Client  # noqa: E402
+from bench_fleet import free_tcp_port  # noqa: E402
+from mqtt_broker import Broker  # noqa: E402
+from src.fleet import asset_specs  # noqa: E402
+
+NAMESPACE = "http://scgdi.local/motor50cv"
+READY_TIMEOUT_S = 180.0
+POLL_S = 0.02
+STARTUP_RE = re.compile(r"Startup em ([\d.]+) s \((.*)\)")
+
+# Métricas comparadas com --baseline (todas: menor é melhor)
+COMPARED = ("cold_s", "warm_s")
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def git_rev() -> str:
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT)
+    return out.stdout.strip() or "unknown"
+
+
+def server_startup(log_path: str) -> tuple:
+    """Total e fases da última linha "Startup em ..." do log do servidor (None sem a linha)."""
+    with open(log_path, errors="replace") as f:
+        found = STARTUP_RE.findall(f.read())
+    if not found:
+        return None, {}
+    total, phases = found[-1]
+    return float(total), {k: int(v) for k, v in re.findall(r"(\w+) (\d+) ms", phases)}
+
+
+async def read_when_ready(url: str, asset: str, deadline: float) -> None:
+    """Conecta e lê Electrical/VoltageA do ativo; repete até o servidor responder."""
+    while True:
+        client = Client(url, timeout=5)
+        try:
+            await client.connect()
+        except (OSError, asyncio.TimeoutError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(POLL_S)
+            continue
+        try:
+            idx = await client.get_namespace_index(NAMESPACE)
+            node = await client.nodes.objects.get_child([f"{idx}:{asset}", f"{idx}:Electrical", f"{idx}:VoltageA"])
+            await client.read_attributes([node])
+            return
+        finally:
+            await client.disconnect()
+
+
+async def start_once(env: Dict[str, str], url: str, asset: str, log_path: str) -> dict:
+    t0 = time.perf_counter()
+    with open(log_path, "wb") as log:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "src.server", cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+    try:
+        ready = asyncio.create_task(read_when_ready(url, asset, time.monotonic() + READY_TIMEOUT_S))
+        exited = asyncio.create_task(proc.wait())
+        await asyncio.wait([ready, exited], return_when=asyncio.FIRST_COMPLETED)
+        if not ready.done():
+            ready.cancel()
+            raise RuntimeError(f"server exited with {proc.returncode} before serving (see {log_path})")
+        exited.cancel()
+        await ready
+        ready_s = time.perf_counter() - t0
+    finally:
+        if proc.returncode is None:
+            proc.send_signal(signal.SIGINT)  # encerramento normal: grava o snapshot last_value
+            try:
+                await asyncio.wait_for(proc.wait(), 60)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+    server_s, phases = server_startup(log_path)
+    return {"ready_s": ready_s, "server_s": server_s, "phases": phases}
+
+
+async def run_assets(n: int, args, workdir: str, broker: Broker) -> dict:
+    cfg_path = ""
+    if n > 1:
+        cfg_path = os.path.join(workdir, "fleet.json")
+        with open(cfg_path, "w") as f:
+            json.dump({"assets": [f"Motor{i:04d}" for i in range(n)]}, f)
+    last_asset = [name for name, _ in asset_specs(cfg_path)][-1]
+    url = f"opc.tcp://127.0.0.1:{free_tcp_port()}/scgdi/startup"
+    env = dict(
+        os.environ, FLEET_CONFIG=cfg_path, DB_PATH=os.path.join(workdir, "startup.sqlite"), OPCUA_ENDPOINT=url,
+        OPCUA_ASPACE_CACHE=os.path.join(workdir, "aspace"), LDS_ENDPOINT="",
+        MQTT_HOST="127.0.0.1", MQTT_PORT=str(broker.port), MQTT_CLIENT_ID=f"scgdi-startup-{n}",
+    )
+    starts = []
+    for k in range(1 + args.runs):
+        r = await start_once(env, url, last_asset, os.path.join(workdir, f"server{k}.log"))
+        starts.append(r)
+        print(f"  {n:>5} assets  {'cold' if k == 0 else 'warm'}  ready {r['ready_s']:.2f} s"
+              + (f"  (server {r['server_s']:.2f} s)" if r["server_s"] is not None else ""))
+    warm = starts[1:]
+    server = [r["server_s"] for r in warm if r["server_s"] is not None]
+    return {
+        "cold_s": round(starts[0]["ready_s"], 3),
+        "warm_s": round(statistics.median(r["ready_s"] for r in warm), 3) if warm else None,
+        "server_cold_s": starts[0]["server_s"],
+        "server_s": round(statistics.median(server), 3) if server else None,
+        "phases_ms": warm[-1]["phases"] if warm else starts[0]["phases"],
+    }
+
+
+async def run(args, workdir: str) -> Dict[str, dict]:
+    broker = await Broker("127.0.0.1", 0).start()
+    try:
+        results = {}
+        for n in args.assets:
+            sub = os.path.join(workdir, str(n))
+            os.makedirs(sub)
+            results[str(n)] = await run_assets(n, args, sub, broker)
+        return results
+    finally:
+        await broker.stop()
+
+
+def compare(results: Dict[str, dict], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path) as f:
+        base = json.load(f)
+    print(f"baseline       {baseline_path} (git {base.get('git', '?')})")
+    ok = True
+    for n, res in results.items():
+        old_res = base["results"].get(n, {})
+        for key in COMPARED:
+            old, new = old_res.get(key), res.get(key)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old * 100
+            flag = "REGRESSION" if delta > tolerance else ""
+            ok = ok and not flag
+            print(f"  {n:>5} {key:10} {old:>8} -> {new:>8} ({delta:+.1f}%) {flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", default="1,500", help="Comma-separated asset counts")
+    parser.add_argument("--runs", type=int, default=3, help="Restarts after the cold start")
+    parser.add_argument("--output", default="bench_startup.json", help="JSON results file")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=10, help="Allowed regression vs --baseline (%%)")
+    args = parser.parse_args()
+    args.assets = [int(n) for n in args.assets.split(",")]
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, workdir))
+
+    report = {
+        "benchmark": "startup",
+        "timestamp": now_iso(),
+        "git": git_rev(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for n, res in results.items():
+        print(f"{n} asset(s)")
+        for key, value in res.items():
+            print(f"  {key:14} {value}")
+    print(f"saved          {args.output}")
+    if args.baseline:
+        return 0 if compare(results, args.baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# scripts/bench_wal.py
+"""
+WAL benchmark: ingest latency while history queries run on the reader pool.
+
+Fills a fresh DB with --hours of samples for the 19 motor variables, then for
+--seconds keeps ingesting one payload (19 samples) every --period seconds while
+--readers tasks loop over long HistoryRead(Raw) queries (the whole filled range
+of one series, with the in-memory ring buffers off so every read hits SQLite).
+The same run is repeated with the rollback journal (journal_mode=DELETE) for
+comparison: there a reader holding its SHARED lock stalls the writer's commit.
+
+Reported per mode:
+  commit_ms p50/p99/max   time the writer spent in each batch (executemany + commit)
+  max_put_ms              worst wait of the producer on Storage (ingest stall)
+  reads                   HistoryReads completed during the window
+  wal frames              WAL pages left after a final PASSIVE checkpoint
+
+Usage:
+  poetry run python scripts/bench_wal.py
+  poetry run python scripts/bench_wal.py --hours 24 --seconds 20 --readers 4
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from asyncua import ua  # noqa: E402
+from bench_deadband import PUBLISHER  # noqa: E402
+from src.history_sqlite import HistorySQLite  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+
+class TimedStorage(Storage):
+    """Storage que mede cada lote do writer."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commits_ms = []
+
+    async def _write_batch(self, batch):
+        t = time.perf_counter()
+        await super()._write_batch(batch)
+        self.commits_ms.append((time.perf_counter() - t) * 1e3)
+
+
+def payload(rnd: random.Random):
+    return [nominal + rnd.uniform(-noise, noise) for nominal, noise in PUBLISHER.values()]
+
+
+async def run(args, db_path: str, journal: str) -> dict:
+    rnd = random.Random(11)
+    now = datetime.now(timezone.utc)
+    t0 = now - timedelta(hours=args.hours)
+    storage = TimedStorage(
+        db_path, journal_mode=journal, readers=args.readers, recent_samples=0, checkpoint_interval=1.0
+    )
+    await storage.init()
+    sids = [await storage.series_id(f"Motor50CV.Var.{name}") for name in PUBLISHER]
+    base = t0.timestamp()
+    for k in range(int(args.hours * 3600)):
+        await storage.add_samples([(sid, base + k, v) for sid, v in zip(sids, payload(rnd))])
+    await storage.flush()
+    storage.commits_ms.clear()
+
+    history = HistorySQLite(storage, max_page_size=10**9)
+    node = ua.NodeId(1, 2)
+    history.bind_series(node, sids[0])
+    reads = 0
+    stop = asyncio.Event()
+
+    async def reader():
+        nonlocal reads
+        while not stop.is_set():
+            await history.read_node_history(node, t0, now, 0)
+            reads += 1
+
+    tasks = [asyncio.create_task(reader()) for _ in range(args.readers)]
+    max_put = 0.0
+    end = time.perf_counter() + args.seconds
+    ts = now.timestamp()
+    while time.perf_counter() < end:
+        ts += args.period
+        t = time.perf_counter()
+        await storage.add_samples([(sid, ts, v) for sid, v in zip(sids, payload(rnd))])
+        max_put = max(max_put, time.perf_counter() - t)
+        await asyncio.sleep(args.period)
+    stop.set()
+    await asyncio.gather(*tasks)
+    await storage.flush()
+    commits = sorted(storage.commits_ms)
+    frames = (await storage.checkpoint())[1] if journal == "WAL" else None
+    await storage.close()
+    return {
+        "p50": statistics.median(commits),
+        "p99": commits[min(len(commits) - 1, int(len(commits) * 0.99))],
+        "max": commits[-1],
+        "max_put_ms": max_put * 1e3,
+        "reads": reads,
+        "frames": frames,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=6, help="History filled before the test (1 s samples)")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of concurrent ingest + reads")
+    parser.add_argument("--period", type=float, default=0.01, help="Seconds between ingested payloads")
+    parser.add_argument("--readers", type=int, default=2, help="Concurrent HistoryRead loops (= reader pool size)")
+    args = parser.parse_args()
+    logger.remove()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for journal in ("WAL", "DELETE"):
+            results[journal] = asyncio.run(run(args, os.path.join(workdir, f"{journal}.sqlite"), journal))
+
+    print(f"ingest         {len(PUBLISHER)} samples every {args.period:g} s for {args.seconds:g} s, "
+          f"{args.readers} readers over {args.hours:g} h of history")
+    print(f"{'journal':10} {'commit_ms p50':>14} {'p99':>8} {'max':>8} {'max_put_ms':>11} {'reads':>6}")
+    for journal, r in results.items():
+        print(f"{journal:10} {r['p50']:>14.2f} {r['p99']:>8.2f} {r['max']:>8.2f} {r['max_put_ms']:>11.2f} {r['reads']:>6}")
+    if results["WAL"]["frames"] is not None:
+        print(f"wal frames     {results['WAL']['frames']} left after the last checkpoint")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
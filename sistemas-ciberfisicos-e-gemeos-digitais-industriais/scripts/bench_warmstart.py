@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# scripts/bench_warmstart.py
+"""
+Warm-start benchmark: restoring every variable's last value at server startup.
+
+Builds a history for --assets motors (19 variables each, --hours of samples
+every --period seconds in var_history) plus the last_value snapshot the server
+keeps, then times the two ways of getting the latest value of every variable:
+
+  snapshot_ms     Storage.last_values(): one scan of last_value (what init() does)
+  per_series_ms   one "newest row" query per variable on var_history, newest
+                  partition first (what a restore without the snapshot would do)
+  restore_ms      (--opcua) the bulk Write of the restored values into a real
+                  address space, as MotorOPCUAServer._restore_last_values
+
+Usage:
+  poetry run python scripts/bench_warmstart.py
+  poetry run python scripts/bench_warmstart.py --assets 500 --hours 2 --opcua
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loguru import logger  # noqa: E402
+
+from src.migrations import to_epoch_us  # noqa: E402
+from src.model import VARIABLES  # noqa: E402
+from src.partitions import OVERLAPPING_PARTITIONS_SQL, RAW  # noqa: E402
+from src.storage import Storage  # noqa: E402
+
+NEWEST_SQL = 'SELECT ts, value FROM "{table}" WHERE series_id = ? ORDER BY ts DESC LIMIT 1'
+
+
+async def build(storage: Storage, args) -> list:
+    sids = [
+        await storage.series_id(f"Motor{n:04d}.{group}.{name}")
+        for n in range(args.assets) for group, name, *_ in VARIABLES
+    ]
+    rnd = random.Random(1)
+    now_us = to_epoch_us(time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()))
+    period_us = int(args.period * 1e6)
+    steps = int(args.hours * 3600 / args.period)
+    for k in range(steps):
+        ts_us = now_us - (steps - k) * period_us
+        await storage.add_bulk([(sid, ts_us, 220.0 + rnd.uniform(-2, 2)) for sid in sids])
+    await storage.flush()
+    await storage.save_last_values([(sid, now_us - period_us, 220.0) for sid in sids])
+    await storage.flush()
+    return sids
+
+
+async def per_series(storage: Storage, sids: list) -> dict:
+    out = {}
+    async with storage.readers.snapshot() as db:
+        async with db.execute(OVERLAPPING_PARTITIONS_SQL.format(order="DESC"), (RAW, 2**62, -(2**62))) as cur:
+            tables = [name for (name,) in await cur.fetchall()]
+        for sid in sids:
+            for table in tables:
+                async with db.execute(NEWEST_SQL.format(table=table), (sid,)) as cur:
+                    row = await cur.fetchone()
+                if row is not None:
+                    out[sid] = row
+                    break
+    return out
+
+
+async def restore_opcua(snapshot: dict) -> float:
+    """Address space com uma variável por série e o Write em lote do warm start."""
+    from asyncua import Server, ua
+
+    from src.migrations import from_epoch_us
+
+    server = Server()
+    await server.init()
+    idx = await server.register_namespace("http://scgdi.local/bench")
+    folder = await server.nodes.objects.add_object(idx, "Bench")
+    nodes = {sid: await folder.add_variable(idx, f"v{sid}", 0.0) for sid in snapshot}
+    t = time.perf_counter()
+    params = ua.WriteParameters()
+    status = ua.StatusCode(ua.StatusCodes.UncertainLastUsableValue)
+    for sid, (ts_us, value) in snapshot.items():
+        params.NodesToWrite.append(ua.WriteValue(
+            NodeId_=nodes[sid].nodeid,
+            AttributeId=ua.AttributeIds.Value,
+            Value=ua.DataValue(ua.Variant(value, ua.VariantType.Double), StatusCode_=status, SourceTimestamp=from_epoch_us(ts_us)),
+        ))
+    await server.iserver.attribute_service.write(params)
+    return (time.perf_counter() - t) * 1e3
+
+
+async def run(args, db_path: str):
+    storage = Storage(db_path, recent_samples=0, batch_size=50_000)
+    await storage.init()
+    try:
+        t = time.perf_counter()
+        sids = await build(storage, args)
+        print(f"[BUILD] {len(sids)} series, {args.hours} h every {args.period} s in {time.perf_counter() - t:.1f} s")
+
+        t = time.perf_counter()
+        snapshot = await storage.last_values()
+        snapshot_ms = (time.perf_counter() - t) * 1e3
+        t = time.perf_counter()
+        latest = await per_series(storage, sids)
+        per_series_ms = (time.perf_counter() - t) * 1e3
+        print(f"  snapshot_ms    {snapshot_ms:.1f}  ({len(snapshot)} values)")
+        print(f"  per_series_ms  {per_series_ms:.1f}  ({len(latest)} values, {per_series_ms / max(snapshot_ms, 1e-6):.0f}x)")
+    finally:
+        await storage.close()
+    if args.opcua:
+        print(f"  restore_ms     {await restore_opcua(snapshot):.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--period", type=float, default=10.0, help="Sample period (s)")
+    parser.add_argument("--opcua", action="store_true", help="Also time the bulk Write into an asyncua address space")
+    args = parser.parse_args()
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, os.path.join(tmp, "warmstart.sqlite")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,6 +4,13 @@
 Check SQLite persistence for SCGDI:
 - var_history: latest variables
 - event_history: latest events
+- var_rollup: row counts per resolution
+- var_chunks: sealed blocks and the samples they hold
+- partitions: tables and time range per class (schema v5)
+
+Opens the DB read-only and runs each refresh inside one read transaction, so
+every section comes from the same snapshot; in WAL mode this never blocks
+(or waits for) the server's writer.
 
 Usage:
   poetry run python scripts/check_db.py
@@ -15,43 +22,71 @@ from __future__ import annotations
 import argparse
 import os
 import sqlite3
+import sys
 import time
 from typing import Optional
 
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.migrations import SCHEMA_VERSION, from_epoch_us, needs_migration, to_epoch_us  # noqa: E402
+from src.partitions import CHUNKS, CLASSES, EVENTS, RAW, ROLLUP, PartitionCatalog, load_catalog  # noqa: E402
+from src.sqlite_pool import connect_readonly, snapshot  # noqa: E402
+
 def get_db_path() -> str:
     load_dotenv()
     return os.getenv("DB_PATH", "./scgdi_history.sqlite")
 
-def ensure_tables(conn: sqlite3.Connection) -> tuple[bool, bool]:
+def ensure_tables(conn: sqlite3.Connection) -> bool:
     cur = conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
     names = {r[0] for r in cur.fetchall()}
-    return ("var_history" in names, "event_history" in names)
-
-def print_vars(conn: sqlite3.Connection, limit: int, since: Optional[str]) -> None:
-    q = """SELECT ts, path, value FROM var_history {} ORDER BY ts DESC LIMIT ?"""
-    filt = f"WHERE ts >= '{since}'" if since else ""
-    for row in conn.execute(q.format(filt), (limit,)):
-        ts, path, value = row
-        print(f"[VAR] {ts} | {path:<64} | {value}")
-
-def print_events(conn: sqlite3.Connection, limit: int, since: Optional[str]) -> None:
-    q = """SELECT ts, category, severity, message FROM event_history {} ORDER BY ts DESC LIMIT ?"""
-    filt = f"WHERE ts >= '{since}'" if since else ""
-    for row in conn.execute(q.format(filt), (limit,)):
-        ts, cat, sev, msg = row
+    return bool(names & {"partitions", "var_history", "event_history"})
+
+def newest_first(conn: sqlite3.Connection, catalog: PartitionCatalog, cls: str, query: str, params: tuple, limit: int):
+    """Rows of `query` ({table}, ends with LIMIT ?) over the partitions of `cls`, newest partition first."""
+    out = []
+    for table in reversed(catalog.tables(cls)):
+        out.extend(conn.execute(query.format(table=table), (*params, limit - len(out))))
+        if len(out) >= limit:
+            break
+    return out
+
+def print_vars(conn: sqlite3.Connection, catalog: PartitionCatalog, limit: int, since: Optional[str]) -> None:
+    q = """SELECT v.ts, s.path, v.value FROM "{table}" v JOIN series s ON s.id = v.series_id
+           WHERE v.ts >= ? ORDER BY v.ts DESC LIMIT ?"""
+    since_us = to_epoch_us(since) if since else 0
+    for ts, path, value in newest_first(conn, catalog, RAW, q, (since_us,), limit):
+        print(f"[VAR] {from_epoch_us(ts).isoformat()} | {path:<64} | {value}")
+
+def print_events(conn: sqlite3.Connection, catalog: PartitionCatalog, limit: int, since: Optional[str]) -> None:
+    q = """SELECT ts, category, severity, message FROM "{table}" WHERE ts >= ? ORDER BY ts DESC LIMIT ?"""
+    for ts, cat, sev, msg in newest_first(conn, catalog, EVENTS, q, (since or "",), limit):
         print(f"[EVT] {ts} | {cat:<24} | sev={sev:<3} | {msg}")
 
-def print_counts(conn: sqlite3.Connection) -> None:
-    cur = conn.cursor()
-    v = cur.execute("SELECT count(*) FROM var_history").fetchone()[0]
-    e = cur.execute("SELECT count(*) FROM event_history").fetchone()[0]
-    print(f"\n[COUNT] var_history={v}  event_history={e}")
+def print_counts(conn: sqlite3.Connection, catalog: PartitionCatalog) -> None:
+    def total(cls: str, select: str = "count(*)") -> int:
+        return sum(conn.execute(f'SELECT {select} FROM "{t}"').fetchone()[0] or 0 for t in catalog.tables(cls))
+
+    print(f"\n[COUNT] var_history={total(RAW)}  event_history={total(EVENTS)}")
+    if catalog.tables(CHUNKS):
+        print(f"[COUNT] var_chunks={total(CHUNKS)} blocks, {total(CHUNKS, 'sum(samples)')} samples")
+    for res in sorted({r for t in catalog.tables(ROLLUP) for (r,) in conn.execute(f'SELECT DISTINCT resolution FROM "{t}"')}):
+        print(f"[COUNT] var_rollup {res}s={total(ROLLUP, f'sum(resolution = {res})')}")
     print("[COUNT] by severity:")
-    for sev, c in conn.execute("SELECT severity, count(*) FROM event_history GROUP BY severity ORDER BY severity"):
-        print(f"  - {sev}: {c}")
+    by_sev: dict[int, int] = {}
+    for t in catalog.tables(EVENTS):
+        for sev, c in conn.execute(f'SELECT severity, count(*) FROM "{t}" GROUP BY severity'):
+            by_sev[sev] = by_sev.get(sev, 0) + c
+    for sev in sorted(by_sev):
+        print(f"  - {sev}: {by_sev[sev]}")
+    print("[PARTITIONS]")
+    for cls in CLASSES:
+        rows = conn.execute(
+            "SELECT count(*), min(start_us), max(end_us) FROM partitions WHERE class = ?", (cls,)
+        ).fetchone()
+        if rows[0]:
+            print(f"  - {cls}: {rows[0]} tables, {from_epoch_us(rows[1]).isoformat()} .. {from_epoch_us(rows[2]).isoformat()}")
 
 def main() -> int:
     parser = argparse.ArgumentParser()
@@ -62,11 +97,14 @@ def main() -> int:
     args = parser.parse_args()
 
     db_path = args.db or get_db_path()
-    conn = sqlite3.connect(db_path)
+    try:
+        conn = connect_readonly(db_path)
+    except sqlite3.OperationalError as exc:
+        print(f"[ERR] Cannot open {db_path}: {exc}")
+        return 2
 
     try:
-        has_vars, has_evts = ensure_tables(conn)
-        if not has_vars and not has_evts:
+        if not ensure_tables(conn):
             print(f"[ERR] No var_history/event_history in {db_path}. Is the server writing to this DB?")
             return 2
 
@@ -74,12 +112,17 @@ def main() -> int:
             os.system("clear")
             print(f"[DB] {db_path}")
             print("=" * 80)
-            if has_vars:
-                print_vars(conn, args.limit, args.since)
-            if has_evts:
+            with snapshot(conn):
+                if needs_migration(conn):
+                    print(f"[ERR] DB is behind schema v{SCHEMA_VERSION}; run scripts/migrate_db.py")
+                    return
+                # Recarregado a cada rodada (o servidor cria e expira partições),
+                # no mesmo snapshot das consultas
+                catalog = load_catalog(conn)
+                print_vars(conn, catalog, args.limit, args.since)
                 print()
-                print_events(conn, args.limit, args.since)
-            print_counts(conn)
+                print_events(conn, catalog, args.limit, args.since)
+                print_counts(conn, catalog)
 
         if args.watch > 0:
             while True:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# scripts/migrate_db.py
+"""
+Migrate an SCGDI history DB to the current schema, in place.
+
+v1 -> v2: var_history(path TEXT, ts TEXT) becomes series + var_history(series_id, ts µs)
+WITHOUT ROWID. Rows are moved in chunks; an interrupted run can simply be restarted.
+v2 -> v3: event_history.source is rewritten from repr(NodeId) to "ns=2;i=2" strings.
+v3 -> v4: var_rollup (1 min / 1 h min/max/sum/count) is created and filled from var_history.
+v4 -> v5: var_history, var_rollup and event_history are moved into time partitions
+(STORAGE_PARTITION_SPAN seconds each, default 1 day) and the single tables dropped.
+
+Per-node history tables left by asyncua's HistorySQLite ("2_3", "2_4", ...) are
+imported into series/var_history (by the node's path in the single-motor address
+space; samples already in var_history are not duplicated) and dropped. Tables
+that cannot be mapped to a variable are kept unless --drop-legacy is given.
+
+Usage:
+  poetry run python scripts/migrate_db.py
+  poetry run python scripts/migrate_db.py --db ./scgdi_history.sqlite --chunk 100000
+  poetry run python scripts/migrate_db.py --no-vacuum
+  poetry run python scripts/migrate_db.py --partition-span 3600
+  poetry run python scripts/migrate_db.py --drop-legacy
+"""
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.migrations import SCHEMA_VERSION, asyncua_tables, migrate, needs_migration  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", type=str, default=None, help="Path to sqlite DB (default: from .env DB_PATH)")
+    parser.add_argument("--chunk", type=int, default=50_000, help="Rows per transaction")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM after migrating")
+    parser.add_argument("--partition-span", type=int, default=None,
+                        help="Seconds per partition (default: STORAGE_PARTITION_SPAN or 86400)")
+    parser.add_argument("--drop-legacy", action="store_true",
+                        help="Drop asyncua history tables that cannot be imported")
+    args = parser.parse_args()
+
+    load_dotenv()
+    span = args.partition_span or int(os.getenv("STORAGE_PARTITION_SPAN", "86400"))
+    db_path = args.db or os.getenv("DB_PATH", "./scgdi_history.sqlite")
+    if not os.path.exists(db_path):
+        print(f"[ERR] {db_path} not found")
+        return 2
+
+    conn = sqlite3.connect(db_path)
+    try:
+        legacy = needs_migration(conn) or (args.drop_legacy and bool(asyncua_tables(conn)))
+    finally:
+        conn.close()
+    if not legacy:
+        print(f"[MIG] {db_path} already at schema v{SCHEMA_VERSION}; nothing to do.")
+        return 0
+
+    size_before = os.path.getsize(db_path)
+    rows = migrate(
+        db_path,
+        chunk_size=args.chunk,
+        vacuum=not args.no_vacuum,
+        progress=lambda n: print(f"[MIG] {n} rows migrated", end="\r"),
+        partition_span=span,
+        drop_legacy=args.drop_legacy,
+    )
+    size_after = os.path.getsize(db_path)
+    print(f"\n[MIG] {db_path}: {rows} rows -> schema v{SCHEMA_VERSION}")
+    print(f"[MIG] size {size_before / 1e6:.2f} MB -> {size_after / 1e6:.2f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# scripts/mqtt_broker.py
+"""
+Minimal in-process MQTT broker (3.1.1 and 5.0) for local runs and benchmarks.
+
+Enough of the protocol for the server's gmqtt client and src/publisher.py:
+CONNECT, SUBSCRIBE/UNSUBSCRIBE with '+' and '#' filters, PUBLISH at QoS 0/1/2
+(acknowledged, then delivered to subscribers at QoS 0), PINGREQ, DISCONNECT.
+No retained messages, sessions, wills or authentication (credentials are
+accepted as-is). Messages can also be injected from the same process with
+Broker.publish(), which skips the client socket of a publisher.
+
+Usage:
+  poetry run python scripts/mqtt_broker.py                # 127.0.0.1:1883
+  poetry run python scripts/mqtt_broker.py --host 0.0.0.0 --port 1884
+  MQTT_HOST=127.0.0.1 poetry run python -m src.publisher  # then point clients at it
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import struct
+from typing import Dict, List, Optional, Tuple
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+HIGH_WATER = 1 << 20  # bytes pendentes num cliente antes de aguardar o socket (backpressure)
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        n, byte = n >> 7, n & 0x7F
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _read_varint(buf, pos: int) -> Tuple[int, int]:
+    """(valor, posição seguinte); -1 se o buffer ainda não tem o número inteiro."""
+    value = shift = 0
+    while pos < len(buf):
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    return -1, pos
+
+
+def _string(buf, pos: int) -> Tuple[bytes, int]:
+    (n,) = struct.unpack_from("!H", buf, pos)
+    return bytes(buf[pos + 2:pos + 2 + n]), pos + 2 + n
+
+
+def _packet(kind: int, body: bytes, flags: int = 0) -> bytes:
+    return bytes((kind << 4 | flags,)) + _varint(len(body)) + body
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    f, t = topic_filter.split("/"), topic.split("/")
+    if t[0].startswith("$") and f[0] in ("+", "#"):
+        return False
+    for i, part in enumerate(f):
+        if part == "#":
+            return True
+        if i >= len(t) or (part != "+" and part != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+class _Session:
+    __slots__ = ("writer", "version", "filters", "client_id")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.version = 4
+        self.filters: List[str] = []
+        self.client_id = ""
+
+    def send(self, data: bytes):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+
+class Broker:
+    def __init__(self, host: str = "127.0.0.1", port: int = 1883):
+        self.host = host
+        self.port = port
+        self.received = 0   # PUBLISH recebidos (socket + publish())
+        self.delivered = 0  # cópias entregues a assinantes
+        self._sessions: List[_Session] = []
+        self._routes: Dict[str, List[_Session]] = {}  # tópico -> assinantes (cache)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self.subscribed = asyncio.Event()  # algum SUBSCRIBE chegou
+
+    async def start(self) -> "Broker":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for s in list(self._sessions):
+                s.writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def publish(self, topic: str, payload: bytes):
+        """Entrega `payload` aos assinantes de `topic` (QoS 0), como se um cliente o publicasse."""
+        self.received += 1
+        subs = self._routes.get(topic)
+        if subs is None:
+            subs = self._routes[topic] = [s for s in self._sessions if any(topic_matches(f, topic) for f in s.filters)]
+        if not subs:
+            return
+        t = topic.encode()
+        head = struct.pack("!H", len(t)) + t
+        for s in subs:
+            body = head + (b"\x00" if s.version == 5 else b"") + payload
+            s.send(_packet(PUBLISH, body))
+        self.delivered += len(subs)
+
+    async def drain(self):
+        """Aguarda os sockets dos assinantes com mais de HIGH_WATER bytes pendentes."""
+        for s in self._sessions:
+            transport = s.writer.transport
+            if transport.get_write_buffer_size() > HIGH_WATER and not s.writer.is_closing():
+                try:
+                    await s.writer.drain()
+                except ConnectionError:
+                    pass
+
+    def pending_bytes(self) -> int:
+        return sum(s.writer.transport.get_write_buffer_size() for s in self._sessions)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = _Session(writer)
+        buf = bytearray()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buf += data
+                pos = 0
+                while len(buf) - pos >= 2:
+                    length, start = _read_varint(buf, pos + 1)
+                    if length < 0 or start + length > len(buf):
+                        break
+                    header = buf[pos]
+                    if not self._handle(session, header >> 4, header & 0x0F, memoryview(buf)[start:start + length]):
+                        return
+                    pos = start + length
+                del buf[:pos]
+                if session.writer.transport.get_write_buffer_size() > HIGH_WATER:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if session in self._sessions:
+                self._sessions.remove(session)
+                self._routes.clear()
+            writer.close()
+
+    def _handle(self, s: _Session, kind: int, flags: int, body: memoryview) -> bool:
+        if kind == PUBLISH:
+            qos = (flags >> 1) & 0x03
+            topic, pos = _string(body, 0)
+            pid = None
+            if qos:
+                (pid,) = struct.unpack_from("!H", body, pos)
+                pos += 2
+            if s.version == 5:
+                n, pos = _read_varint(body, pos)
+                pos += n
+            self.publish(topic.decode(), bytes(body[pos:]))
+            if qos == 1:
+                s.send(_packet(PUBACK, struct.pack("!H", pid)))
+            elif qos == 2:
+                s.send(_packet(PUBREC, struct.pack("!H", pid)))
+        elif kind == PUBREL:
+            s.send(_packet(PUBCOMP, bytes(body[:2])))
+        elif kind == CONNECT:
+            _, pos = _string(body, 0)  # "MQTT"
+            s.version = body[pos]
+            pos += 4  # nível, flags, keepalive
+            if s.version == 5:
+                n, pos = _read_varint(body, pos)
+                pos += n
+            client_id, _ = _string(body, pos)
+            s.client_id = client_id.decode(errors="replace")
+            self._sessions.append(s)
+            s.send(_packet(CONNACK, b"\x00\x00\x00" if s.version == 5 else b"\x00\x00"))
+        elif kind == SUBSCRIBE:
+            (pid,) = struct.unpack_from("!H", body, 0)
+            pos = 2
+            if s.version == 5:
+                n, pos = _read_varint(body, pos)
+                pos += n
+            codes = bytearray()
+            while pos < len(body):
+                topic_filter, pos = _string(body, pos)
+                pos += 1  # opções / QoS pedido
+                s.filters.append(topic_filter.decode())
+                codes.append(0)  # QoS 0 concedido
+            self._routes.clear()
+            s.send(_packet(SUBACK, struct.pack("!H", pid) + (b"\x00" if s.version == 5 else b"") + bytes(codes), 0))
+            self.subscribed.set()
+        elif kind == UNSUBSCRIBE:
+            (pid,) = struct.unpack_from("!H", body, 0)
+            pos = 2
+            if s.version == 5:
+                n, pos = _read_varint(body, pos)
+                pos += n
+            count = 0
+            while pos < len(body):
+                topic_filter, pos = _string(body, pos)
+                if topic_filter.decode() in s.filters:
+                    s.filters.remove(topic_filter.decode())
+                count += 1
+            self._routes.clear()
+            tail = (b"\x00" + b"\x00" * count) if s.version == 5 else b""
+            s.send(_packet(UNSUBACK, struct.pack("!H", pid) + tail))
+        elif kind == PINGREQ:
+            s.send(_packet(PINGRESP, b""))
+        elif kind == DISCONNECT:
+            return False
+        return True
+
+
+async def _main(host: str, port: int):
+    broker = await Broker(host, port).start()
+    print(f"[MQTT] broker em {broker.host}:{broker.port}")
+    await asyncio.Event().wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
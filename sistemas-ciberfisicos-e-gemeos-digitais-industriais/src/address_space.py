@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import Any, List
+
+from asyncua import Node, Server, ua
+
+# Atributos dos nós do ativo: objetos emitem eventos com histórico; variáveis
+# graváveis e com HistoryRead
+EVENT_NOTIFIER = ua.EventNotifier.to_bitfield([ua.EventNotifier.SubscribeToEvents, ua.EventNotifier.HistoryRead])
+ACCESS_LEVEL = ua.AccessLevel.to_bitfield(
+    [ua.AccessLevel.CurrentRead, ua.AccessLevel.CurrentWrite, ua.AccessLevel.HistoryRead]
+)
+
+
+class NodeBatch:
+    """
+    Nós do namespace do servidor criados num único AddNodes, já com os atributos
+    finais (EventNotifier, AccessLevel, Historizing), em vez de um add_object /
+    add_variable por nó seguido de escritas de atributo uma a uma.
+
+    Os NodeIds são alocados pelo address space na ordem das chamadas, a mesma
+    numeração da criação nó a nó. add_object/add_variable devolvem o Node na
+    hora; ele só existe no servidor depois de `commit`.
+    """
+
+    def __init__(self, server: Server, idx: int):
+        self.server = server
+        self.idx = idx
+        self.items: List[ua.AddNodesItem] = []
+
+    def _item(self, parent: Node, name: str, node_class: ua.NodeClass, reference: int, type_definition: int):
+        item = ua.AddNodesItem()
+        item.RequestedNewNodeId = self.server.iserver.aspace.generate_nodeid(self.idx)
+        item.BrowseName = ua.QualifiedName(name, self.idx)
+        item.ParentNodeId = parent.nodeid
+        item.ReferenceTypeId = ua.NodeId(reference)
+        item.NodeClass = node_class
+        item.TypeDefinition = ua.NodeId(type_definition)
+        self.items.append(item)
+        return item
+
+    def add_object(
+        self, parent: Node, name: str, reference: int = ua.ObjectIds.HasComponent, event_notifier: int = EVENT_NOTIFIER
+    ) -> Node:
+        item = self._item(parent, name, ua.NodeClass.Object, reference, ua.ObjectIds.BaseObjectType)
+        attrs = ua.ObjectAttributes()
+        attrs.EventNotifier = event_notifier
+        attrs.Description = ua.LocalizedText(name)
+        attrs.DisplayName = ua.LocalizedText(name)
+        attrs.WriteMask = 0
+        attrs.UserWriteMask = 0
+        item.NodeAttributes = attrs
+        return self.server.get_node(item.RequestedNewNodeId)
+
+    def add_variable(
+        self, parent: Node, name: str, value: Any, varianttype: ua.VariantType = ua.VariantType.Double,
+        access_level: int = ACCESS_LEVEL, historizing: bool = True,
+    ) -> Node:
+        item = self._item(parent, name, ua.NodeClass.Variable, ua.ObjectIds.HasComponent, ua.ObjectIds.BaseDataVariableType)
+        attrs = ua.VariableAttributes()
+        attrs.Description = ua.LocalizedText(name)
+        attrs.DisplayName = ua.LocalizedText(name)
+        attrs.DataType = ua.NodeId(varianttype.value)
+        attrs.Value = ua.Variant(value, varianttype)
+        attrs.ValueRank = ua.ValueRank.Scalar
+        attrs.ArrayDimensions = None
+        attrs.WriteMask = 0
+        attrs.UserWriteMask = 0
+        attrs.Historizing = historizing
+        attrs.AccessLevel = access_level
+        attrs.UserAccessLevel = access_level
+        item.NodeAttributes = attrs
+        return self.server.get_node(item.RequestedNewNodeId)
+
+    async def commit(self):
+        """Cria todos os nós pendentes numa única chamada; falha no primeiro resultado ruim."""
+        items, self.items = self.items, []
+        results = await self.server.iserver.isession.add_nodes(items)
+        for result in results:
+            result.StatusCode.check()
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .registry import VarEntry, VariableRegistry
+
+# Estados de uma condição (modelo de AlarmConditionType: ActiveState x AckedState)
+INACTIVE = "Inactive"            # normal e reconhecida
+ACTIVE = "Active"                # em alarme, não reconhecida
+ACKNOWLEDGED = "Acknowledged"    # em alarme, reconhecida
+CLEARED = "Cleared"              # normalizou, mas ainda não foi reconhecida
+_INACTIVE, _ACTIVE, _ACKNOWLEDGED, _CLEARED = range(4)  # códigos em AlarmEngine.state
+
+# Transições devolvidas por AlarmEngine (uma por evento emitido)
+RAISED = "raised"
+RETURNED = "cleared"
+ACKED = "acknowledged"
+
+# Bloco de avaliação: valores de um payload (ordem de registry.groups[group]) e seu timestamp (epoch s);
+# o id do bloco vem de AlarmEngine.block_id(ativo, grupo)
+AlarmBlock = Tuple[int, Sequence[float], float]  # (id do bloco, valores, ts)
+
+# Abaixo deste nº de (payload, regra) por lote o custo fixo do NumPy supera o do laço em Python
+VECTOR_MIN_RULES = 256
+
+
+class Condition:
+    """Metadados de uma regra de limite; o estado fica nos arrays do AlarmEngine."""
+
+    __slots__ = ("index", "asset", "name", "entry", "side", "message", "clear_message", "severity")
+
+    def __init__(self, index: int, asset: str, entry: VarEntry, side: str,
+                 message: str, clear_message: str, severity: int):
+        self.index = index
+        self.asset = asset
+        self.name = f"{entry.name}.{side.capitalize()}"
+        self.entry = entry
+        self.side = side
+        self.message = message
+        self.clear_message = clear_message
+        self.severity = severity
+
+
+class AlarmEngine:
+    """
+    Tabela de regras de limite de todos os ativos, compilada em arrays NumPy
+    (posição do valor no payload, limite, banda de histerese, lado, atrasos,
+    estado e temporizador).
+
+    evaluate() recebe um lote de payloads e faz uma única comparação vetorizada
+    sobre todas as regras tocadas pelo lote. Só as regras que podem mudar de
+    estado (ou com atraso on/off em curso) passam pela máquina de estados em
+    Python, na ordem do lote; o resto não custa nada além das operações de array.
+    Lotes pequenos (menos de VECTOR_MIN_RULES comparações) vão direto pelo laço
+    escalar, que é mais barato que montar os arrays.
+
+    Uma regra ativa quando o valor ultrapassa o limite por pelo menos `on_delay`
+    segundos e normaliza quando volta além da banda (`limite ∓ histerese`) por
+    pelo menos `off_delay` segundos. Entre o limite e a banda o estado não muda.
+    Os tempos vêm do timestamp da amostra, não do relógio do servidor.
+    """
+
+    def __init__(self):
+        self.conditions: List[Condition] = []
+        self._by_name: Dict[Tuple[str, str], Condition] = {}
+        self._block_ids: Dict[Tuple[str, str], int] = {}  # (ativo, grupo) -> id do bloco
+        self._pending: List[tuple] = []
+
+        # Por bloco: primeira regra, nº de regras e nº de valores do payload
+        self._block_r0 = np.zeros(0, dtype=np.intp)
+        self._block_len = np.zeros(0, dtype=np.intp)
+        self._block_nvals = np.zeros(0, dtype=np.intp)
+        self._nvals: List[int] = []
+
+        self.slot = np.zeros(0, dtype=np.intp)      # posição do valor no payload do grupo
+        self.limit = np.zeros(0)
+        self.band = np.zeros(0)
+        self.high = np.zeros(0, dtype=bool)
+        self.on_delay = np.zeros(0)
+        self.off_delay = np.zeros(0)
+        self.state = np.zeros(0, dtype=np.int8)
+        self.since = np.zeros(0)                    # início do atraso on/off em curso (NaN = nenhum)
+
+    def add_asset(
+        self,
+        asset: str,
+        registry: VariableRegistry,
+        rules: Iterable[Tuple],
+        severities: Dict[str, int],
+        hysteresis: float = 0.0,
+        on_delay: float = 0.0,
+        off_delay: float = 0.0,
+    ):
+        """
+        Registra as regras (model.ALARM_RULES) de um ativo; o limite vem do
+        VarEntry (low/high) e a histerese é relativa ao limite. Chame compile() depois.
+        """
+        for group, entries in registry.groups.items():
+            self._block_ids[(asset, group)] = len(self._nvals)
+            self._nvals.append(len(entries))
+            pos = {e.name: i for i, e in enumerate(entries)}
+            for var, side, message, clear_message, severity in rules:
+                if var not in pos:
+                    continue
+                entry = entries[pos[var]]
+                limit = entry.high if side == "high" else entry.low
+                if side not in ("low", "high") or limit is None:
+                    raise ValueError(f"regra {var}.{side}: variável sem limite {side} em model.VARIABLES")
+                cond = Condition(-1, asset, entry, side, message, clear_message, severities[severity])
+                self._pending.append((self._block_ids[(asset, group)], pos[var], limit, abs(limit) * hysteresis,
+                                      side == "high", on_delay, off_delay, cond))
+
+    def compile(self):
+        # Regras ordenadas por bloco: cada payload toca uma faixa contígua
+        rows = sorted(self._pending, key=lambda r: r[0])
+        n_blocks = len(self._nvals)
+        r0 = np.zeros(n_blocks, dtype=np.intp)
+        length = np.zeros(n_blocks, dtype=np.intp)
+        self.conditions = []
+        self._by_name = {}
+        for i, (block, *_rest, cond) in enumerate(rows):
+            cond.index = i
+            self.conditions.append(cond)
+            self._by_name[(cond.asset, cond.name)] = cond
+            if length[block] == 0:
+                r0[block] = i
+            length[block] += 1
+        self._block_r0, self._block_len = r0, length
+        self._block_nvals = np.array(self._nvals, dtype=np.intp)
+
+        self.slot = np.array([r[1] for r in rows], dtype=np.intp)
+        self.limit = np.array([r[2] for r in rows], dtype=float)
+        self.band = np.array([r[3] for r in rows], dtype=float)
+        self.high = np.array([r[4] for r in rows], dtype=bool)
+        self.on_delay = np.array([r[5] for r in rows], dtype=float)
+        self.off_delay = np.array([r[6] for r in rows], dtype=float)
+        self.state = np.full(len(rows), _INACTIVE, dtype=np.int8)
+        self.since = np.full(len(rows), np.nan)
+
+        # Cópias em listas para o laço escalar (indexar array NumPy elemento a elemento é lento)
+        self._block_rules = [range(int(r0[b]), int(r0[b] + length[b])) for b in range(n_blocks)]
+        self._rule_py = list(zip(self.slot.tolist(), self.limit.tolist(), self.band.tolist(), self.high.tolist()))
+
+    def block_id(self, asset: str, group: str) -> int:
+        return self._block_ids[(asset, group)]
+
+    def evaluate(self, blocks: Sequence[AlarmBlock]) -> List[Tuple[Condition, str]]:
+        if not blocks:
+            return []
+        ids, values, stamps = zip(*blocks)
+        if len(blocks) < VECTOR_MIN_RULES and sum(len(self._block_rules[b]) for b in ids) < VECTOR_MIN_RULES:
+            return self._evaluate_scalar(blocks)
+        ids = np.asarray(ids, dtype=np.intp)
+        nvals = self._block_nvals[ids]
+        flat = np.fromiter(chain.from_iterable(values), dtype=float, count=int(nvals.sum()))
+
+        # Índice da regra e posição do valor em `flat` para cada (payload, regra)
+        lens = self._block_len[ids]
+        total = int(lens.sum())
+        if total == 0:
+            return []
+        first = np.repeat(np.cumsum(lens) - lens, lens)
+        rule = np.arange(total) - first + np.repeat(self._block_r0[ids], lens)
+        v = flat[np.repeat(np.cumsum(nvals) - nvals, lens) + self.slot[rule]]
+
+        limit, band, high = self.limit[rule], self.band[rule], self.high[rule]
+        violating = np.where(high, v > limit, v < limit)
+        normal = np.where(high, v < limit - band, v > limit + band)
+        st = self.state[rule]
+        active = (st == _ACTIVE) | (st == _ACKNOWLEDGED)
+        candidate = (violating & ~active) | (normal & active) | ~np.isnan(self.since[rule])
+        if not candidate.any():
+            return []
+
+        # Regras candidatas: todas as ocorrências delas no lote seguem, em ordem, pela máquina de estados
+        touched = np.isin(rule, rule[candidate])
+        ts_a = np.repeat(np.asarray(stamps, dtype=float), lens)
+        out = []
+        for k in np.flatnonzero(touched):
+            transition = self._step(int(rule[k]), bool(violating[k]), bool(normal[k]), float(ts_a[k]))
+            if transition is not None:
+                out.append((self.conditions[rule[k]], transition))
+        return out
+
+    def _evaluate_scalar(self, blocks: Sequence[AlarmBlock]) -> List[Tuple[Condition, str]]:
+        out = []
+        state, since, rule_py = self.state, self.since, self._rule_py
+        for bid, values, ts in blocks:
+            for r in self._block_rules[bid]:
+                slot, limit, band, high = rule_py[r]
+                v = values[slot]
+                if high:
+                    violating, normal = v > limit, v < limit - band
+                else:
+                    violating, normal = v < limit, v > limit + band
+                st = state[r]
+                if st == _ACTIVE or st == _ACKNOWLEDGED:
+                    if not normal and since[r] != since[r]:  # NaN: sem atraso em curso
+                        continue
+                elif not violating and since[r] != since[r]:
+                    continue
+                transition = self._step(r, violating, normal, ts)
+                if transition is not None:
+                    out.append((self.conditions[r], transition))
+        return out
+
+    def _step(self, r: int, violating: bool, normal: bool, ts: float) -> Optional[str]:
+        state, since = self.state[r], self.since[r]
+        if state in (_INACTIVE, _CLEARED):
+            if not violating:
+                self.since[r] = np.nan
+                return None
+            if np.isnan(since):
+                self.since[r] = since = ts
+            if ts - since < self.on_delay[r]:
+                return None
+            self.state[r], self.since[r] = _ACTIVE, np.nan
+            return RAISED
+
+        if not normal:
+            self.since[r] = np.nan
+            return None
+        if np.isnan(since):
+            self.since[r] = since = ts
+        if ts - since < self.off_delay[r]:
+            return None
+        self.state[r] = _INACTIVE if state == _ACKNOWLEDGED else _CLEARED
+        self.since[r] = np.nan
+        return RETURNED
+
+    def acknowledge(self, asset: str, name: str = "") -> List[Tuple[Condition, str]]:
+        """Reconhece uma condição do ativo ("VoltageA.High") ou, com nome vazio, todas."""
+        if name:
+            targets = [self._by_name[(asset, name)]]
+        else:
+            targets = [c for c in self.conditions if c.asset == asset]
+        out = []
+        for c in targets:
+            state = self.state[c.index]
+            if state == _ACTIVE:
+                self.state[c.index] = _ACKNOWLEDGED
+            elif state == _CLEARED:
+                self.state[c.index] = _INACTIVE
+            else:
+                continue
+            out.append((c, ACKED))
+        return out
@@ -0,0 +1,273 @@
+"""
+Carga em massa (backfill) do histórico a partir de leituras gravadas, sem
+passar pelo MQTT: depois de uma queda do broker, os gateways entregam horas
+de payloads guardados.
+
+Fontes, lidas em fluxo:
+- JSONL: uma mensagem por linha, {"topic": ..., "payload": {...} ou "texto"}
+  como gravada do broker ("timestamp" na linha vale para payloads sem o campo,
+  como os do formato legado), ou só o payload, com o ativo `default_asset` e
+  o tipo deduzido das chaves;
+- outro scgdi_history.sqlite (schema atual): amostras de var_history e dos
+  blocos de var_chunks, associadas pelo caminho da série.
+
+Os payloads são validados pelos modelos de src/model.py, como no MQTT. As
+amostras são acumuladas em blocos de `block`; cada bloco é ordenado por
+(série, ts), perde as repetições (fica a última) e as amostras que o histórico
+já tem, e vai inteiro ao Storage.add_bulk: uma transação grande para
+var_history e outra para var_rollup. Sem a compressão por deadband do caminho
+ao vivo (a selagem em var_chunks comprime depois). Timestamps fora de ordem,
+no bloco ou entre blocos, vão para a partição certa; e, como o que já está
+gravado é descartado, carregar o mesmo arquivo de novo não dobra os agregados.
+
+Alarmes não são reavaliados e os nós OPC UA não são tocados aqui: `latest`
+guarda a amostra mais nova carregada de cada série, que o servidor só aplica
+ao nó se for mais nova que o valor dele.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiosqlite
+import numpy as np
+from pydantic import ValidationError
+
+from .chunks import decode
+from .migrations import needs_migration, to_epoch_us
+from .model import PAYLOAD_KINDS, VARIABLES
+from .partitions import CHUNKS, OVERLAPPING_PARTITIONS_SQL, RAW, SELECT_PARTITIONS_SQL
+from .sqlite_pool import readonly_uri
+from .storage import Storage
+
+DEFAULT_BLOCK = 200_000  # amostras por bloco
+_YIELD_EVERY = 1000      # linhas entre pausas para o event loop (backfill dentro do servidor)
+
+_SQLITE_MAGIC = b"SQLite format 3\0"
+
+# Chaves que identificam o tipo de um payload sem tópico (formatos atual e legado)
+_KIND_KEYS = (
+    ("electrical", ("voltage", "current", "power", "Voltage", "Current", "Power")),
+    ("environment", ("caseTemperature", "temperature", "humidity", "Temperature", "Humidity", "CaseTemperature")),
+    ("vibration", ("axial", "radial", "Accell_X", "Accell_Y", "Accell_Z")),
+)
+
+_STORED_RAW_SQL = 'SELECT ts FROM "{table}" WHERE series_id = ? AND ts BETWEEN ? AND ?'
+_STORED_CHUNKS_SQL = 'SELECT data FROM "{table}" WHERE series_id = ? AND last_ts >= ? AND first_ts <= ?'
+
+
+def _kind_of(payload: Dict[str, Any]) -> Optional[str]:
+    for kind, keys in _KIND_KEYS:
+        if any(k in payload for k in keys):
+            return kind
+    return None
+
+
+async def _stored_ts(db: aiosqlite.Connection, sid: int, lo: int, hi: int) -> np.ndarray:
+    """Timestamps (µs) que a série já tem em [lo, hi], em var_history e nos blocos selados."""
+    found: List[np.ndarray] = []
+    for cls, query in ((RAW, _STORED_RAW_SQL), (CHUNKS, _STORED_CHUNKS_SQL)):
+        async with db.execute(OVERLAPPING_PARTITIONS_SQL.format(order="ASC"), (cls, hi, lo)) as cur:
+            tables = [name for (name,) in await cur.fetchall()]
+        for table in tables:
+            async with db.execute(query.format(table=table), (sid, lo, hi)) as cur:
+                rows = await cur.fetchall()
+            if cls == RAW:
+                found.append(np.array([ts for (ts,) in rows], dtype=np.int64))
+            else:
+                found.extend(decode(data)[0] for (data,) in rows)
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+class Backfill:
+    """
+    Uma carga (um ou mais arquivos) no `storage`. `assets` são os pares
+    (nome, tópicos por kind) dos ativos, como em fleet.asset_specs().
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        assets: Iterable[Tuple[str, Dict[str, tuple]]],
+        default_asset: Optional[str] = None,
+        block: int = DEFAULT_BLOCK,
+    ):
+        self.storage = storage
+        self.block = max(1, block)
+        self.routes: Dict[str, Tuple[str, str]] = {}  # tópico -> (ativo, kind)
+        names = []
+        for name, topics in assets:
+            names.append(name)
+            for kind, kind_topics in topics.items():
+                for topic in kind_topics:
+                    self.routes[topic] = (name, kind)
+        # Payload sem tópico: ativo dado ou, com um ativo só, ele
+        self.default_asset = default_asset or (names[0] if len(names) == 1 else None)
+        self._fields: Dict[str, List[Tuple[str, str, Optional[str]]]] = {}  # grupo -> (nome, campo, chave)
+        for group, name, field, key, _, _ in VARIABLES:
+            self._fields.setdefault(group, []).append((name, field, key))
+        self._sids: Dict[Tuple[str, str], List[int]] = {}  # (ativo, grupo) -> séries
+        self._block_sid: List[int] = []
+        self._block_ts: List[int] = []
+        self._block_val: List[Optional[float]] = []
+        self.latest: Dict[int, Tuple[int, Optional[float]]] = {}  # série -> (ts µs, valor) mais novo carregado
+        self.stats: Dict[str, int] = {}  # contadores do último load()
+
+    async def load(self, path: str) -> Dict[str, int]:
+        """Carrega um arquivo (.jsonl ou banco SQLite, pelo conteúdo) e grava tudo; devolve os contadores."""
+        self.stats = dict.fromkeys(("records", "invalid", "unrouted", "samples", "duplicates", "written"), 0)
+        expired0, lost0 = self.storage.expired_rows, self.storage.lost_rows
+        with open(path, "rb") as f:
+            is_sqlite = f.read(len(_SQLITE_MAGIC)) == _SQLITE_MAGIC
+        if is_sqlite:
+            await self._load_sqlite(path)
+        else:
+            await self._load_jsonl(path)
+        await self._flush_block()
+        await self.storage.flush()
+        # Linhas (brutas e agregados) que chegaram já fora da retenção e foram descartadas
+        self.stats["expired"] = self.storage.expired_rows - expired0
+        # Linhas de itens que o writer não conseguiu gravar (ver Storage.lost_rows)
+        self.stats["lost"] = self.storage.lost_rows - lost0
+        return dict(self.stats)
+
+    # Fontes
+
+    async def _load_jsonl(self, path: str):
+        with open(path, "rb") as f:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if line:
+                    self.stats["records"] += 1
+                    await self._message(line)
+                if n % _YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
+
+    async def _message(self, line: bytes):
+        try:
+            data = json.loads(line)
+            wrapped = isinstance(data, dict) and "topic" in data and "payload" in data
+            payload = data["payload"] if wrapped else data
+            if isinstance(payload, str):
+                payload = json.loads(payload)
+        except ValueError:
+            self.stats["invalid"] += 1
+            return
+        if not isinstance(payload, dict):
+            self.stats["invalid"] += 1
+            return
+
+        if wrapped:
+            route = self.routes.get(data["topic"])
+        else:
+            kind = _kind_of(payload)
+            route = (self.default_asset, kind) if self.default_asset and kind else None
+        if route is None:
+            self.stats["unrouted"] += 1
+            return
+        asset, kind = route
+        model, group = PAYLOAD_KINDS[kind]
+
+        # O modelo troca o timestamp do formato legado pelo instante atual: vale o gravado
+        ts = payload.get("timestamp") or (data.get("timestamp") if wrapped else None)
+        if ts is None:
+            self.stats["invalid"] += 1
+            return
+        try:
+            p = model.model_validate(payload)
+            ts_us = to_epoch_us(ts)
+        except (ValidationError, ValueError, TypeError):
+            self.stats["invalid"] += 1
+            return
+
+        sids = self._sids.get((asset, group))
+        if sids is None:
+            sids = self._sids[(asset, group)] = [
+                await self.storage.series_id(f"{asset}.{group}.{name}") for name, _, _ in self._fields[group]
+            ]
+        for sid, (_, field, key) in zip(sids, self._fields[group]):
+            raw = getattr(p, field)
+            self._add(sid, ts_us, raw.get(key, 0.0) if key is not None else raw)
+        if len(self._block_sid) >= self.block:
+            await self._flush_block()
+
+    async def _load_sqlite(self, path: str):
+        conn = sqlite3.connect(readonly_uri(path), uri=True)
+        try:
+            if needs_migration(conn):
+                raise ValueError(f"{path} está num schema antigo; rode scripts/migrate_db.py numa cópia antes")
+        finally:
+            conn.close()
+
+        async with aiosqlite.connect(readonly_uri(path), uri=True, isolation_level=None) as db:
+            await db.execute("BEGIN")  # um snapshot só para o arquivo inteiro
+            async with db.execute("SELECT id, path FROM series") as cur:
+                sids = {src: await self.storage.series_id(p) async for src, p in cur}
+            async with db.execute(SELECT_PARTITIONS_SQL) as cur:
+                partitions = await cur.fetchall()
+            for cls, _, _, table in partitions:
+                if cls == RAW:
+                    async with db.execute(f'SELECT series_id, ts, value FROM "{table}"') as cur:
+                        async for src, ts_us, value in cur:
+                            self.stats["records"] += 1
+                            self._add(sids[src], ts_us, value)
+                            if len(self._block_sid) >= self.block:
+                                await self._flush_block()
+                elif cls == CHUNKS:
+                    async with db.execute(f'SELECT series_id, data FROM "{table}"') as cur:
+                        async for src, data in cur:
+                            self.stats["records"] += 1
+                            ts, values = decode(data)
+                            for ts_us, value in zip(ts.tolist(), values.tolist()):
+                                self._add(sids[src], ts_us, None if value != value else value)
+                            if len(self._block_sid) >= self.block:
+                                await self._flush_block()
+            await db.execute("COMMIT")
+
+    # Blocos
+
+    def _add(self, sid: int, ts_us: int, value: Optional[float]):
+        """Acumula uma amostra; quem chama grava o bloco quando passa de `block`."""
+        self._block_sid.append(sid)
+        self._block_ts.append(ts_us)
+        self._block_val.append(value)
+        self.stats["samples"] += 1
+
+    async def _flush_block(self):
+        if not self._block_sid:
+            return
+        sid = np.array(self._block_sid, dtype=np.int64)
+        ts = np.array(self._block_ts, dtype=np.int64)
+        val = np.array(self._block_val, dtype=np.float64)  # None -> NaN
+        self._block_sid, self._block_ts, self._block_val = [], [], []
+
+        # Ordena por (série, ts); em ts repetido fica a última amostra recebida (ordenação estável)
+        order = np.lexsort((ts, sid))
+        sid, ts, val = sid[order], ts[order], val[order]
+        keep = np.ones(len(sid), dtype=bool)
+        keep[:-1] = (sid[1:] != sid[:-1]) | (ts[1:] != ts[:-1])
+
+        # Descarta o que já está gravado (blocos anteriores e o que chegou ao vivo)
+        await self.storage.flush()
+        starts = np.flatnonzero(np.r_[True, sid[1:] != sid[:-1]])
+        ends = np.r_[starts[1:], len(sid)]
+        async with self.storage.readers.snapshot() as db:
+            for a, b in zip(starts.tolist(), ends.tolist()):
+                stored = await _stored_ts(db, int(sid[a]), int(ts[a]), int(ts[b - 1]))
+                if len(stored):
+                    keep[a:b] &= ~np.isin(ts[a:b], stored)
+        self.stats["duplicates"] += int(len(keep) - keep.sum())
+        sid, ts, val = sid[keep], ts[keep], val[keep]
+        if not len(sid):
+            return
+
+        last = np.r_[sid[1:] != sid[:-1], True]
+        for s, t, v in zip(sid[last].tolist(), ts[last].tolist(), val[last].tolist()):
+            current = self.latest.get(s)
+            if current is None or t > current[0]:
+                self.latest[s] = (t, None if v != v else v)
+        values = [None if v != v else v for v in val.tolist()]
+        await self.storage.add_bulk(list(zip(sid.tolist(), ts.tolist(), values)))
+        self.stats["written"] += len(values)
@@ -0,0 +1,101 @@
+"""
+Codificação em blocos (chunks) do histórico selado de uma série.
+
+Formato inspirado no Gorilla (Pelkonen et al., VLDB 2015), com granularidade de
+byte para codificar/decodificar vetorizado em NumPy:
+
+- timestamps: o primeiro (µs) e o primeiro delta inteiros; depois, delta-of-delta
+  em zigzag, com a menor largura fixa (0, 1, 2, 4 ou 8 bytes) que cabe no bloco.
+  Amostragem regular => delta-of-delta 0 => 0 bytes por timestamp;
+- valores: XOR dos bits de cada double com o anterior; por valor, um byte de
+  controle (bytes zero à esquerda << 4 | bytes zero à direita) e só os bytes do
+  meio. Valor repetido => só o byte de controle.
+
+Valores ausentes (NULL) viram NaN no bloco.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Tuple
+
+import numpy as np
+
+VERSION = 1
+DEFAULT_CHUNK_SAMPLES = 1024  # amostras por bloco
+
+# versão, nº de amostras, 1º timestamp, 1º delta, largura do delta-of-delta
+_HEADER = struct.Struct("<BIqqB")
+_WIDTHS = ((0, None), (1, "<u1"), (2, "<u2"), (4, "<u4"), (8, "<u8"))
+_DTYPE = dict(_WIDTHS)
+_COLS = np.arange(8, dtype=np.uint8)
+
+
+def encode(ts: np.ndarray, values: np.ndarray) -> bytes:
+    """Bloco com `ts` (epoch µs, crescentes) e `values` (float64)."""
+    ts = np.asarray(ts, dtype=np.int64)
+    n = len(ts)
+    if n == 0:
+        raise ValueError("bloco vazio")
+    parts = []
+
+    # Timestamps: delta-of-delta em zigzag
+    d0, width = 0, 0
+    if n > 1:
+        deltas = np.diff(ts)
+        d0 = int(deltas[0])
+        if n > 2:
+            dod = np.diff(deltas)
+            zz = ((dod << 1) ^ (dod >> 63)).view(np.uint64)
+            top = int(zz.max())
+            width, dtype = next((w, dt) for w, dt in _WIDTHS if top < (1 << (8 * w)))
+            if width:
+                parts.append(zz.astype(dtype).tobytes())
+    header = _HEADER.pack(VERSION, n, int(ts[0]), d0, width)
+
+    # Valores: XOR com o anterior, sem os bytes zero das pontas
+    bits = np.asarray(values, dtype=np.float64).view(np.uint64)
+    xor = bits.copy()
+    xor[1:] ^= bits[:-1]
+    grid = xor.astype(">u8").view(np.uint8).reshape(n, 8)
+    nonzero = grid != 0
+    has = nonzero.any(axis=1)
+    lead = np.where(has, nonzero.argmax(axis=1), 8).astype(np.uint8)
+    trail = np.where(has, nonzero[:, ::-1].argmax(axis=1), 0).astype(np.uint8)
+    keep = (_COLS >= lead[:, None]) & (_COLS < (8 - trail)[:, None])
+    parts.append(((lead << 4) | trail).tobytes())
+    parts.append(grid[keep].tobytes())
+    return header + b"".join(parts)
+
+
+def decode(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """(ts int64 µs, valores float64) de um bloco."""
+    version, n, ts0, d0, width = _HEADER.unpack_from(blob)
+    if version != VERSION:
+        raise ValueError(f"versão de bloco desconhecida: {version}")
+    pos = _HEADER.size
+
+    deltas = np.empty(max(n - 1, 0), dtype=np.int64)
+    if n > 1:
+        deltas[0] = d0
+        if n > 2:
+            if width:
+                zz = np.frombuffer(blob, dtype=_DTYPE[width], count=n - 2, offset=pos).astype(np.int64)
+                pos += width * (n - 2)
+                dod = (zz >> 1) ^ -(zz & 1)
+            else:
+                dod = np.zeros(n - 2, dtype=np.int64)
+            deltas[1:] = d0 + np.cumsum(dod)
+    ts = np.empty(n, dtype=np.int64)
+    ts[0] = ts0
+    np.cumsum(deltas, out=ts[1:])
+    ts[1:] += ts0
+
+    control = np.frombuffer(blob, dtype=np.uint8, count=n, offset=pos)
+    pos += n
+    lead, trail = control >> 4, control & 0x0F
+    keep = (_COLS >= lead[:, None]) & (_COLS < (8 - trail)[:, None])
+    grid = np.zeros((n, 8), dtype=np.uint8)
+    grid[keep] = np.frombuffer(blob, dtype=np.uint8, count=int(keep.sum()), offset=pos)
+    xor = grid.view(">u8").ravel().astype(np.uint64)
+    values = np.bitwise_xor.accumulate(xor).view(np.float64)
+    return ts, values
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+Point = Tuple[float, float]  # (ts epoch s, valor)
+
+_INF = float("inf")
+
+
+class DeadbandFilter:
+    """
+    Historização por exceção de uma variável (model.DEADBANDS).
+
+    O deadband efetivo é max(abs, pct% * |valor de referência|) e vale para as
+    duas decisões:
+
+    - report(): escrever no nó OPC UA (e notificar os clientes) só quando o valor
+      sai do deadband do último valor escrito;
+    - archive(): compressão swinging door do histórico. Guarda-se o último ponto
+      arquivado (pivô) e o último ponto recebido (retido); enquanto a reta do
+      pivô até o ponto novo passar a até um deadband de todos os pontos recebidos
+      desde o pivô, nada é gravado. Quando a "porta" fecha, o ponto retido é
+      arquivado e vira o novo pivô. Interpolando linearmente o que foi gravado,
+      nenhum ponto recebido fica a mais de um deadband do sinal.
+
+    Com `max_interval` > 0, um ponto é forçado (no nó e no histórico) quando o
+    último tem essa idade, então as lacunas ficam limitadas mesmo com o sinal parado.
+    """
+
+    __slots__ = (
+        "abs", "pct", "max_interval",
+        "sent_v", "sent_t",       # último valor escrito no nó
+        "arch_v", "arch_t",       # último ponto arquivado (pivô da porta)
+        "held_v", "held_t",       # último ponto recebido
+        "slope_lo", "slope_hi",   # porta: faixa de inclinações ainda aceitas a partir do pivô
+    )
+
+    def __init__(self, abs_deadband: float = 0.0, pct_deadband: float = 0.0, max_interval: float = 0.0):
+        self.abs = abs_deadband
+        self.pct = pct_deadband / 100.0
+        self.max_interval = max_interval if max_interval > 0 else _INF
+        self.sent_v = self.sent_t = None
+        self.arch_v = self.arch_t = None
+        self.held_v = self.held_t = None
+        self.slope_lo, self.slope_hi = -_INF, _INF
+
+    def deadband(self, ref: float) -> float:
+        return max(self.abs, self.pct * abs(ref))
+
+    def report(self, v: float, t: float) -> bool:
+        """True se o valor deve ser escrito no nó. Nunca para amostra anterior à última escrita (o nó não volta no tempo)."""
+        sent_t = self.sent_t
+        if sent_t is not None:
+            if t < sent_t:
+                return False
+            sent_v = self.sent_v
+            if sent_v is not None and t - sent_t < self.max_interval and abs(v - sent_v) <= self.deadband(sent_v):
+                return False
+        self.sent_v, self.sent_t = v, t
+        return True
+
+    def restore(self, t: float):
+        """O nó tem um valor restaurado de `t` (warm start): a próxima amostra mais nova é escrita, mesmo dentro do deadband."""
+        self.sent_v, self.sent_t = None, t
+
+    def archive(self, v: float, t: float) -> List[Point]:
+        """Pontos a gravar no histórico após receber (t, v); em geral nenhum."""
+        held_t = self.held_t
+        if held_t is None:
+            self._pivot(v, t)
+            return [(t, v)]
+        if t <= held_t:
+            # Fora de ordem (ou repetido): grava como veio, sem mexer na porta
+            return [(t, v)]
+
+        out: List[Point] = []
+        slope = (v - self.arch_v) / (t - self.arch_t)
+        if not self.slope_lo <= slope <= self.slope_hi:
+            # A porta fechou: a reta pivô -> ponto novo se afasta mais de um deadband de
+            # algum ponto anterior; o ponto retido é o último que ainda cabia
+            held_v = self.held_v
+            out.append((held_t, held_v))
+            self._pivot(held_v, held_t)
+        e = self.deadband(self.arch_v)
+        dt = t - self.arch_t
+        self.slope_lo = max(self.slope_lo, (v - e - self.arch_v) / dt)
+        self.slope_hi = min(self.slope_hi, (v + e - self.arch_v) / dt)
+        self.held_v, self.held_t = v, t
+
+        if t - self.arch_t >= self.max_interval:
+            out.append((t, v))
+            self._pivot(v, t)
+        return out
+
+    def pending(self) -> List[Point]:
+        """Ponto retido ainda não arquivado (gravar ao encerrar, para não perder o fim do sinal)."""
+        if self.held_t is None or self.held_t == self.arch_t:
+            return []
+        point = (self.held_t, self.held_v)
+        self._pivot(self.held_v, self.held_t)
+        return [point]
+
+    def _pivot(self, v: float, t: float):
+        self.arch_v, self.arch_t = v, t
+        self.held_v, self.held_t = v, t
+        self.slope_lo, self.slope_hi = -_INF, _INF
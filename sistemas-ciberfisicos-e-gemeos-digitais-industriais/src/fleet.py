@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, field_validator, model_validator
+
+from .model import MOTOR_NODE_NAME, TOPICS_ELEC, TOPICS_ENV, TOPICS_VIB
+from .registry import VariableRegistry
+
+# Tipos de tópico publicados por ativo ({kind} no template)
+TOPIC_KINDS = ("electrical", "environment", "vibration")
+DEFAULT_TOPIC_TEMPLATE = "scgdi/{asset}/{kind}"
+
+
+class AssetConfig(BaseModel):
+    name: str                     # BrowseName do objeto e prefixo das séries ("<name>.Electrical.VoltageA")
+    topic: Optional[str] = None   # valor de {asset} nos tópicos (padrão: name)
+
+    @field_validator("name")
+    @classmethod
+    def _check_name(cls, v: str) -> str:
+        if not v or "." in v or "/" in v:
+            raise ValueError(f"nome de ativo inválido: {v!r} (não pode ser vazio nem conter '.' ou '/')")
+        return v
+
+    @field_validator("topic")
+    @classmethod
+    def _check_topic(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and (not v or any(c in v for c in "/+#")):
+            raise ValueError(f"segmento de tópico inválido: {v!r}")
+        return v
+
+
+class FleetConfig(BaseModel):
+    """
+    Arquivo de frota (JSON), por exemplo:
+
+        {"topic_template": "scgdi/{asset}/{kind}",
+         "assets": ["Motor001", {"name": "Motor002", "topic": "m2"}]}
+    """
+
+    topic_template: str = DEFAULT_TOPIC_TEMPLATE
+    assets: List[AssetConfig]
+
+    @field_validator("assets", mode="before")
+    @classmethod
+    def _names_as_assets(cls, v: Any) -> Any:
+        if isinstance(v, list):
+            return [{"name": a} if isinstance(a, str) else a for a in v]
+        return v
+
+    @model_validator(mode="after")
+    def _check_unique(self) -> "FleetConfig":
+        names = [a.name for a in self.assets]
+        if len(set(names)) != len(names):
+            raise ValueError("nomes de ativos repetidos na configuração da frota")
+        if "{asset}" not in self.topic_template or "{kind}" not in self.topic_template:
+            raise ValueError("topic_template precisa conter {asset} e {kind}")
+        return self
+
+    def topics_for(self, asset: AssetConfig) -> Dict[str, tuple]:
+        key = asset.topic or asset.name
+        return {kind: (self.topic_template.format(asset=key, kind=kind),) for kind in TOPIC_KINDS}
+
+
+def load_fleet_config(path: str) -> FleetConfig:
+    with open(path, "r", encoding="utf-8") as f:
+        return FleetConfig.model_validate(json.load(f))
+
+
+def asset_specs(fleet_config: str = ""):
+    """(nome, tópicos por kind) de cada ativo: arquivo FLEET_CONFIG ou o motor único legado."""
+    if not fleet_config:
+        yield MOTOR_NODE_NAME, {"electrical": TOPICS_ELEC, "environment": TOPICS_ENV, "vibration": TOPICS_VIB}
+        return
+    cfg = load_fleet_config(fleet_config)
+    for a in cfg.assets:
+        yield a.name, cfg.topics_for(a)
+
+
+class Asset:
+    """Um motor hospedado pelo servidor: nó raiz, registro de variáveis e tópicos."""
+
+    __slots__ = ("name", "topics", "node", "registry")
+
+    def __init__(self, name: str, topics: Dict[str, tuple], registry: VariableRegistry):
+        self.name = name
+        self.topics = topics  # kind -> tópicos MQTT aceitos
+        self.node: Any = None
+        self.registry = registry
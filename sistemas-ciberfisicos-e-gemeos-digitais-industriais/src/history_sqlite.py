@@ -1,64 +1,743 @@
-
 from __future__ import annotations
-from typing import Any, Optional, List, Tuple
-from datetime import datetime
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, List, Tuple
+from datetime import datetime, timezone
 import aiosqlite
+import numpy as np
 from asyncua import ua
+from asyncua.common.events import Event
+from asyncua.common.utils import Buffer
+from loguru import logger
+from .chunks import decode
+from .migrations import ROLLUP_RESOLUTIONS, from_epoch_us, to_epoch_us
+from .partitions import CHUNKS, EVENTS, OVERLAPPING_PARTITIONS_SQL, RAW, ROLLUP
+from .storage import Storage
 try:
     from asyncua.server.history import HistoryStorageInterface  # type: ignore
 except Exception:
-    HistoryStorageInterface = object 
+    HistoryStorageInterface = object
+
+# Maior página devolvida por HistoryRead; o restante vem via continuation point
+DEFAULT_MAX_PAGE = 10_000
+
+_MIN_TS = -(2**63)
+_MAX_TS = 2**63 - 1
+_WIN_EPOCH_US = to_epoch_us(ua.get_win_epoch())
+
+# Campos do SCGDIEventType que têm coluna nas partições de event_history (usados no where-clause)
+_EVENT_COLUMNS = {
+    "Time": "ts",
+    "ReceiveTime": "ts",
+    "SourceNode": "source",
+    "Message": "message",
+    "Severity": "severity",
+    "Category": "category",
+}
+
+_COMPARISONS = {
+    ua.FilterOperator.Equals: "=",
+    ua.FilterOperator.GreaterThan: ">",
+    ua.FilterOperator.LessThan: "<",
+    ua.FilterOperator.GreaterThanOrEqual: ">=",
+    ua.FilterOperator.LessThanOrEqual: "<=",
+}
+
+# Agregados atendidos em HistoryRead(Processed) (Part 13)
+AVERAGE = ua.NodeId(ua.ObjectIds.AggregateFunction_Average)
+MINIMUM = ua.NodeId(ua.ObjectIds.AggregateFunction_Minimum)
+MAXIMUM = ua.NodeId(ua.ObjectIds.AggregateFunction_Maximum)
+COUNT = ua.NodeId(ua.ObjectIds.AggregateFunction_Count)
+INTERPOLATIVE = ua.NodeId(ua.ObjectIds.AggregateFunction_Interpolative)
+AGGREGATES = (AVERAGE, MINIMUM, MAXIMUM, COUNT, INTERPOLATIVE)
+
+# Notifiers que enxergam todos os eventos do servidor
+_ALL_EVENTS = (ua.NodeId(ua.ObjectIds.Server), ua.NodeId(ua.ObjectIds.ObjectsFolder))
+
+
+def _time_bounds(start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int, str]:
+    """
+    Converte (start, end) do HistoryRead em (lo, hi, ordem) em µs, seguindo a Part 11:
+    sem start => do fim para trás; start > end => ordem decrescente.
+    """
+    start_us = to_epoch_us(start) if start is not None else _WIN_EPOCH_US
+    end_us = to_epoch_us(end) if end is not None else _WIN_EPOCH_US
+    if start_us <= _WIN_EPOCH_US:
+        return _MIN_TS, (end_us if end_us > _WIN_EPOCH_US else _MAX_TS), "DESC"
+    if end_us <= _WIN_EPOCH_US:
+        return start_us, _MAX_TS, "ASC"
+    if start_us > end_us:
+        return end_us, start_us, "DESC"
+    return start_us, end_us, "ASC"
+
+
+def _intervals(lo: int, hi: int, step: int, descending: bool) -> Iterator[Tuple[int, int]]:
+    """Intervalos [a, b) de ReadProcessed na ordem pedida; o último é truncado no limite."""
+    if step <= 0 or step >= hi - lo:
+        yield lo, hi
+    elif not descending:
+        for a in range(lo, hi, step):
+            yield a, min(a + step, hi)
+    else:
+        for b in range(hi, lo, -step):
+            yield max(b - step, lo), b
+
+
+def _status(code: int) -> ua.StatusCode:
+    return ua.StatusCode(code)
+
+
+def _iso(ts_us: int, default: str) -> str:
+    # event_history.ts é texto ISO-8601 gerado por datetime.isoformat() em UTC
+    return from_epoch_us(ts_us).isoformat() if _MIN_TS < ts_us < _MAX_TS else default
+
+
+def _datavalue(ts_us: int, value: Optional[float]) -> ua.DataValue:
+    src_ts = from_epoch_us(ts_us)
+    return ua.DataValue(ua.Variant(value, ua.VariantType.Double), SourceTimestamp=src_ts, ServerTimestamp=src_ts)
+
+
+class _UnsupportedFilter(Exception):
+    """Where-clause sem tradução para SQL; `code` é o StatusCode devolvido ao cliente."""
+
+    def __init__(self, what: str, code: int = ua.StatusCodes.BadContentFilterInvalid):
+        super().__init__(what)
+        self.code = code
+
+
+class HistorySQLite(HistoryStorageInterface):
+    """
+    Backend único de histórico: atende as leituras do HistoryStorageInterface do
+    asyncua (read_*) sobre as tabelas do projeto (series/var_history/event_history).
+    O histórico do asyncua não é ativado nos nós: toda escrita vem do servidor
+    direto para o writer em lote do Storage, sem save_*. Cada leitura usa uma
+    conexão do pool só-leitura do Storage numa única transação (snapshot): o
+    catálogo `partitions` e as partições que ele lista são lidos no mesmo estado,
+    mesmo com o writer criando, selando ou expirando partições ao mesmo tempo (_scan).
+    """
 
-class HistorySQLite(HistoryStorageInterface):  
-    def __init__(self, db_path: str):
-        self.db_path = db_path
+    def __init__(self, storage: Storage, server: Any = None, max_page_size: int = DEFAULT_MAX_PAGE):
+        self.storage = storage
+        self.db_path = storage.db_path
+        self.server = server
+        self.max_history_data_response_size = max_page_size
+        # Cache NodeId -> series.id (resolvido pelo browse path uma única vez)
+        self._series: Dict[ua.NodeId, int] = {}
+        # Eventos: tipo devolvido no HistoryRead e fontes cobertas por cada notifier
+        self.event_type_id = ua.NodeId(ua.ObjectIds.BaseEventType)
+        self._notifiers: Dict[ua.NodeId, Tuple[str, ...]] = {}
+        self._source_names: Dict[str, str] = {}
+
+    async def init(self):
+        # As conexões de leitura são do Storage (Storage.readers), abertas em Storage.init()
+        pass
+
+    async def stop(self):
+        pass
+
+    def bind_series(self, node_id: ua.NodeId, series_id: int):
+        """Pré-popula o cache quando o chamador já conhece o id da série."""
+        self._series[node_id] = series_id
+
+    def bind_event_type(self, event_type_id: ua.NodeId):
+        """Tipo (ex.: SCGDIEventType) com que as linhas de event_history são devolvidas."""
+        self.event_type_id = event_type_id
+
+    def serve_history(self, manager: Any):
+        """
+        O HistoryManager do asyncua responde BadNotImplemented a ReadProcessedDetails
+        e só guarda o timestamp (como novo start) no continuation point de Raw e de
+        eventos, o que perde a ordem das leituras do fim para trás; passa esses casos
+        para read_node_history(), read_processed() e read_event_history().
+        """
+        read_history = manager.read_history
+
+        async def _read_history(params):
+            details = params.HistoryReadDetails
+            if isinstance(details, ua.ReadRawModifiedDetails):
+                return [await self._raw_result(rv, details) for rv in params.NodesToRead]
+            if isinstance(details, ua.ReadEventDetails):
+                return [await self._event_result(rv, details) for rv in params.NodesToRead]
+            if not isinstance(details, ua.ReadProcessedDetails):
+                return await read_history(params)
+            if len(details.AggregateType) != len(params.NodesToRead):
+                return [
+                    ua.HistoryReadResult(StatusCode_=_status(ua.StatusCodes.BadAggregateListMismatch))
+                    for _ in params.NodesToRead
+                ]
+            return [
+                await self._processed_result(rv, details, aggregate)
+                for rv, aggregate in zip(params.NodesToRead, details.AggregateType)
+            ]
+
+        manager.read_history = _read_history
+
+    def register_notifier(self, node_id: ua.NodeId, sources: Iterable[ua.NodeId]):
+        """Declara que o HistoryRead de eventos em `node_id` inclui os eventos dessas fontes."""
+        self._notifiers[node_id] = tuple(n.to_string() for n in (node_id, *sources))
+
+    async def _browse_path(self, node_id: ua.NodeId) -> str:
+        # ['0:Root', '0:Objects', '2:Motor50CV', '2:Electrical', '2:VoltageA'] -> 'Motor50CV.Electrical.VoltageA'
+        names = [s.split(":", 1)[-1] for s in await self.server.get_node(node_id).get_path(as_string=True)]
+        if names[:2] == ["Root", "Objects"]:
+            names = names[2:]
+        return ".".join(names)
+
+    async def _series_for(self, node_id: ua.NodeId) -> Optional[int]:
+        sid = self._series.get(node_id)
+        if sid is None and self.server is not None:
+            path = await self._browse_path(node_id)
+            async with self.storage.readers.snapshot() as db:
+                async with db.execute("SELECT id FROM series WHERE path = ?", (path,)) as cur:
+                    row = await cur.fetchone()
+            if row is not None:  # série ainda inexistente não é cacheada
+                sid = self._series[node_id] = row[0]
+        return sid
+
+    async def _tables(self, db: aiosqlite.Connection, cls: str, lo: int, hi: int, descending: bool = False) -> List[str]:
+        """Partições de `cls` que cruzam [lo, hi] µs, pelo catálogo do próprio snapshot."""
+        query = OVERLAPPING_PARTITIONS_SQL.format(order="DESC" if descending else "ASC")
+        async with db.execute(query, (cls, hi, lo)) as cur:
+            return [name for (name,) in await cur.fetchall()]
+
+    async def _scan(
+        self,
+        db: aiosqlite.Connection,
+        cls: str,
+        lo: int,
+        hi: int,
+        query: str,
+        params: Tuple[Any, ...] | List[Any],
+        descending: bool = False,
+        limit: int = 0,
+    ) -> List[tuple]:
+        """
+        Executa `query` ({table} = partição) em cada partição de `cls` que cruza
+        [lo, hi] µs, na ordem do tempo. Com `limit`, a query termina em LIMIT ?
+        (recebe o que falta) e a varredura para ao completar as linhas.
+        """
+        out: List[tuple] = []
+        for table in await self._tables(db, cls, lo, hi, descending):
+            args = (*params, limit - len(out)) if limit else tuple(params)
+            async with db.execute(query.format(table=table), args) as cur:
+                out.extend(await cur.fetchall())
+            if limit and len(out) >= limit:
+                break
+        return out
+
+    async def _points(
+        self,
+        db: aiosqlite.Connection,
+        sid: int,
+        lo: int,
+        hi: int,
+        descending: bool = False,
+        limit: int = 0,
+        not_null: bool = False,
+    ) -> List[Tuple[int, Optional[float]]]:
+        """
+        (ts µs, valor) de uma série em [lo, hi], na ordem pedida: linhas de
+        var_history (partição aberta) mescladas com os blocos selados de var_chunks.
+        Um ts presente nos dois (amostra atrasada ainda não selada) sai uma vez só,
+        com o valor da linha bruta, que é o que a selagem vai manter.
+        """
+        order = "DESC" if descending else "ASC"
+        query = f"""
+            SELECT ts, value
+            FROM "{{table}}"
+            WHERE series_id = ? AND ts BETWEEN ? AND ?{' AND value IS NOT NULL' if not_null else ''}
+            ORDER BY ts {order}
+        """
+        if limit:
+            query += " LIMIT ?"
+        rows = await self._scan(db, RAW, lo, hi, query, (sid, lo, hi), descending, limit)
+        sealed = await self._chunk_points(db, sid, lo, hi, descending, limit, not_null)
+        if not sealed:
+            return rows
+        if rows:
+            raw_ts = {ts for ts, _ in rows}
+            sealed = sorted(rows + [p for p in sealed if p[0] not in raw_ts], key=lambda p: p[0], reverse=descending)
+        return sealed[:limit] if limit else sealed
+
+    async def _chunk_points(
+        self, db: aiosqlite.Connection, sid: int, lo: int, hi: int, descending: bool, limit: int, not_null: bool
+    ) -> List[Tuple[int, Optional[float]]]:
+        """
+        Pontos dos blocos de var_chunks que cruzam [lo, hi]. Os blocos fora da faixa
+        nem são lidos (índice (series_id, last_ts) + first_ts); os demais são
+        decodificados um a um, na ordem, até completar `limit` pontos.
+        """
+        key = "last_ts DESC" if descending else "first_ts"
+        query = f"""
+            SELECT first_ts, last_ts, data
+            FROM "{{table}}"
+            WHERE series_id = ? AND last_ts >= ? AND first_ts <= ?
+            ORDER BY {key}
+        """
+        out: List[Tuple[int, Optional[float]]] = []
+        bound: Optional[int] = None  # ts do limit-ésimo ponto já garantido
+        for table in await self._tables(db, CHUNKS, lo, hi, descending):
+            async with db.execute(query.format(table=table), (sid, lo, hi)) as cur:
+                async for first_ts, last_ts, data in cur:
+                    if bound is not None and (last_ts < bound if descending else first_ts > bound):
+                        break
+                    ts, values = decode(data)
+                    a, b = np.searchsorted(ts, lo, "left"), np.searchsorted(ts, hi, "right")
+                    ts, values = ts[a:b], values[a:b]
+                    nan = np.isnan(values)
+                    if nan.any():
+                        if not_null:
+                            ts, values = ts[~nan], values[~nan]
+                            points = list(zip(ts.tolist(), values.tolist()))
+                        else:
+                            points = [(t, None if v != v else v) for t, v in zip(ts.tolist(), values.tolist())]
+                    else:
+                        points = list(zip(ts.tolist(), values.tolist()))
+                    out.extend(reversed(points) if descending else points)
+                    if limit and len(out) >= limit:
+                        out.sort(key=lambda p: p[0], reverse=descending)
+                        del out[limit:]
+                        bound = out[-1][0]
+            if bound is not None:
+                # Partições seguintes começam depois do limite (ou antes, em ordem decrescente)
+                break
+        return out
+
+    # Leitura
+
+    async def _raw_result(self, rv: ua.HistoryReadValueId, details: ua.ReadRawModifiedDetails) -> ua.HistoryReadResult:
+        result = ua.HistoryReadResult()
+        after: Optional[Tuple[bool, int, int]] = None
+        if rv.ContinuationPoint:
+            # (ordem decrescente, série, ts) da 1ª amostra fora da página anterior
+            buf = Buffer(rv.ContinuationPoint)
+            after = (
+                ua.ua_binary.Primitives.Boolean.unpack(buf),
+                ua.ua_binary.Primitives.Int64.unpack(buf),
+                ua.ua_binary.Primitives.Int64.unpack(buf),
+            )
+        try:
+            values, cont = await self.read_node_history(
+                rv.NodeId, details.StartTime, details.EndTime, details.NumValuesPerNode, after
+            )
+        except ua.UaStatusCodeError as exc:
+            result.StatusCode = _status(exc.code)
+            return result
+        # Sem histórico de modificações: ReadModified devolve o que existe (como o asyncua)
+        result.HistoryData = ua.HistoryModifiedData() if details.IsReadModified else ua.HistoryData()
+        result.HistoryData.DataValues = values
+        if cont:
+            result.ContinuationPoint = (
+                ua.ua_binary.Primitives.Boolean.pack(cont[0])
+                + ua.ua_binary.Primitives.Int64.pack(cont[1])
+                + ua.ua_binary.Primitives.Int64.pack(cont[2])
+            )
+        return result
 
     async def read_node_history(
         self,
-        node: Any,
+        node_id: ua.NodeId,
         start: Optional[datetime],
         end: Optional[datetime],
-        num_values: int = 0,
-        cont: Any = None,
-    ) -> List[ua.DataValue]:
+        nb_values: int = 0,
+        after: Optional[Tuple[bool, int, int]] = None,
+    ) -> Tuple[List[ua.DataValue], Optional[Tuple[bool, int, int]]]:
+        """
+        HistoryRead(Raw) de uma variável. Se o início cai na faixa que o buffer
+        recente da série cobre (Storage.recent), responde da memória; senão, seek
+        no PK (series_id, ts) de cada partição com LIMIT, mesclado com os blocos
+        selados (_points).
+        Devolve no máximo min(nb_values, max_page_size) valores e, se houver mais,
+        (ordem decrescente, série, ts µs) da próxima amostra, que volta como `after`
+        junto com o mesmo start/end: a página seguinte continua na mesma ordem,
+        inclusive nas leituras do fim para trás (sem start ou start > end).
         """
-        Retorna DataValues para suportar HistoryRead(Data).
-        Mapeia pelo caminho 'path' que você salva no SQLite.
+        sid = await self._series_for(node_id)
+        if sid is None:
+            return [], None
+
+        lo, hi, order = _time_bounds(start, end)
+        descending = order == "DESC"
+        if after is not None:
+            descending, after_sid, after_ts = after
+            if after_sid != sid:
+                raise ua.UaStatusCodeError(ua.StatusCodes.BadContinuationPointInvalid)
+            # ts é único por série (PK): a próxima página começa exatamente nele
+            if descending:
+                hi = min(hi, after_ts)
+            else:
+                lo = max(lo, after_ts)
+        page = min(nb_values, self.max_history_data_response_size) if nb_values else self.max_history_data_response_size
+        hot = self.storage.recent.read(sid, lo, hi, descending, page, _datavalue)
+        if hot is not None:
+            values, nxt = hot
+            return values, ((descending, sid, nxt) if nxt is not None else None)
+        async with self.storage.readers.snapshot() as db:
+            rows = await self._points(db, sid, lo, hi, descending, page + 1)
+
+        out: List[ua.DataValue] = []
+        cont: Optional[Tuple[bool, int, int]] = None
+        for ts, value in rows:
+            if len(out) == page:
+                cont = descending, sid, ts  # 1ª linha fora da página
+                break
+            out.append(_datavalue(ts, value))
+        return out, cont
+
+    async def _processed_result(
+        self, rv: ua.HistoryReadValueId, details: ua.ReadProcessedDetails, aggregate: ua.NodeId
+    ) -> ua.HistoryReadResult:
+        result = ua.HistoryReadResult()
+        if aggregate not in AGGREGATES:
+            result.StatusCode = _status(ua.StatusCodes.BadAggregateNotSupported)
+            return result
+        start = details.StartTime
+        if rv.ContinuationPoint:
+            start = ua.ua_binary.Primitives.DateTime.unpack(Buffer(rv.ContinuationPoint))
+        if start == details.EndTime or details.ProcessingInterval < 0:
+            result.StatusCode = _status(ua.StatusCodes.BadInvalidArgument)
+            return result
+
+        values, cont = await self.read_processed(
+            rv.NodeId, start, details.EndTime, details.ProcessingInterval, aggregate
+        )
+        result.HistoryData = ua.HistoryData()
+        result.HistoryData.DataValues = values
+        if cont:
+            result.ContinuationPoint = ua.ua_binary.Primitives.DateTime.pack(cont)
+        return result
+
+    async def read_processed(
+        self,
+        node_id: ua.NodeId,
+        start: datetime,
+        end: datetime,
+        interval_ms: float,
+        aggregate: ua.NodeId,
+    ) -> Tuple[List[ua.DataValue], Optional[datetime]]:
+        """
+        HistoryRead(Processed): um valor por intervalo de `interval_ms` entre start
+        e end (0 = um único intervalo; start > end = intervalos do fim para o início,
+        como na Part 11), com o timestamp do início do intervalo.
+
+        Average/Minimum/Maximum/Count vêm da resolução mais grossa de var_rollup
+        em que caem todos os limites dos intervalos. Sem uma que encaixe, vêm dos
+        buckets de 1 min inteiros dentro de cada intervalo, mais os pontos de
+        var_history nos minutos cortados por um limite; esses pontos já passaram
+        pela compressão, então o intervalo que os usa sai UncertainDataSubNormal.
+        Average é a média simples das amostras; intervalo vazio = BadNoData (Count = 0).
+        Interpolative interpola linearmente, no início do intervalo, o último ponto
+        até ele e o primeiro depois (após o último ponto: último valor,
+        UncertainDataSubNormal); só esses dois pontos por instante são lidos.
+        Se houver mais intervalos que a página, o continuation point é o início
+        do próximo.
         """
-        browse_name = await node.read_browse_name()
-        path = browse_name.Name
+        sid = await self._series_for(node_id)
+        if sid is None:
+            return [], None
+
+        start_us, end_us = to_epoch_us(start), to_epoch_us(end)
+        descending = start_us > end_us
+        lo, hi = (end_us, start_us) if descending else (start_us, end_us)
+        step = round(interval_ms * 1000)
+        page = self.max_history_data_response_size
+        intervals = list(islice(_intervals(lo, hi, step, descending), page + 1))
+        cont: Optional[datetime] = None
+        if len(intervals) > page:
+            nxt = intervals.pop()
+            cont = from_epoch_us(nxt[1] if descending else nxt[0])
+        stamps = [b if descending else a for a, b in intervals]
+
+        async with self.storage.readers.snapshot() as db:
+            if aggregate == INTERPOLATIVE:
+                return await self._interpolate(db, sid, stamps), cont
+            ordered = sorted(intervals)
+            rows, cut = await self._aggregate_rows(db, sid, ordered)
 
+        # Acumula por intervalo: [amostras, soma, mín, máx]
+        starts = [a for a, _ in ordered]
+        partial = {
+            starts[i] for a, b in cut for i in range(bisect_right(starts, a) - 1, bisect_right(starts, b - 1))
+        }
+        acc: Dict[int, List[float]] = {}
+        for ts, n, total, vmin, vmax in rows:
+            a = starts[bisect_right(starts, ts) - 1]
+            cell = acc.get(a)
+            if cell is None:
+                acc[a] = [n, total, vmin, vmax]
+            else:
+                cell[0] += n
+                cell[1] += total
+                cell[2] = min(cell[2], vmin)
+                cell[3] = max(cell[3], vmax)
+
+        out: List[ua.DataValue] = []
+        for (a, _), ts_us in zip(intervals, stamps):
+            ts = from_epoch_us(ts_us)
+            cell = acc.get(a)
+            status = _status(ua.StatusCodes.UncertainDataSubNormal if a in partial else ua.StatusCodes.Good)
+            if aggregate == COUNT:
+                variant = ua.Variant(int(cell[0]) if cell else 0, ua.VariantType.Int32)
+            elif cell is None:
+                out.append(ua.DataValue(StatusCode_=_status(ua.StatusCodes.BadNoData), SourceTimestamp=ts, ServerTimestamp=ts))
+                continue
+            elif aggregate == AVERAGE:
+                variant = ua.Variant(cell[1] / cell[0], ua.VariantType.Double)
+            elif aggregate == MINIMUM:
+                variant = ua.Variant(cell[2], ua.VariantType.Double)
+            else:
+                variant = ua.Variant(cell[3], ua.VariantType.Double)
+            out.append(ua.DataValue(variant, StatusCode_=status, SourceTimestamp=ts, ServerTimestamp=ts))
+        return out, cont
+
+    async def _aggregate_rows(
+        self, db: aiosqlite.Connection, sid: int, intervals: List[Tuple[int, int]]
+    ) -> Tuple[List[tuple], List[Tuple[int, int]]]:
+        """
+        (ts, amostras, soma, mín, máx) dos intervalos [a, b) (em ordem crescente) e as
+        faixas que vieram dos pontos armazenados. Com todos os limites alinhados a uma
+        resolução de var_rollup, só os buckets da mais grossa; senão, os buckets de
+        1 min que não são cortados por um limite e, nos cortados, os pontos de
+        var_history (um por linha), lidos por faixa contígua de minutos.
+        """
+        lo, hi = intervals[0][0], intervals[-1][1]
+        edges = [a for a, _ in intervals] + [hi]
+        for res in reversed(ROLLUP_RESOLUTIONS):
+            if all(t % (res * 1_000_000) == 0 for t in edges):
+                return await self._rollup_rows(db, sid, res, lo, hi), []
+
+        res = ROLLUP_RESOLUTIONS[0]
+        res_us = res * 1_000_000
+        cut_buckets = sorted({t - t % res_us for t in edges if t % res_us})
+        cut: List[Tuple[int, int]] = []
+        for bucket in cut_buckets:
+            a, b = max(bucket, lo), min(bucket + res_us, hi)
+            if cut and cut[-1][1] == a:
+                cut[-1] = (cut[-1][0], b)
+            else:
+                cut.append((a, b))
+        skip = set(cut_buckets)
+        rows = [r for r in await self._rollup_rows(db, sid, res, lo, hi) if r[0] not in skip]
+        for a, b in cut:
+            rows.extend((ts, 1, v, v, v) for ts, v in await self._points(db, sid, a, b - 1, not_null=True))
+        return rows, cut
+
+    async def _rollup_rows(self, db: aiosqlite.Connection, sid: int, res: int, lo: int, hi: int) -> List[tuple]:
+        """Buckets de `res` s da série com início em [lo, hi)."""
         query = """
-            SELECT ts, value
-            FROM var_history
-            WHERE path LIKE ? AND (? IS NULL OR ts >= ?) AND (? IS NULL OR ts <= ?)
-            ORDER BY ts ASC
+            SELECT bucket, samples, total, vmin, vmax
+            FROM "{table}"
+            WHERE resolution = ? AND series_id = ? AND bucket >= ? AND bucket < ?
         """
-        params = (f"%{path}", start.isoformat() if start else None, start.isoformat() if start else None,
-                  end.isoformat() if end else None, end.isoformat() if end else None)
+        return await self._scan(db, ROLLUP, lo, hi - 1, query, (res, sid, lo, hi))
 
+    async def _interpolate(self, db: aiosqlite.Connection, sid: int, stamps: List[int]) -> List[ua.DataValue]:
+        # Por instante, só o último ponto até ele e o primeiro depois (seek com LIMIT 1,
+        # em qualquer partição ou bloco); instantes seguidos entre os mesmos dois
+        # pontos reaproveitam o par sem nova leitura
+        bracket: Optional[tuple] = None  # (t0, v0, t1, v1); None nas pontas sem ponto
         out: List[ua.DataValue] = []
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(query, params) as cur:
-                async for ts, value in cur:
-                    dv = ua.DataValue(ua.Variant(value, ua.VariantType.Double))
-                    dv.SourceTimestamp = datetime.fromisoformat(ts)
-                    out.append(dv)
-                    if num_values and len(out) >= num_values:
-                        break
+        for ts_us in stamps:
+            if bracket is None or not (
+                (bracket[0] is None or bracket[0] <= ts_us) and (bracket[2] is None or ts_us < bracket[2])
+            ):
+                prev = await self._points(db, sid, _MIN_TS, ts_us, descending=True, limit=1, not_null=True)
+                nxt = await self._points(db, sid, ts_us + 1, _MAX_TS, limit=1, not_null=True)
+                bracket = (*(prev[0] if prev else (None, None)), *(nxt[0] if nxt else (None, None)))
+            t0, v0, t1, v1 = bracket
+            ts = from_epoch_us(ts_us)
+            if t0 is None:
+                out.append(ua.DataValue(StatusCode_=_status(ua.StatusCodes.BadNoData), SourceTimestamp=ts, ServerTimestamp=ts))
+                continue
+            if t0 == ts_us:
+                value, status = v0, ua.StatusCodes.Good
+            elif t1 is None:
+                value, status = v0, ua.StatusCodes.UncertainDataSubNormal
+            else:
+                value, status = v0 + (v1 - v0) * (ts_us - t0) / (t1 - t0), ua.StatusCodes.Good
+            out.append(ua.DataValue(
+                ua.Variant(value, ua.VariantType.Double),
+                StatusCode_=_status(status),
+                SourceTimestamp=ts,
+                ServerTimestamp=ts,
+            ))
         return out
 
+    async def _event_result(self, rv: ua.HistoryReadValueId, details: ua.ReadEventDetails) -> ua.HistoryReadResult:
+        result = ua.HistoryReadResult()
+        after: Optional[Tuple[str, int]] = None
+        if rv.ContinuationPoint:
+            # (ts, id) da 1ª linha fora da página anterior
+            buf = Buffer(rv.ContinuationPoint)
+            after = ua.ua_binary.Primitives.String.unpack(buf), ua.ua_binary.Primitives.Int64.unpack(buf)
+        try:
+            events, cont = await self.read_event_history(
+                rv.NodeId, details.StartTime, details.EndTime, details.NumValuesPerNode, details.Filter, after
+            )
+        except ua.UaStatusCodeError as exc:
+            result.StatusCode = _status(exc.code)
+            return result
+        result.HistoryData = ua.HistoryEvent()
+        result.HistoryData.Events = [
+            ua.HistoryEventFieldList(EventFields=ev.to_event_fields(details.Filter.SelectClauses)) for ev in events
+        ]
+        if cont:
+            result.ContinuationPoint = ua.ua_binary.Primitives.String.pack(cont[0]) + ua.ua_binary.Primitives.Int64.pack(cont[1])
+        return result
+
     async def read_event_history(
         self,
-        source: Any,
+        source_id: ua.NodeId,
         start: Optional[datetime],
         end: Optional[datetime],
-        num_events: int = 0,
-        cont: Any = None,
-    ):
+        nb_values: int,
+        evfilter: Optional[ua.EventFilter],
+        after: Optional[Tuple[str, int]] = None,
+    ) -> Tuple[List[Event], Optional[Tuple[str, int]]]:
         """
-        Opcional: para HistoryRead(Event). Se quiser, retorne tuplas/structures
-        coerentes com o tipo de evento que você disparou (BaseEventType ou custom).
-        Por simplicidade, pode retornar lista vazia inicialmente e evoluir depois.
+        HistoryRead(Event) sobre as partições de event_history. Filtros de Severity/
+        Category/Message/SourceNode/Time do where-clause viram SQL (índices (ts),
+        (category, ts) e (severity, ts)); um where-clause sem tradução levanta
+        UaStatusCodeError (BadFilterOperatorUnsupported / BadContentFilterInvalid),
+        que vira o StatusCode do resultado. A ordem é (ts, id) e a paginação usa
+        essa chave: se houver mais eventos, devolve (ts, id) do próximo, que volta
+        como `after` junto com o mesmo start/end (eventos com o mesmo ts não se
+        repetem nem se perdem na virada da página).
+        O EventId é "<partição>:<id>", único entre partições.
         """
-        return []
+        lo, hi, order = _time_bounds(start, end)
+        page = min(nb_values, self.max_history_data_response_size) if nb_values else self.max_history_data_response_size
+        sql = ["ts BETWEEN ? AND ?"]
+        if after is not None:
+            # Eventos de um mesmo ts ficam na mesma partição, então o id desempata
+            after_ts, after_id = after
+            after_us = to_epoch_us(datetime.fromisoformat(after_ts))
+            if order == "DESC":
+                hi = min(hi, after_us)
+                sql.append("(ts < ? OR (ts = ? AND id <= ?))")
+            else:
+                lo = max(lo, after_us)
+                sql.append("(ts > ? OR (ts = ? AND id >= ?))")
+        params: List[Any] = [_iso(lo, ""), _iso(hi, "9999")]
+        if after is not None:
+            params.extend((after_ts, after_ts, after_id))
+
+        if source_id not in _ALL_EVENTS:
+            sources = self._notifiers.get(source_id) or (source_id.to_string(),)
+            sql.append(f"source IN ({', '.join('?' * len(sources))})")
+            params.extend(sources)
+
+        where = getattr(evfilter, "WhereClause", None)
+        if where is not None and where.Elements:
+            where_params: List[Any] = []
+            try:
+                sql.append(self._filter_element(where.Elements, 0, where_params))
+                params.extend(where_params)
+            except _UnsupportedFilter as exc:
+                # Sem tradução para SQL: recusa a leitura em vez de devolver eventos sem filtrar
+                logger.debug("HistoryRead(Event): where-clause não suportado ({})", exc)
+                raise ua.UaStatusCodeError(exc.code) from exc
+
+        query = f"""
+            SELECT '{{table}}:' || id, ts, source, message, severity, category, id
+            FROM "{{table}}"
+            WHERE {' AND '.join(sql)}
+            ORDER BY ts {order}, id {order}
+            LIMIT ?
+        """
+        async with self.storage.readers.snapshot() as db:
+            rows = await self._scan(db, EVENTS, lo, hi, query, params, order == "DESC", page + 1)
+
+        out: List[Event] = []
+        cont: Optional[Tuple[str, int]] = None
+        for row in rows:
+            if len(out) == page:
+                cont = row[1], row[6]
+                break
+            out.append(await self._row_to_event(*row[:6]))
+        return out, cont
+
+    async def _row_to_event(self, event_id: str, ts: str, source: str, message: str, severity: int, category: str) -> Event:
+        time = datetime.fromisoformat(ts)
+        if time.tzinfo is None:
+            time = time.replace(tzinfo=timezone.utc)
+        try:
+            source_node = ua.NodeId.from_string(source)
+        except Exception:  # noqa: BLE001
+            source_node = ua.NodeId()
+
+        ev = Event(source_node)
+        ev.add_property("EventId", event_id.encode(), ua.VariantType.ByteString)
+        ev.add_property("EventType", self.event_type_id, ua.VariantType.NodeId)
+        ev.add_property("SourceNode", source_node, ua.VariantType.NodeId)
+        ev.add_property("SourceName", await self._source_name(source, source_node), ua.VariantType.String)
+        ev.add_property("Time", time, ua.VariantType.DateTime)
+        ev.add_property("ReceiveTime", time, ua.VariantType.DateTime)
+        ev.add_property("Message", ua.LocalizedText(message), ua.VariantType.LocalizedText)
+        ev.add_property("Severity", severity, ua.VariantType.UInt16)
+        ev.add_property("Category", category, ua.VariantType.String)
+        return ev
+
+    async def _source_name(self, source: str, node_id: ua.NodeId) -> str:
+        name = self._source_names.get(source)
+        if name is None:
+            name = source
+            if self.server is not None and not node_id.is_null():
+                try:
+                    name = (await self.server.get_node(node_id).read_browse_name()).Name
+                except Exception:  # noqa: BLE001
+                    pass
+            self._source_names[source] = name
+        return name
+
+    # Where-clause (ContentFilter) -> SQL
+
+    def _filter_element(self, elements: List[ua.ContentFilterElement], index: int, params: List[Any]) -> str:
+        el = elements[index]
+        op, operands = el.FilterOperator, el.FilterOperands
+        if op in _COMPARISONS:
+            left = self._filter_operand(elements, operands[0], params)
+            right = self._filter_operand(elements, operands[1], params)
+            return f"({left} {_COMPARISONS[op]} {right})"
+        if op in (ua.FilterOperator.And, ua.FilterOperator.Or):
+            joiner = " AND " if op == ua.FilterOperator.And else " OR "
+            return "(" + joiner.join(self._filter_operand(elements, o, params) for o in operands) + ")"
+        if op == ua.FilterOperator.Not:
+            return f"(NOT {self._filter_operand(elements, operands[0], params)})"
+        if op == ua.FilterOperator.IsNull:
+            return f"({self._filter_operand(elements, operands[0], params)} IS NULL)"
+        if op == ua.FilterOperator.Between:
+            a, b, c = (self._filter_operand(elements, o, params) for o in operands[:3])
+            return f"({a} BETWEEN {b} AND {c})"
+        if op == ua.FilterOperator.InList:
+            first, *rest = (self._filter_operand(elements, o, params) for o in operands)
+            return f"({first} IN ({', '.join(rest)}))"
+        if op == ua.FilterOperator.OfType:
+            # Todas as linhas são do tipo registrado (subtipo de BaseEventType)
+            type_id = operands[0].Value.Value
+            return "1" if type_id in (self.event_type_id, ua.NodeId(ua.ObjectIds.BaseEventType)) else "0"
+        raise _UnsupportedFilter(op.name, ua.StatusCodes.BadFilterOperatorUnsupported)
+
+    def _filter_operand(self, elements: List[ua.ContentFilterElement], operand: Any, params: List[Any]) -> str:
+        if isinstance(operand, ua.ElementOperand):
+            return self._filter_element(elements, operand.Index, params)
+        if isinstance(operand, ua.SimpleAttributeOperand):
+            name = operand.BrowsePath[0].Name if operand.BrowsePath else None
+            if name == "EventType":
+                params.append(self.event_type_id.to_string())
+                return "?"
+            column = _EVENT_COLUMNS.get(name)
+            if column is None:
+                raise _UnsupportedFilter(f"campo {name}")
+            return column
+        if isinstance(operand, ua.LiteralOperand):
+            value = operand.Value.Value
+            if isinstance(value, ua.LocalizedText):
+                value = value.Text
+            elif isinstance(value, ua.NodeId):
+                value = value.to_string()
+            elif isinstance(value, datetime):
+                value = _iso(to_epoch_us(value), "")
+            params.append(value)
+            return "?"
+        raise _UnsupportedFilter(type(operand).__name__)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# (tópico, payload bruto, instante de recebimento em time.monotonic())
+IngestItem = Tuple[str, bytes, float]
+IngestHandler = Callable[[List[IngestItem]], Awaitable[None]]
+
+# Política quando a fila de um shard está cheia
+OVERFLOW_BLOCK = "block"              # o callback MQTT aguarda espaço
+OVERFLOW_DROP_OLDEST = "drop-oldest"  # descarta a mensagem mais antiga do shard
+OVERFLOW_COALESCE = "coalesce"        # substitui o último payload pendente do mesmo tópico
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE)
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_BATCH = 64  # mensagens já enfileiradas entregues juntas ao handler
+
+
+class _CoalescingQueue(asyncio.Queue):
+    """
+    Fila FIFO que, cheia, aceita um payload novo no lugar do último pendente do
+    mesmo tópico (na mesma posição); com espaço, todos os payloads entram.
+    """
+
+    def _init(self, maxsize):
+        self._queue: Deque[List[IngestItem]] = deque()
+        self._last: Dict[str, List[IngestItem]] = {}  # tópico -> posição do último pendente
+
+    def _put(self, item: IngestItem):
+        slot = [item]
+        self._queue.append(slot)
+        self._last[item[0]] = slot
+
+    def _get(self) -> IngestItem:
+        slot = self._queue.popleft()
+        item = slot[0]
+        if self._last.get(item[0]) is slot:
+            del self._last[item[0]]
+        return item
+
+    def replace(self, item: IngestItem) -> bool:
+        slot = self._last.get(item[0])
+        if slot is None:
+            return False
+        slot[0] = item
+        return True
+
+
+class IngestQueue:
+    """
+    Estágio de ingestão entre o callback MQTT e o processamento.
+
+    O callback só enfileira (tópico, payload, recv_time); `workers` tasks consomem
+    e chamam `handler` com a lista das mensagens já disponíveis no shard (até
+    `batch` de uma vez, sem esperar por mais). O shard vem de `key` (o ativo da
+    rota; sem key, o tópico): todos os tópicos de um ativo, aliases incluídos,
+    caem no mesmo shard, e cada shard tem um único worker, o que preserva a
+    ordem por ativo. A capacidade total `max_queue` é dividida entre os shards;
+    as políticas de overflow só agem com o shard cheio.
+    """
+
+    def __init__(
+        self,
+        handler: IngestHandler,
+        workers: int = DEFAULT_WORKERS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        policy: str = OVERFLOW_BLOCK,
+        batch: int = DEFAULT_BATCH,
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"política de overflow inválida: {policy!r} (use {', '.join(OVERFLOW_POLICIES)})")
+        self.handler = handler
+        self.policy = policy
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.batch = max(1, batch)
+
+        per_shard = max(1, max_queue // self.workers)
+        queue_cls = _CoalescingQueue if policy == OVERFLOW_COALESCE else asyncio.Queue
+        self._shards: List[asyncio.Queue] = [queue_cls(maxsize=per_shard) for _ in range(self.workers)]
+        self._tasks: List[asyncio.Task] = []
+
+        # Contadores
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.max_lag = 0.0  # maior atraso recebimento->fim do handler (s) desde o último stats(reset=True)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(q), name=f"ingest-worker-{i}") for i, q in enumerate(self._shards)
+        ]
+
+    async def stop(self, drain: bool = True):
+        """Encerra os workers; com `drain`, processa antes o que já estava na fila."""
+        if drain and self._tasks:
+            await asyncio.gather(*(q.join() for q in self._shards))
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._shards)
+
+    def stats(self, reset: bool = False) -> Dict[str, float]:
+        out = {
+            "depth": self.depth,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
+        if reset:
+            self.max_lag = 0.0
+        return out
+
+    async def put(self, topic: str, payload: bytes, recv_time: float | None = None, key: Optional[str] = None):
+        item = (topic, payload, time.monotonic() if recv_time is None else recv_time)
+        self.received += 1
+        q = self._shards[hash(topic if key is None else key) % self.workers]
+
+        if self.policy == OVERFLOW_BLOCK or not q.full():
+            await q.put(item)
+            return
+        if self.policy == OVERFLOW_COALESCE and q.replace(item):
+            self.coalesced += 1
+            return
+        q.get_nowait()
+        q.task_done()
+        self.dropped += 1
+        q.put_nowait(item)
+
+    async def _worker(self, q: asyncio.Queue):
+        while True:
+            items = [await q.get()]
+            while len(items) < self.batch and not q.empty():
+                items.append(q.get_nowait())
+            try:
+                await self.handler(items)
+                self.processed += len(items)
+            except Exception as exc:  # noqa: BLE001
+                self.failed += len(items)
+                logger.exception("Ingest: falha ao processar lote de {} mensagens: {}", len(items), exc)
+            finally:
+                lag = time.monotonic() - items[0][2]
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                for _ in items:
+                    q.task_done()
@@ -0,0 +1,371 @@
+"""
+Migrações de schema do banco de histórico (scgdi_history.sqlite).
+
+v1 (legado): var_history(id, ts TEXT ISO-8601, path TEXT, value, extra TEXT '{}')
+v2:          series(id, path) + var_history(series_id, ts INTEGER µs, value, extra)
+             clusterizado por (series_id, ts) em tabela WITHOUT ROWID.
+v3:          event_history.source passa de repr(NodeId) para NodeId.to_string()
+             ("ns=2;i=2"), para que o HistoryRead de eventos filtre por fonte.
+v4:          var_rollup(resolution, series_id, bucket, samples, total, vmin, vmax):
+             agregados por 1 min / 1 h mantidos pelo writer; preenchida a partir
+             de var_history na migração.
+v5:          var_history / var_rollup / event_history divididos em partições por
+             tempo (src/partitions.py, catálogo `partitions`); as tabelas únicas
+             são esvaziadas para as partições e removidas.
+
+Tabelas "<ns>_<id>" do HistorySQLite do asyncua (histórico por nó, gravado pelas
+versões antigas em paralelo a var_history) são importadas para series/var_history
+antes do v4, pelo caminho do nó no address space do motor único
+(model.VARIABLES); as amostras que var_history já cobre não são duplicadas.
+Tabelas sem caminho conhecido (ex.: eventos) ficam, a menos que `drop_legacy`.
+
+A conversão é feita no próprio arquivo, em blocos: cada bloco é copiado para a
+tabela nova e removido da antiga na mesma transação, então uma migração
+interrompida pode ser retomada chamando migrate() de novo.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+SCHEMA_VERSION = 5
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+SERIES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE   -- caminho da variável no address space
+);
+"""
+
+VAR_HISTORY_V2_SQL = """
+CREATE TABLE IF NOT EXISTS var_history (
+    series_id INTEGER NOT NULL REFERENCES series(id),
+    ts INTEGER NOT NULL,        -- epoch UTC em microssegundos
+    value REAL,
+    extra TEXT,                 -- JSON opcional (NULL quando vazio)
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+"""
+
+# Resoluções (s) mantidas em var_rollup, da mais fina para a mais grossa
+ROLLUP_RESOLUTIONS = (60, 3600)
+
+VAR_ROLLUP_SQL = """
+CREATE TABLE IF NOT EXISTS var_rollup (
+    resolution INTEGER NOT NULL,  -- duração do intervalo em s (ROLLUP_RESOLUTIONS)
+    series_id INTEGER NOT NULL REFERENCES series(id),
+    bucket INTEGER NOT NULL,      -- início do intervalo, epoch UTC em µs
+    samples INTEGER NOT NULL,     -- nº de amostras recebidas
+    total REAL NOT NULL,          -- soma dos valores (média = total / samples)
+    vmin REAL NOT NULL,
+    vmax REAL NOT NULL,
+    PRIMARY KEY (resolution, series_id, bucket)
+) WITHOUT ROWID;
+"""
+
+LEGACY_TABLE = "var_history_v1"
+
+# Tabelas únicas anteriores ao particionamento (v5), na ordem em que são migradas
+UNPARTITIONED_TABLES = ("var_history", "var_rollup", "event_history")
+
+# Tabelas do HistorySQLite do asyncua: "<ns>_<id>" (nó com histórico)
+_ASYNCUA_TABLE = re.compile(r"\d+_\d+")
+
+# VariantType (texto) das variáveis numéricas gravadas pelo HistorySQLite do asyncua
+_NUMERIC_VARIANTS = {
+    "Boolean", "SByte", "Byte", "Int16", "UInt16", "Int32", "UInt32", "Int64", "UInt64", "Float", "Double",
+}
+
+# Folga nas pontas da faixa já coberta por var_history: a mesma leitura gravada pelos
+# dois caminhos difere de alguns ms no timestamp
+_ASYNCUA_OVERLAP_US = 1_000_000
+
+# NodeId(Identifier=85, NamespaceIndex=0, NodeIdType=<NodeIdType.TwoByte: 0>)
+_NODEID_REPR = re.compile(r"NodeId\(Identifier=(.+?), NamespaceIndex=(\d+), NodeIdType=<NodeIdType\.(\w+): \d+>\)")
+
+
+def to_epoch_us(ts: str | datetime) -> int:
+    """Converte ISO-8601 (ou datetime) para epoch UTC em microssegundos. Sem fuso => UTC."""
+    dt = datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // _US
+
+
+def from_epoch_us(ts_us: int) -> datetime:
+    return EPOCH + timedelta(microseconds=ts_us)
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+
+
+def _user_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _has_legacy_vars(conn: sqlite3.Connection) -> bool:
+    return "path" in _columns(conn, "var_history") or bool(_columns(conn, LEGACY_TABLE))
+
+
+def asyncua_tables(conn: sqlite3.Connection) -> list[str]:
+    """Tabelas de histórico por nó deixadas pelo HistorySQLite do asyncua."""
+    names = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return sorted((name for (name,) in names if _ASYNCUA_TABLE.fullmatch(name)), key=lambda n: tuple(map(int, n.split("_"))))
+
+
+def asyncua_table_paths(ns: int = 2) -> dict[str, str]:
+    """
+    Tabela "<ns>_<id>" -> caminho da variável no address space do motor único, pela
+    numeração sequencial do namespace: i=1 é o motor, cada grupo e cada variável
+    recebem o próximo id na ordem de model.VARIABLES.
+    """
+    from .model import MOTOR_NODE_NAME, VARIABLES
+
+    paths: dict[str, str] = {}
+    groups: set[str] = set()
+    next_id = 2
+    for group, name, *_ in VARIABLES:
+        if group not in groups:
+            groups.add(group)
+            next_id += 1
+        paths[f"{ns}_{next_id}"] = f"{MOTOR_NODE_NAME}.{group}.{name}"
+        next_id += 1
+    return paths
+
+
+def needs_migration(conn: sqlite3.Connection) -> bool:
+    """True se o banco existe e não está no schema atual (inclui migração pela metade)."""
+    if _has_legacy_vars(conn):
+        return True
+    return any(_columns(conn, table) for table in UNPARTITIONED_TABLES)
+
+
+def nodeid_from_repr(text: str) -> str:
+    """Converte o repr() de um NodeId (formato gravado até o v2) para NodeId.to_string()."""
+    m = _NODEID_REPR.fullmatch(text)
+    if not m:
+        return text
+    ident, ns, kind = m.group(1), int(m.group(2)), m.group(3)
+    prefix = f"ns={ns};" if ns else ""
+    if kind in ("TwoByte", "FourByte", "Numeric"):
+        return f"{prefix}i={ident}"
+    if kind == "String":
+        return prefix + "s=" + ident.strip("'")
+    return text
+
+
+def migrate(
+    db_path: str,
+    chunk_size: int = 50_000,
+    vacuum: bool = True,
+    progress: Optional[Callable[[int], None]] = None,
+    partition_span: Optional[int] = None,
+    drop_legacy: bool = False,
+) -> int:
+    """
+    Leva o banco ao SCHEMA_VERSION no próprio arquivo. Retorna o nº de amostras
+    migradas de var_history v1 e das tabelas do asyncua. `progress` recebe o total
+    acumulado após cada bloco. `partition_span` (s) é a faixa das partições criadas
+    no v5 (padrão: 1 dia). `drop_legacy` remove as tabelas do asyncua que não
+    puderam ser importadas.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if not needs_migration(conn) and not (drop_legacy and asyncua_tables(conn)):
+            return 0
+        total = 0
+        if _has_legacy_vars(conn):
+            total = _migrate_var_history_v2(conn, chunk_size, progress)
+        if _columns(conn, "var_history") and asyncua_tables(conn):
+            total += _import_asyncua_tables(conn, chunk_size)
+            if progress:
+                progress(total)
+        if _columns(conn, "event_history"):
+            _migrate_event_sources_v3(conn, chunk_size)
+        if _columns(conn, "var_history") and not _columns(conn, "var_rollup"):
+            _migrate_rollups_v4(conn)
+        if any(_columns(conn, table) for table in UNPARTITIONED_TABLES):
+            _migrate_partitions_v5(conn, chunk_size, partition_span)
+        if drop_legacy:
+            for table in asyncua_tables(conn):
+                conn.execute(f'DROP TABLE "{table}"')
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if vacuum and (total or drop_legacy):
+            conn.execute("VACUUM")
+        return total
+    finally:
+        conn.close()
+
+
+def _migrate_var_history_v2(
+    conn: sqlite3.Connection, chunk_size: int, progress: Optional[Callable[[int], None]]
+) -> int:
+    conn.execute("BEGIN IMMEDIATE")
+    if "path" in _columns(conn, "var_history"):
+        conn.execute(f'ALTER TABLE var_history RENAME TO "{LEGACY_TABLE}"')
+    conn.execute(SERIES_TABLE_SQL)
+    conn.execute(VAR_HISTORY_V2_SQL)
+    conn.execute(f'INSERT OR IGNORE INTO series (path) SELECT DISTINCT path FROM "{LEGACY_TABLE}"')
+    conn.execute("COMMIT")
+
+    series = dict(conn.execute("SELECT path, id FROM series"))
+    select_sql = f'SELECT id, ts, path, value, extra FROM "{LEGACY_TABLE}" WHERE id > ? ORDER BY id LIMIT ?'
+    total, last_id = 0, -1
+    while True:
+        rows = conn.execute(select_sql, (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        out = []
+        for _id, ts, path, value, extra in rows:
+            try:
+                ts_us = to_epoch_us(ts)
+            except (TypeError, ValueError):
+                continue  # timestamp ilegível: descarta a linha
+            out.append((series[path], ts_us, value, extra if extra and extra != "{}" else None))
+        last_id = rows[-1][0]
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO var_history (series_id, ts, value, extra) VALUES (?, ?, ?, ?)", out
+        )
+        conn.execute(f'DELETE FROM "{LEGACY_TABLE}" WHERE id <= ?', (last_id,))
+        conn.execute("COMMIT")
+
+        total += len(out)
+        if progress:
+            progress(total)
+
+    conn.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+    return total
+
+
+def _import_asyncua_tables(conn: sqlite3.Connection, chunk_size: int) -> int:
+    """
+    Copia as tabelas do asyncua com caminho conhecido para var_history (v2) e as
+    remove; cada tabela numa transação, então uma migração interrompida retoma
+    na próxima tabela. Amostras dentro da faixa [primeira, última] que a série já
+    tem em var_history (± _ASYNCUA_OVERLAP_US) são a mesma leitura gravada pelos
+    dois caminhos e ficam de fora.
+    """
+    paths = asyncua_table_paths()
+    total = 0
+    for table in asyncua_tables(conn):
+        path = paths.get(table)
+        if path is None or "VariantBinary" not in _columns(conn, table):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR IGNORE INTO series (path) VALUES (?)", (path,))
+        (sid,) = conn.execute("SELECT id FROM series WHERE path = ?", (path,)).fetchone()
+        first, last = conn.execute(
+            "SELECT MIN(ts), MAX(ts) FROM var_history WHERE series_id = ?", (sid,)
+        ).fetchone()
+        cur = conn.execute(
+            f'SELECT COALESCE(SourceTimestamp, ServerTimestamp), Value, VariantType FROM "{table}" ORDER BY _Id'
+        )
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            out = []
+            for ts, value, vtype in rows:
+                if vtype not in _NUMERIC_VARIANTS:
+                    continue
+                try:
+                    ts_us = to_epoch_us(ts)
+                    value = float(value == "True") if vtype == "Boolean" else float(value)
+                except (TypeError, ValueError):
+                    continue  # timestamp ou valor ilegível: descarta a linha
+                if first is not None and first - _ASYNCUA_OVERLAP_US <= ts_us <= last + _ASYNCUA_OVERLAP_US:
+                    continue
+                out.append((sid, ts_us, value))
+            conn.executemany("INSERT OR IGNORE INTO var_history (series_id, ts, value) VALUES (?, ?, ?)", out)
+            total += len(out)
+        conn.execute(f'DROP TABLE "{table}"')
+        conn.execute("COMMIT")
+    return total
+
+
+def _migrate_event_sources_v3(conn: sqlite3.Connection, chunk_size: int) -> None:
+    last_id = -1
+    while True:
+        rows = conn.execute(
+            "SELECT id, source FROM event_history WHERE id > ? AND source LIKE 'NodeId(%' ORDER BY id LIMIT ?",
+            (last_id, chunk_size),
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "UPDATE event_history SET source = ? WHERE id = ?",
+            [(nodeid_from_repr(source), _id) for _id, source in rows],
+        )
+        conn.execute("COMMIT")
+        last_id = rows[-1][0]
+
+
+def _migrate_rollups_v4(conn: sqlite3.Connection) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(VAR_ROLLUP_SQL)
+    for res in ROLLUP_RESOLUTIONS:
+        res_us = res * 1_000_000
+        conn.execute(
+            """
+            INSERT INTO var_rollup (resolution, series_id, bucket, samples, total, vmin, vmax)
+            SELECT ?, series_id, ts - ts % ?, COUNT(value), SUM(value), MIN(value), MAX(value)
+            FROM var_history
+            WHERE value IS NOT NULL
+            GROUP BY series_id, ts - ts % ?
+            """,
+            (res, res_us, res_us),
+        )
+    conn.execute("COMMIT")
+
+
+def _migrate_partitions_v5(conn: sqlite3.Connection, chunk_size: int, span_s: Optional[int]) -> None:
+    # Import tardio: partitions importa os helpers de epoch deste módulo
+    from .partitions import (
+        DEFAULT_PARTITION_SPAN, EVENTS, PARTITIONS_TABLE_SQL, RAW, ROLLUP, ensure_partition, load_catalog,
+    )
+
+    conn.execute(PARTITIONS_TABLE_SQL)
+    catalog = load_catalog(conn, span_s or DEFAULT_PARTITION_SPAN)
+
+    # var_history sai antes de var_rollup: se a migração parar no meio, o v4 não
+    # recalcula var_rollup a partir de uma var_history já parcialmente movida
+    moves = (
+        (RAW, "series_id, ts", "series_id, ts, value, extra", lambda row: row[1]),
+        (ROLLUP, "resolution, series_id, bucket", "resolution, series_id, bucket, samples, total, vmin, vmax",
+         lambda row: row[2]),
+        (EVENTS, "id", "id, ts, source, message, severity, category", lambda row: to_epoch_us(row[1])),
+    )
+    for cls, key, cols, ts_of in moves:
+        if not _columns(conn, cls):
+            continue
+        nkey = key.count(",") + 1
+        select_sql = f"SELECT {cols} FROM {cls} ORDER BY {key} LIMIT ?"
+        delete_sql = f"DELETE FROM {cls} WHERE ({key}) <= ({', '.join('?' * nkey)})"
+        placeholders = ", ".join("?" * (cols.count(",") + 1))
+        while True:
+            rows = conn.execute(select_sql, (chunk_size,)).fetchall()
+            if not rows:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            by_table: dict[str, list] = {}
+            for row in rows:
+                try:
+                    ts_us = ts_of(row)
+                except (TypeError, ValueError):
+                    continue  # timestamp ilegível: descarta a linha
+                by_table.setdefault(ensure_partition(conn, catalog, cls, ts_us), []).append(row)
+            for table, part in by_table.items():
+                conn.executemany(f'INSERT OR REPLACE INTO "{table}" ({cols}) VALUES ({placeholders})', part)
+            conn.execute(delete_sql, rows[-1][:nkey])
+            conn.execute("COMMIT")
+        conn.execute(f"DROP TABLE {cls}")
@@ -1,10 +1,21 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import Dict, Optional
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, Optional
+
+
+# Os payloads são validados direto dos bytes MQTT com Model.model_validate_json();
+# o formato legado (chaves "Voltage", "Temperature", "Accell_X", ...) é convertido
+# nos validators abaixo, sem json.loads + dict intermediário no caminho de ingestão.
+# O timestamp é validado como datetime (ISO-8601; sem fuso = UTC no servidor): um
+# valor ilegível é ValidationError como qualquer outro campo, não um erro no handler.
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 class ElectricalPayload(BaseModel):
-    timestamp: str
+    timestamp: datetime
     voltage: Dict[str, float]
     current: Dict[str, float]
     power: Dict[str, float]
@@ -12,17 +23,61 @@ class ElectricalPayload(BaseModel):
     powerFactor: float
     frequency: float
 
+    @model_validator(mode="before")
+    @classmethod
+    def _legacy(cls, data: Any) -> Any:
+        # Legado: {"Voltage": v, "Current": i, "Power": p} (monofásico, sem timestamp)
+        if isinstance(data, dict) and ("Voltage" in data or "Current" in data or "Power" in data):
+            v = data.get("Voltage", 0.0)
+            i = data.get("Current", 0.0)
+            p = data.get("Power", 0.0)
+            return {
+                "timestamp": _now(),
+                "voltage": {"a": v, "b": v, "c": v},
+                "current": {"a": i, "b": i, "c": i},
+                "power": {"active": p, "reactive": 0.0, "apparent": p},
+                "energy": {"active": 0.0, "reactive": 0.0, "apparent": 0.0},
+                "powerFactor": 0.95,
+                "frequency": 60.0,
+            }
+        return data
+
 class EnvironmentPayload(BaseModel):
-    timestamp: str
+    timestamp: datetime
     temperature: float
     humidity: float
     caseTemperature: float
 
+    @model_validator(mode="before")
+    @classmethod
+    def _legacy(cls, data: Any) -> Any:
+        # Legado: {"Temperature", "Humidity", "CaseTemperature"}
+        if isinstance(data, dict) and ("Temperature" in data or "Humidity" in data or "CaseTemperature" in data):
+            return {
+                "timestamp": _now(),
+                "temperature": data.get("Temperature", 0.0),
+                "humidity": data.get("Humidity", 0.0),
+                "caseTemperature": data.get("CaseTemperature", 0.0),
+            }
+        return data
+
 class VibrationPayload(BaseModel):
-    timestamp: str
+    timestamp: datetime
     axial: float
     radial: float
 
+    @model_validator(mode="before")
+    @classmethod
+    def _legacy(cls, data: Any) -> Any:
+        # Legado: acelerômetro {"Accell_X", "Accell_Y", "Accell_Z"} -> axial = X, radial = Y
+        if isinstance(data, dict) and ("Accell_X" in data or "Accell_Y" in data or "Accell_Z" in data):
+            return {
+                "timestamp": _now(),
+                "axial": data.get("Accell_X", 0.0),
+                "radial": data.get("Accell_Y", 0.0),
+            }
+        return data
+
 SEVERITY = {
     "INFO": 100,
     "LOW": 250,
@@ -37,11 +92,98 @@ NOMINAL_CURRENT = 10.0
 # Limites para alarmes
 OVER_UNDER_TOL = 0.10  
 CASE_TEMP_CRIT = 60.0 
+VIBRATION_WARN = 0.2
 
 # Nomes de tópicos
 TOPIC_ELEC = "scgdi/motor/electrical"
 TOPIC_ENV = "scgdi/motor/environment"
 TOPIC_VIB = "scgdi/motor/vibration"
 
+# Todos os tópicos aceitos por tipo de payload (nomes atuais, scgdi/sensor/* e aliases em português)
+TOPICS_ELEC = (TOPIC_ELEC, "scgdi/sensor/electrical", "scgdi/sensor/energia")
+TOPICS_ENV = (TOPIC_ENV, "scgdi/sensor/environment", "scgdi/sensor/ambiente")
+TOPICS_VIB = (TOPIC_VIB, "scgdi/sensor/vibration", "scgdi/sensor/vibracao")
+
 # Estrutura dos nós/variáveis do servidor
-MOTOR_NODE_NAME = "Motor50CV"
\ No newline at end of file
+MOTOR_NODE_NAME = "Motor50CV"
+
+# Variáveis de cada motor, uma linha por variável (ordem = ordem de criação no address space):
+# (grupo, nome, campo do payload, chave dentro do campo, limite inferior, limite superior)
+VARIABLES = (
+    ("Electrical", "VoltageA", "voltage", "a", NOMINAL_VOLTAGE * (1 - OVER_UNDER_TOL), NOMINAL_VOLTAGE * (1 + OVER_UNDER_TOL)),
+    ("Electrical", "VoltageB", "voltage", "b", NOMINAL_VOLTAGE * (1 - OVER_UNDER_TOL), NOMINAL_VOLTAGE * (1 + OVER_UNDER_TOL)),
+    ("Electrical", "VoltageC", "voltage", "c", NOMINAL_VOLTAGE * (1 - OVER_UNDER_TOL), NOMINAL_VOLTAGE * (1 + OVER_UNDER_TOL)),
+    ("Electrical", "CurrentA", "current", "a", None, NOMINAL_CURRENT * (1 + OVER_UNDER_TOL)),
+    ("Electrical", "CurrentB", "current", "b", None, NOMINAL_CURRENT * (1 + OVER_UNDER_TOL)),
+    ("Electrical", "CurrentC", "current", "c", None, NOMINAL_CURRENT * (1 + OVER_UNDER_TOL)),
+    ("Electrical", "PowerActive", "power", "active", None, None),
+    ("Electrical", "PowerReactive", "power", "reactive", None, None),
+    ("Electrical", "PowerApparent", "power", "apparent", None, None),
+    ("Electrical", "EnergyActive", "energy", "active", None, None),
+    ("Electrical", "EnergyReactive", "energy", "reactive", None, None),
+    ("Electrical", "EnergyApparent", "energy", "apparent", None, None),
+    ("Electrical", "PowerFactor", "powerFactor", None, None, None),
+    ("Electrical", "Frequency", "frequency", None, None, None),
+    ("Environment", "Temperature", "temperature", None, None, None),
+    ("Environment", "Humidity", "humidity", None, None, None),
+    ("Environment", "CaseTemperature", "caseTemperature", None, None, CASE_TEMP_CRIT),
+    ("Vibration", "Axial", "axial", None, None, VIBRATION_WARN),
+    ("Vibration", "Radial", "radial", None, None, VIBRATION_WARN),
+)
+
+# Tipo de payload (kind do tópico) -> (modelo, grupo de VARIABLES que ele atualiza)
+PAYLOAD_KINDS = {
+    "electrical": (ElectricalPayload, "Electrical"),
+    "environment": (EnvironmentPayload, "Environment"),
+    "vibration": (VibrationPayload, "Vibration"),
+}
+
+# Regras de alarme sobre os limites de VARIABLES (src/alarms.py):
+# (variável, lado do limite, mensagem ao ativar, mensagem ao normalizar, severidade)
+ALARM_RULES = (
+    ("VoltageA", "high", "Overvoltage detected", "Overvoltage cleared", "HIGH"),
+    ("VoltageB", "high", "Overvoltage detected", "Overvoltage cleared", "HIGH"),
+    ("VoltageC", "high", "Overvoltage detected", "Overvoltage cleared", "HIGH"),
+    ("VoltageA", "low", "Undervoltage detected", "Undervoltage cleared", "HIGH"),
+    ("VoltageB", "low", "Undervoltage detected", "Undervoltage cleared", "HIGH"),
+    ("VoltageC", "low", "Undervoltage detected", "Undervoltage cleared", "HIGH"),
+    ("CurrentA", "high", "Overcurrent detected", "Overcurrent cleared", "HIGH"),
+    ("CurrentB", "high", "Overcurrent detected", "Overcurrent cleared", "HIGH"),
+    ("CurrentC", "high", "Overcurrent detected", "Overcurrent cleared", "HIGH"),
+    ("CaseTemperature", "high", "Case temperature critical", "Case temperature normal", "CRIT"),
+    ("Axial", "high", "Slight vibration increase", "Vibration back to normal", "LOW"),
+    ("Radial", "high", "Slight vibration increase", "Vibration back to normal", "LOW"),
+)
+
+# Defaults do motor de alarmes (sobrescritos por ALARM_HYSTERESIS / ALARM_ON_DELAY / ALARM_OFF_DELAY)
+ALARM_HYSTERESIS = 0.02   # banda de histerese, fração do limite
+ALARM_ON_DELAY = 0.0      # s em violação antes de ativar
+ALARM_OFF_DELAY = 0.0     # s dentro da banda normal antes de normalizar
+
+# Historização por exceção (src/deadband.py): (variável, deadband absoluto, deadband % do valor).
+# Vale o maior dos dois; é a tolerância do valor publicado no nó e do sinal
+# reconstruído do histórico. Dimensionado pelo ruído do publisher (±2 V, ±0,3 A, ...).
+DEADBANDS = (
+    ("VoltageA", 0.0, 2.0),
+    ("VoltageB", 0.0, 2.0),
+    ("VoltageC", 0.0, 2.0),
+    ("CurrentA", 0.6, 0.0),
+    ("CurrentB", 0.6, 0.0),
+    ("CurrentC", 0.6, 0.0),
+    ("PowerActive", 100.0, 0.0),
+    ("PowerReactive", 60.0, 0.0),
+    ("PowerApparent", 100.0, 0.0),
+    ("EnergyActive", 5.0, 0.0),
+    ("EnergyReactive", 2.0, 0.0),
+    ("EnergyApparent", 5.0, 0.0),
+    ("PowerFactor", 0.02, 0.0),
+    ("Frequency", 0.1, 0.0),
+    ("Temperature", 2.0, 0.0),
+    ("Humidity", 6.0, 0.0),
+    ("CaseTemperature", 4.0, 0.0),
+    ("Axial", 0.06, 0.0),
+    ("Radial", 0.06, 0.0),
+)
+
+# Idade máxima (s) do último valor no nó/histórico antes de um ponto forçado (HIST_MAX_INTERVAL)
+HIST_MAX_INTERVAL = 300.0
@@ -0,0 +1,204 @@
+"""
+Particionamento por tempo do histórico (schema v5).
+
+Cada classe de dados (amostras brutas, blocos comprimidos, agregados, eventos) é gravada em tabelas
+com uma faixa de tempo fixa (padrão: 1 dia), listadas no catálogo `partitions`.
+Expirar dados é um DROP TABLE da partição inteira: nada de DELETE grande
+segurando o writer, e as páginas liberadas são reaproveitadas pelas partições
+novas, então o arquivo fica limitado pela janela de retenção.
+"""
+from __future__ import annotations
+
+import sqlite3
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .migrations import from_epoch_us
+
+# Classes de dados (prefixo das tabelas)
+RAW = "var_history"
+CHUNKS = "var_chunks"
+ROLLUP = "var_rollup"
+EVENTS = "event_history"
+CLASSES = (RAW, CHUNKS, ROLLUP, EVENTS)
+
+DEFAULT_PARTITION_SPAN = 86_400  # s
+
+PARTITIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS partitions (
+    class TEXT NOT NULL,        -- var_history | var_chunks | var_rollup | event_history
+    start_us INTEGER NOT NULL,  -- início da faixa, epoch UTC em µs
+    end_us INTEGER NOT NULL,    -- fim da faixa (exclusivo)
+    name TEXT NOT NULL UNIQUE,  -- tabela da partição
+    PRIMARY KEY (class, start_us)
+) WITHOUT ROWID;
+"""
+
+_DDL = {
+    RAW: """
+CREATE TABLE IF NOT EXISTS "{name}" (
+    series_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,        -- epoch UTC em microssegundos
+    value REAL,
+    extra TEXT,                 -- JSON opcional (NULL quando vazio)
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+""",
+    CHUNKS: """
+CREATE TABLE IF NOT EXISTS "{name}" (
+    id INTEGER PRIMARY KEY,
+    series_id INTEGER NOT NULL,
+    first_ts INTEGER NOT NULL,  -- 1ª amostra do bloco, epoch UTC em µs
+    last_ts INTEGER NOT NULL,   -- última amostra do bloco
+    samples INTEGER NOT NULL,
+    vmin REAL,
+    vmax REAL,
+    vfirst REAL,
+    vlast REAL,
+    data BLOB NOT NULL          -- src/chunks.py
+);
+CREATE INDEX IF NOT EXISTS "{name}_series_ts" ON "{name}" (series_id, last_ts);
+""",
+    ROLLUP: """
+CREATE TABLE IF NOT EXISTS "{name}" (
+    resolution INTEGER NOT NULL,
+    series_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    total REAL NOT NULL,
+    vmin REAL NOT NULL,
+    vmax REAL NOT NULL,
+    PRIMARY KEY (resolution, series_id, bucket)
+) WITHOUT ROWID;
+""",
+    EVENTS: """
+CREATE TABLE IF NOT EXISTS "{name}" (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    source TEXT NOT NULL,
+    message TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS "{name}_ts" ON "{name}" (ts);
+CREATE INDEX IF NOT EXISTS "{name}_category_ts" ON "{name}" (category, ts);
+CREATE INDEX IF NOT EXISTS "{name}_severity_ts" ON "{name}" (severity, ts);
+""",
+}
+
+SELECT_PARTITIONS_SQL = "SELECT class, start_us, end_us, name FROM partitions"
+INSERT_PARTITION_SQL = "INSERT OR IGNORE INTO partitions (class, start_us, end_us, name) VALUES (?, ?, ?, ?)"
+DELETE_PARTITION_SQL = "DELETE FROM partitions WHERE name = ?"
+# Partições de uma classe que cruzam [lo, hi] µs, em ordem de tempo ({order} = ASC | DESC)
+OVERLAPPING_PARTITIONS_SQL = """
+SELECT name FROM partitions WHERE class = ? AND start_us <= ? AND end_us > ? ORDER BY start_us {order}
+"""
+
+
+def partition_ddl(cls: str, name: str) -> List[str]:
+    """Statements que criam a tabela (e índices) de uma partição."""
+    return [stmt.strip() for stmt in _DDL[cls].format(name=name).split(";") if stmt.strip()]
+
+
+class PartitionCatalog:
+    """
+    Catálogo em memória (espelho da tabela `partitions`): partição de cada
+    timestamp, partições que cruzam um intervalo e partições vencidas.
+    As faixas de uma classe nunca se sobrepõem, mesmo se o span mudar entre execuções.
+    """
+
+    def __init__(self, span_s: int = DEFAULT_PARTITION_SPAN):
+        if span_s <= 0:
+            raise ValueError("span da partição deve ser positivo")
+        self.span_us = span_s * 1_000_000
+        self._ranges: Dict[str, List[Tuple[int, int, str]]] = {cls: [] for cls in CLASSES}
+        self._starts: Dict[str, List[int]] = {cls: [] for cls in CLASSES}
+
+    def load(self, rows: Iterable[Tuple[str, int, int, str]]):
+        for cls, start, end, name in rows:
+            self.add(cls, start, end, name)
+
+    def reload(self, rows: Iterable[Tuple[str, int, int, str]]):
+        """Troca todo o conteúdo pelas linhas da tabela `partitions` (ex.: após um rollback)."""
+        for cls in CLASSES:
+            self._ranges[cls].clear()
+            self._starts[cls].clear()
+        self.load(rows)
+
+    def add(self, cls: str, start: int, end: int, name: str):
+        ranges, starts = self._ranges[cls], self._starts[cls]
+        i = bisect_right(starts, start)
+        ranges.insert(i, (start, end, name))
+        starts.insert(i, start)
+
+    def remove(self, cls: str, name: str):
+        ranges = self._ranges[cls]
+        for i, (_, _, n) in enumerate(ranges):
+            if n == name:
+                del ranges[i]
+                del self._starts[cls][i]
+                return
+
+    def locate(self, cls: str, ts_us: int) -> Optional[Tuple[str, int, int]]:
+        """(tabela, início, fim) da partição que contém ts_us, ou None."""
+        i = bisect_right(self._starts[cls], ts_us) - 1
+        if i >= 0:
+            start, end, name = self._ranges[cls][i]
+            if ts_us < end:
+                return name, start, end
+        return None
+
+    def find(self, cls: str, ts_us: int) -> Optional[str]:
+        found = self.locate(cls, ts_us)
+        return found[0] if found else None
+
+    def new_range(self, cls: str, ts_us: int) -> Tuple[int, int, str]:
+        """Faixa alinhada ao span que contém ts_us, recortada para não invadir as vizinhas."""
+        start = ts_us - ts_us % self.span_us
+        end = start + self.span_us
+        ranges, starts = self._ranges[cls], self._starts[cls]
+        i = bisect_right(starts, ts_us)
+        if i > 0:
+            start = max(start, ranges[i - 1][1])
+        if i < len(ranges):
+            end = min(end, ranges[i][0])
+        return start, end, f"{cls}_{from_epoch_us(start).strftime('%Y%m%dT%H%M%S')}"
+
+    def overlapping(self, cls: str, lo: int, hi: int, descending: bool = False) -> List[str]:
+        """Tabelas com dados possíveis em [lo, hi], em ordem de tempo."""
+        names = [name for start, end, name in self._ranges[cls] if start <= hi and end > lo]
+        return names[::-1] if descending else names
+
+    def newest(self, cls: str) -> Optional[Tuple[str, int, int]]:
+        """(tabela, início, fim) da partição mais recente de `cls`, ou None."""
+        if not self._ranges[cls]:
+            return None
+        start, end, name = self._ranges[cls][-1]
+        return name, start, end
+
+    def tables(self, cls: str) -> List[str]:
+        return [name for _, _, name in self._ranges[cls]]
+
+    def expired(self, cls: str, cutoff_us: int) -> List[str]:
+        """Partições inteiramente anteriores a cutoff_us (mais antigas primeiro)."""
+        return [name for _, end, name in self._ranges[cls] if end <= cutoff_us]
+
+
+def load_catalog(conn: sqlite3.Connection, span_s: int = DEFAULT_PARTITION_SPAN) -> PartitionCatalog:
+    """Catálogo a partir de uma conexão síncrona (scripts e migração)."""
+    catalog = PartitionCatalog(span_s)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partitions'").fetchone():
+        catalog.load(conn.execute(SELECT_PARTITIONS_SQL))
+    return catalog
+
+
+def ensure_partition(conn: sqlite3.Connection, catalog: PartitionCatalog, cls: str, ts_us: int) -> str:
+    """Versão síncrona de Storage._partition (usada pela migração)."""
+    name = catalog.find(cls, ts_us)
+    if name is None:
+        start, end, name = catalog.new_range(cls, ts_us)
+        for stmt in partition_ddl(cls, name):
+            conn.execute(stmt)
+        conn.execute(INSERT_PARTITION_SQL, (cls, start, end, name))
+        catalog.add(cls, start, end, name)
+    return name
@@ -1,11 +1,16 @@
+import argparse
 import asyncio
 import json
 import os
 import random
+import time
 import uuid
 from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 from gmqtt import Client as MQTTClient
+from gmqtt.storage import BasePersistentStorage
 
 MQTT_HOST = os.getenv("MQTT_HOST", "lse.dev.br")
 MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
@@ -110,5 +115,338 @@ async def main():
     # Mantém rodando
     await asyncio.Event().wait()
 
+# Gerador de carga (--load): N ativos em scgdi/<ativo>/<kind>, taxa agregada
+# alvo com rampa e rajadas, cenários de falha e RNG com semente (execuções
+# reproduzíveis). Os payloads normais são pré-gerados (numpy) e só o timestamp
+# é inserido por mensagem; os de ativos em falha são formatados na hora.
+
+LOAD_POOL = 256       # variantes pré-geradas por tipo de payload
+LOAD_TICK_S = 0.005   # passo do gerador
+LOAD_ENV_EVERY = 12   # environment a cada 12 rodadas de electrical + vibration (60 s vs 5 s)
+LOAD_STRIDE = 61      # passo (ímpar) na escolha da variante: percorre todo o pool
+LOAD_MAX_BUFFER = 8 * 1024 * 1024  # QoS 0: bytes pendentes no socket antes de segurar o envio
+
+# (nominal, ruído ±) de cada campo, na ordem dos formatos abaixo (mesmas faixas de send_*)
+ELEC_SPEC = (
+    [(220.0, 2.0)] * 3 + [(10.0, 0.3)] * 3
+    + [(4500.0, 50.0), (500.0, 30.0), (4600.0, 50.0)]
+    + [(10002.5, 2.5), (1201.0, 1.0), (10202.5, 2.5)]
+    + [(0.95, 0.01), (60.0, 0.05)]
+)
+ENV_SPEC = [(34.0, 1.0), (55.0, 3.0), (40.0, 2.0)]
+VIB_SPEC = [(0.10, 0.03), (0.12, 0.03)]
+
+ELEC_FMT = (
+    '{"timestamp": "%s", "voltage": {"a": %.3f, "b": %.3f, "c": %.3f}, '
+    '"current": {"a": %.3f, "b": %.3f, "c": %.3f}, '
+    '"power": {"active": %.2f, "reactive": %.2f, "apparent": %.2f}, '
+    '"energy": {"active": %.2f, "reactive": %.2f, "apparent": %.2f}, '
+    '"powerFactor": %.4f, "frequency": %.3f}'
+)
+ENV_FMT = '{"timestamp": "%s", "temperature": %.2f, "humidity": %.2f, "caseTemperature": %.2f}'
+VIB_FMT = '{"timestamp": "%s", "axial": %.4f, "radial": %.4f}'
+
+# Falha -> (tipo de payload afetado, pico padrão)
+FAULT_KINDS = {
+    "overvoltage": ("electrical", 0.15),  # rampa das 3 fases até +15% (alarme em +10%)
+    "case-temp": ("environment", 75.0),   # carcaça sobe até 75 °C e volta (alarme em 60 °C)
+}
+
+
+class PayloadPool:
+    """Variantes pré-geradas de um tipo de payload, já serializadas em volta do timestamp."""
+
+    def __init__(self, fmt: str, spec: List[Tuple[float, float]], rng: np.random.Generator, size: int = LOAD_POOL):
+        nominal = np.array([n for n, _ in spec])
+        noise = np.array([x for _, x in spec])
+        self.fmt = fmt
+        self.values: List[List[float]] = (nominal + rng.uniform(-1.0, 1.0, (size, len(spec))) * noise).tolist()
+        self.parts: List[Tuple[bytes, bytes]] = []
+        for row in self.values:
+            pre, post = (fmt % ("\0", *row)).split("\0")
+            self.parts.append((pre.encode(), post.encode()))
+
+    def render(self, k: int, ts: bytes) -> bytes:
+        pre, post = self.parts[k]
+        return pre + ts + post
+
+    def render_values(self, values: List[float], ts: str) -> bytes:
+        return (self.fmt % (ts, *values)).encode()
+
+
+def _parse_assets(text: str, n_assets: int) -> List[int]:
+    if text == "all":
+        return list(range(n_assets))
+    out = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        out.extend(range(int(first), int(last or first) + 1))
+    if not out or min(out) < 0 or max(out) >= n_assets:
+        raise ValueError(f"ativos fora de 0..{n_assets - 1}: {text}")
+    return out
+
+
+class Fault:
+    """
+    Cenário de falha: KIND:ATIVOS:INÍCIO:DURAÇÃO[:PICO], tempos em segundos desde
+    o início da carga e ATIVOS como 3, 0-9, 1,5,7 ou all. Ex.: overvoltage:0-4:30:60.
+    """
+
+    def __init__(self, spec: str, n_assets: int):
+        parts = spec.split(":")
+        if len(parts) not in (4, 5) or parts[0] not in FAULT_KINDS:
+            raise ValueError(f"falha inválida: {spec!r} (KIND:ATIVOS:INÍCIO:DURAÇÃO[:PICO], KIND em {sorted(FAULT_KINDS)})")
+        self.kind = parts[0]
+        self.payload_kind, default_peak = FAULT_KINDS[self.kind]
+        self.assets = _parse_assets(parts[1], n_assets)
+        self.start = float(parts[2])
+        self.duration = float(parts[3])
+        self.peak = float(parts[4]) if len(parts) == 5 else default_peak
+        if self.duration <= 0:
+            raise ValueError(f"duração da falha deve ser > 0: {spec!r}")
+
+    def level(self, t: float) -> Optional[float]:
+        """Progresso 0..1 da falha no instante t, ou None fora dela."""
+        if self.start <= t < self.start + self.duration:
+            return (t - self.start) / self.duration
+        return None
+
+    def apply(self, values: List[float], level: float) -> List[float]:
+        out = list(values)
+        if self.kind == "overvoltage":
+            for i in range(3):
+                out[i] *= 1.0 + self.peak * level
+        else:
+            # Triângulo: pico na metade da duração
+            out[2] += (self.peak - ENV_SPEC[2][0]) * (1.0 - abs(2.0 * level - 1.0))
+        return out
+
+
+class LoadGenerator:
+    """Sequência determinística de (tópico, payload) para N ativos."""
+
+    def __init__(self, n_assets: int, prefix: str = "Motor", seed: int = 0, faults: Tuple[str, ...] = ()):
+        rng = np.random.default_rng(seed)
+        self.names = [f"{prefix}{i:04d}" for i in range(n_assets)]
+        self.pools = {
+            "electrical": PayloadPool(ELEC_FMT, ELEC_SPEC, rng),
+            "environment": PayloadPool(ENV_FMT, ENV_SPEC, rng),
+            "vibration": PayloadPool(VIB_FMT, VIB_SPEC, rng),
+        }
+        self.faults = [Fault(spec, n_assets) for spec in faults]
+        # Uma volta do gerador: (ativo, kind, tópico)
+        self.plan: List[Tuple[int, str, str]] = []
+        for r in range(LOAD_ENV_EVERY):
+            for i, name in enumerate(self.names):
+                self.plan.append((i, "electrical", f"scgdi/{name}/electrical"))
+                self.plan.append((i, "vibration", f"scgdi/{name}/vibration"))
+            if r == 0:
+                self.plan.extend((i, "environment", f"scgdi/{name}/environment") for i, name in enumerate(self.names))
+        self.k = 0
+        self.faulted = 0
+
+    def messages(self, count: int, t: float) -> List[Tuple[str, bytes]]:
+        """Próximas `count` mensagens, com as falhas ativas no instante t (s desde o início)."""
+        active: Dict[Tuple[int, str], List[Tuple[Fault, float]]] = {}
+        for f in self.faults:
+            level = f.level(t)
+            if level is not None:
+                for i in f.assets:
+                    active.setdefault((i, f.payload_kind), []).append((f, level))
+        plan, n, pools = self.plan, len(self.plan), self.pools
+        out = []
+        for _ in range(count):
+            i, kind, topic = plan[self.k % n]
+            pool = pools[kind]
+            v = (self.k * LOAD_STRIDE) % LOAD_POOL
+            ts = now_iso()
+            faults = active.get((i, kind)) if active else None
+            if faults:
+                values = pool.values[v]
+                for f, level in faults:
+                    values = f.apply(values, level)
+                out.append((topic, pool.render_values(values, ts)))
+                self.faulted += 1
+            else:
+                out.append((topic, pool.render(v, ts.encode())))
+            self.k += 1
+        return out
+
+
+class _AckStorage(BasePersistentStorage):
+    """Mensagens QoS > 0 aguardando confirmação, por mid (remoção O(1)); conta as confirmadas."""
+
+    def __init__(self, timeout: float):
+        self.pending: Dict[int, Tuple[float, bytes]] = {}
+        self.timeout = timeout
+        self.acked = 0
+
+    def push_message_nowait(self, mid, raw_package):
+        self.pending[mid] = (time.monotonic(), raw_package)
+
+    async def push_message(self, mid, raw_package):
+        self.push_message_nowait(mid, raw_package)
+
+    async def pop_message(self):
+        # Mais antiga primeiro; só devolve (para reenvio) se passou do timeout
+        if not self.pending:
+            return None
+        mid = next(iter(self.pending))
+        tm, raw_package = self.pending[mid]
+        if time.monotonic() - tm > self.timeout:
+            del self.pending[mid]
+            return mid, raw_package
+        return None
+
+    def ack(self, mid):
+        if self.pending.pop(mid, None) is not None:
+            self.acked += 1
+
+    async def remove_message_by_mid(self, mid):
+        self.ack(mid)
+
+    @property
+    async def is_empty(self):
+        return not self.pending
+
+    async def wait_empty(self):
+        while self.pending:
+            await asyncio.sleep(0.01)
+
+
+class _LoadClient(MQTTClient):
+    """Cliente gmqtt que confirma PUBACK/PUBREC na hora (sem uma task por mensagem)."""
+
+    def _remove_message_from_query(self, mid):
+        self._persistent_storage.ack(mid)
+
+    def buffered(self) -> int:
+        transport = getattr(self._connection, "_transport", None)
+        return transport.get_write_buffer_size() if transport is not None else 0
+
+
+def rate_at(args, t: float) -> float:
+    """Taxa alvo (msgs/s) no instante t: rampa inicial e rajadas PERÍODO:DURAÇÃO:FATOR."""
+    rate = args.rate
+    if args.ramp > 0 and t < args.ramp:
+        rate *= t / args.ramp
+    if args.burst:
+        period, length, factor = args.burst
+        if t % period < length:
+            rate *= factor
+    return rate
+
+
+async def main_load(args):
+    gen = LoadGenerator(args.assets, args.prefix, args.seed, tuple(args.fault))
+    if args.write_fleet:
+        with open(args.write_fleet, "w", encoding="utf-8") as f:
+            json.dump({"assets": gen.names}, f)
+        print(f"[LOAD] FLEET_CONFIG gravado em {args.write_fleet}")
+
+    client = storage = None
+    if not args.dry_run:
+        storage = _AckStorage(timeout=30.0)
+        client = _LoadClient(uuid.uuid4().hex, persistent_storage=storage, retry_deliver_timeout=30.0)
+        if MQTT_USERNAME and MQTT_PASSWORD:
+            client.set_auth_credentials(MQTT_USERNAME, MQTT_PASSWORD)
+        await client.connect(MQTT_HOST, MQTT_PORT)
+        print(f"[LOAD] conectado em {MQTT_HOST}:{MQTT_PORT}")
+
+    print(f"[LOAD] {args.assets} ativos, {args.rate:g} msgs/s, QoS {args.qos}, seed {args.seed}"
+          + (f", rajadas {args.burst}" if args.burst else "") + (f", {len(gen.faults)} falha(s)" if gen.faults else ""))
+    sent = held = 0
+    due = 0.0
+    start = last = report_at = time.perf_counter()
+    report_sent = 0
+    try:
+        while True:
+            now = time.perf_counter()
+            t = now - start
+            if args.duration and t >= args.duration:
+                break
+            rate = rate_at(args, t)
+            # Atraso acumulado limitado a 100 ms de mensagens: não compensa travadas longas
+            due = min(due + rate * (now - last), max(rate, args.rate) * 0.1 + 1)
+            last = now
+            count = int(due)
+            if client is not None:
+                if args.qos:
+                    count = min(count, max(0, args.inflight - len(storage.pending)))
+                elif client.buffered() > LOAD_MAX_BUFFER:
+                    count = 0
+                if count < int(due):
+                    held += 1
+            for topic, payload in gen.messages(count, t):
+                if client is not None:
+                    client.publish(topic, payload, qos=args.qos)
+            sent += count
+            due -= count
+            if now - report_at >= 1.0:
+                acked = storage.acked if storage is not None and args.qos else "-"
+                inflight = len(storage.pending) if storage is not None else 0
+                print(f"[LOAD] t={t:6.1f}s sent={sent} acked={acked} rate={(sent - report_sent) / (now - report_at):.0f}/s "
+                      f"target={rate:.0f}/s inflight={inflight}")
+                report_at, report_sent = now, sent
+            await asyncio.sleep(LOAD_TICK_S)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        if client is not None:
+            if args.qos:
+                try:
+                    await asyncio.wait_for(storage.wait_empty(), 10.0)
+                except asyncio.TimeoutError:
+                    pass
+            await client.disconnect()
+        acked = storage.acked if storage is not None and args.qos else "-"
+        print(f"[LOAD] total: sent={sent} acked={acked} em {elapsed:.1f}s ({sent / max(elapsed, 1e-9):.0f} msgs/s), "
+              f"{gen.faulted} com falha, {held} passos segurados por backpressure")
+
+
+def _parse_burst(text: str) -> Tuple[float, float, float]:
+    period, length, factor = (float(x) for x in text.split(":"))
+    if period <= 0 or not 0 < length <= period or factor < 0:
+        raise ValueError
+    return period, length, factor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador MQTT do motor; com --load, gerador de carga para N ativos.")
+    parser.add_argument("--load", action="store_true", help="Gerador de carga (sem isto: motor único, a cada 5/60 s)")
+    parser.add_argument("--assets", type=int, default=10, help="Ativos simulados (<prefixo>0000, <prefixo>0001, ...)")
+    parser.add_argument("--prefix", default="Motor", help="Prefixo do nome dos ativos (tópicos scgdi/<ativo>/<kind>)")
+    parser.add_argument("--rate", type=float, default=1000, help="Taxa agregada alvo (msgs/s, todos os ativos)")
+    parser.add_argument("--duration", type=float, default=0, help="Segundos de carga (0 = até Ctrl+C)")
+    parser.add_argument("--ramp", type=float, default=0, help="Segundos de rampa inicial até --rate")
+    parser.add_argument("--burst", default=None, help="Rajadas PERÍODO:DURAÇÃO:FATOR (ex.: 10:1:5)")
+    parser.add_argument("--fault", action="append", default=[], help="Falha KIND:ATIVOS:INÍCIO:DURAÇÃO[:PICO] (repetível)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do RNG (mesma semente = mesmos payloads)")
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=0)
+    parser.add_argument("--inflight", type=int, default=5000, help="QoS > 0: mensagens sem confirmação no máximo")
+    parser.add_argument("--dry-run", action="store_true", help="Só gera os payloads (mede o gerador, sem broker)")
+    parser.add_argument("--write-fleet", default=None, help="Grava o FLEET_CONFIG correspondente para o servidor")
+    args = parser.parse_args(argv)
+    if args.assets < 1:
+        parser.error("--assets deve ser >= 1")
+    if args.burst:
+        try:
+            args.burst = _parse_burst(args.burst)
+        except ValueError:
+            parser.error(f"--burst inválido: {args.burst!r} (PERÍODO:DURAÇÃO:FATOR, 0 < DURAÇÃO <= PERÍODO)")
+    for spec in args.fault:
+        try:
+            Fault(spec, args.assets)
+        except ValueError as exc:
+            parser.error(str(exc))
+    args.inflight = max(1, min(args.inflight, 65000))  # mids do MQTT são 16 bits
+    return args
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.load:
+        asyncio.run(main_load(args))
+    else:
+        asyncio.run(main())
@@ -0,0 +1,206 @@
+"""
+Histórico recente em memória: um buffer circular por série com as últimas
+amostras gravadas (ts µs, valor), para o HistoryRead das telas de tendência
+(últimos minutos) não ir ao SQLite.
+
+Cada série guarda, além das amostras, a partir de que instante (`valid_from`)
+o buffer tem *tudo* que existe no disco. Um HistoryRead cujo início cai nessa
+faixa é atendido daqui; os demais vão ao disco. O Storage alimenta os buffers
+com as mesmas amostras que enfileira para var_history, então o buffer vê até
+o que ainda não foi commitado.
+
+Os objetos de resposta (DataValue, imutáveis) são montados uma vez por amostra
+e guardados ao lado dela: numa leitura repetida só se fatia o buffer.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_RECENT_SAMPLES = 1024  # amostras por série
+_INITIAL = 64  # capacidade inicial (dobra até o limite)
+
+_ITEM_BYTES = 8 + 8 + 8  # ts int64 + valor float64 + referência ao objeto montado
+
+
+class _Ring:
+    """Buffer circular de uma série, em ordem de tempo (o mais antigo em `start`)."""
+
+    __slots__ = ("ts", "values", "built", "start", "n", "valid_from")
+
+    def __init__(self, size: int, valid_from: int):
+        self.ts = np.empty(size, dtype=np.int64)
+        self.values = np.empty(size, dtype=np.float64)
+        self.built = np.full(size, None, dtype=object)
+        self.start = 0
+        self.n = 0
+        self.valid_from = valid_from
+
+    def _grow(self, size: int):
+        order = self._positions(0, self.n)
+        ts = np.empty(size, dtype=np.int64)
+        values = np.empty(size, dtype=np.float64)
+        built = np.full(size, None, dtype=object)
+        ts[:self.n], values[:self.n], built[:self.n] = self.ts[order], self.values[order], self.built[order]
+        self.ts, self.values, self.built, self.start = ts, values, built, 0
+
+    def _positions(self, a: int, b: int) -> np.ndarray:
+        """Posições físicas das amostras [a, b) em ordem de tempo."""
+        return (self.start + np.arange(a, b)) % len(self.ts)
+
+    def _ordered_ts(self) -> np.ndarray:
+        end = self.start + self.n
+        if end <= len(self.ts):
+            return self.ts[self.start:end]
+        return np.concatenate((self.ts[self.start:], self.ts[:end - len(self.ts)]))
+
+    def append(self, ts_us: int, value: float, capacity: int):
+        if ts_us < self.valid_from:
+            return  # anterior à faixa coberta: não afeta o que o buffer responde
+        if self.n and ts_us <= self.ts[(self.start + self.n - 1) % len(self.ts)]:
+            self._insert_late(ts_us, value)
+            return
+        size = len(self.ts)
+        if self.n == size and size < capacity:
+            self._grow(min(size * 2, capacity))
+            size = len(self.ts)
+        if self.n == size:
+            # Cheio: sobrescreve o mais antigo, e a faixa coberta começa no seguinte
+            self.start = (self.start + 1) % size
+            self.n -= 1
+            self.valid_from = int(self.ts[self.start])
+        p = (self.start + self.n) % size
+        self.ts[p], self.values[p], self.built[p] = ts_us, value, None
+        self.n += 1
+
+    def _insert_late(self, ts_us: int, value: float):
+        """
+        Amostra fora de ordem dentro da faixa coberta. Mesmo ts: substitui o valor
+        (como o INSERT OR REPLACE do disco). Senão a faixa coberta passa a começar
+        logo depois dela: o que é mais novo continua completo no buffer.
+        """
+        ordered = self._ordered_ts()
+        k = int(np.searchsorted(ordered, ts_us, "left"))
+        if k < self.n and ordered[k] == ts_us:
+            p = (self.start + k) % len(self.ts)
+            self.values[p], self.built[p] = value, None
+            return
+        self.built[self._positions(0, k)] = None
+        self.start = (self.start + k) % len(self.ts)
+        self.n -= k
+        self.valid_from = ts_us + 1
+
+    def trim(self, before_us: int):
+        """Descarta as amostras anteriores a before_us (removidas do disco)."""
+        k = int(np.searchsorted(self._ordered_ts(), before_us, "left"))
+        if k:
+            self.built[self._positions(0, k)] = None
+            self.start = (self.start + k) % len(self.ts)
+            self.n -= k
+        self.valid_from = max(self.valid_from, before_us)
+
+    def read(
+        self, lo: int, hi: int, descending: bool, limit: int, build: Callable[[int, Optional[float]], Any]
+    ) -> Tuple[List[Any], Optional[int]]:
+        ordered = self._ordered_ts()
+        a, b = int(np.searchsorted(ordered, lo, "left")), int(np.searchsorted(ordered, hi, "right"))
+        nxt = None
+        if limit and b - a > limit:
+            if descending:
+                nxt = int(ordered[b - limit - 1])
+                a = b - limit
+            else:
+                nxt = int(ordered[a + limit])
+                b = a + limit
+        pos = self._positions(a, b)
+        out = self.built[pos]
+        missing = np.flatnonzero(np.equal(out, None))
+        if len(missing):
+            for k, p in zip(missing.tolist(), pos[missing].tolist()):
+                v = float(self.values[p])
+                out[k] = self.built[p] = build(int(self.ts[p]), None if v != v else v)
+        return (out[::-1] if descending else out).tolist(), nxt
+
+
+class RecentHistory:
+    """
+    Buffers circulares por série, com no máximo `capacity` amostras cada
+    (capacity * 24 bytes em arrays, mais os objetos montados das amostras lidas).
+    Os arrays nascem pequenos e dobram até `capacity` conforme a série recebe
+    amostras, então séries paradas quase não ocupam memória. capacity 0 desliga.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RECENT_SAMPLES):
+        self.capacity = max(0, capacity)
+        self._rings: Dict[int, _Ring] = {}
+        # Série sem buffer: o disco não tem nada a partir deste instante (Storage.init)
+        self._floors: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def set_floors(self, floors: Dict[int, int]):
+        """Por série, instante a partir do qual o disco não tem amostras (início do processo)."""
+        if self.enabled:
+            self._floors = dict(floors)
+
+    def append(self, sid: int, ts_us: int, value: Optional[float]):
+        if not self.enabled:
+            return
+        ring = self._rings.get(sid)
+        if ring is None:
+            # Série nova (sem piso) ainda não tem nada no disco: cobre desde a 1ª amostra
+            floor = self._floors.pop(sid, ts_us)
+            ring = self._rings[sid] = _Ring(min(_INITIAL, self.capacity), floor)
+        ring.append(ts_us, np.nan if value is None else value, self.capacity)
+
+    def trim(self, before_us: int):
+        """Amostras anteriores a before_us saíram do disco (retenção): saem daqui também."""
+        for ring in self._rings.values():
+            ring.trim(before_us)
+        for sid, floor in self._floors.items():
+            self._floors[sid] = max(floor, before_us)
+
+    def covers(self, sid: int, lo: int) -> bool:
+        ring = self._rings.get(sid)
+        floor = ring.valid_from if ring is not None else self._floors.get(sid)
+        return floor is not None and lo >= floor
+
+    def read(
+        self,
+        sid: int,
+        lo: int,
+        hi: int,
+        descending: bool,
+        limit: int,
+        build: Callable[[int, Optional[float]], Any],
+    ) -> Optional[Tuple[List[Any], Optional[int]]]:
+        """
+        Amostras de [lo, hi] µs já montadas por `build(ts, valor)`, na ordem pedida,
+        até `limit`, e o ts da próxima (continuation point), ou None se o buffer
+        não cobre lo (a leitura vai ao disco).
+        """
+        if not self.enabled or not self.covers(sid, lo):
+            self.misses += 1
+            return None
+        self.hits += 1
+        ring = self._rings.get(sid)
+        if ring is None or hi < lo:
+            return [], None
+        return ring.read(lo, hi, descending, limit, build)
+
+    def stats(self, reset: bool = False) -> Dict[str, float]:
+        out = {
+            "series": len(self._rings),
+            "samples": sum(r.n for r in self._rings.values()),
+            "bytes": sum(len(r.ts) for r in self._rings.values()) * _ITEM_BYTES,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+        if reset:
+            self.hits = self.misses = 0
+        return out
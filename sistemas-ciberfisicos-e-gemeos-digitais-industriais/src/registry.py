@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from asyncua import ua
+
+
+class VarEntry:
+    """Uma variável do address space, com tudo que o caminho de ingestão precisa."""
+
+    __slots__ = ("name", "group", "path", "field", "key", "node", "nodeid", "series_id", "low", "high", "filter")
+
+    def __init__(
+        self,
+        name: str,
+        group: str,
+        path: str,
+        field: str,
+        key: Optional[str],
+        node: Any,
+        series_id: int,
+        low: Optional[float],
+        high: Optional[float],
+    ):
+        self.name = name
+        self.group = group
+        self.path = path
+        self.field = field
+        self.key = key
+        self.node = node
+        self.nodeid: ua.NodeId = node.nodeid
+        self.series_id = series_id
+        self.low = low
+        self.high = high
+        self.filter: Any = None  # DeadbandFilter (src/deadband.py), atribuído pelo servidor
+
+    def extract(self, payload: Any) -> float:
+        raw = getattr(payload, self.field)
+        return raw.get(self.key, 0.0) if self.key is not None else raw
+
+
+class VariableRegistry:
+    """
+    Registro das variáveis de um ativo, montado uma única vez a partir de
+    model.VARIABLES. Os handlers indexam por nome ou por grupo, sem montar
+    caminhos nem consultar conjuntos a cada amostra.
+    """
+
+    def __init__(self, table: Iterable[Tuple]):
+        self.table = tuple(table)
+        self.entries: Dict[str, VarEntry] = {}
+        self.groups: Dict[str, Tuple[VarEntry, ...]] = {}
+        self.group_nodes: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> VarEntry:
+        return self.entries[name]
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def paths(self, root_name: str) -> List[str]:
+        """Caminhos das séries do ativo `root_name`, na ordem da tabela."""
+        return [f"{root_name}.{group}.{name}" for group, name, *_ in self.table]
+
+    def build(self, parent: Any, root_name: str, batch: Any, series: Dict[str, int]):
+        """
+        Enfileira em `batch` (src/address_space.py) os objetos de grupo e as
+        variáveis sob `parent`; `series` dá o id de cada caminho no Storage.
+        """
+        grouped: Dict[str, List[VarEntry]] = {}
+        for group, name, field, key, low, high in self.table:
+            gnode = self.group_nodes.get(group)
+            if gnode is None:
+                gnode = self.group_nodes[group] = batch.add_object(parent, group)
+            node = batch.add_variable(gnode, name, 0.0)
+
+            path = f"{root_name}.{group}.{name}"
+            entry = VarEntry(name, group, path, field, key, node, series[path], low, high)
+            self.entries[name] = entry
+            grouped.setdefault(group, []).append(entry)
+        self.groups = {g: tuple(es) for g, es in grouped.items()}
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+RouteHandler = Callable[[Any], Awaitable[None]]
+
+_CACHE_MAX = 10_000  # tópicos concretos resolvidos via trie mantidos em cache
+
+
+class Route:
+    """Destino de um padrão de tópico: modelo do payload + handler (+ chave de shard da ingestão, ex.: o ativo)."""
+
+    __slots__ = ("pattern", "model", "handler", "key")
+
+    def __init__(self, pattern: str, model: Type[BaseModel], handler: RouteHandler, key: Optional[str] = None):
+        self.pattern = pattern
+        self.model = model
+        self.handler = handler
+        self.key = key
+
+    def __repr__(self) -> str:
+        return f"Route({self.pattern!r}, {self.model.__name__})"
+
+
+class _TrieNode:
+    __slots__ = ("children", "plus", "hash", "route")
+
+    def __init__(self):
+        self.children: Dict[str, _TrieNode] = {}
+        self.plus: Optional[_TrieNode] = None   # nível "+"
+        self.hash: Optional[Route] = None       # "#" neste nível (casa o resto do tópico)
+        self.route: Optional[Route] = None      # padrão termina aqui
+
+
+def validate_filter(pattern: str) -> List[str]:
+    """Divide o filtro em níveis, validando '+'/'#' segundo a especificação MQTT."""
+    levels = pattern.split("/")
+    for i, level in enumerate(levels):
+        if "#" in level and (level != "#" or i != len(levels) - 1):
+            raise ValueError(f"filtro MQTT inválido (# deve ser o último nível): {pattern!r}")
+        if "+" in level and level != "+":
+            raise ValueError(f"filtro MQTT inválido (+ deve ocupar o nível inteiro): {pattern!r}")
+    return levels
+
+
+def covers(a: str, b: str) -> bool:
+    """True se todo tópico casado pelo filtro `b` também é casado pelo filtro `a`."""
+    la, lb = a.split("/"), b.split("/")
+    for i, level in enumerate(la):
+        if level == "#":
+            return True
+        if i >= len(lb) or lb[i] == "#":
+            return False
+        if level != "+" and level != lb[i]:
+            return False
+    return len(la) == len(lb)
+
+
+class TopicRouter:
+    """
+    Registro de rotas MQTT. Tópicos exatos são resolvidos por dict (O(1)); padrões
+    com '+'/'#' ficam numa trie percorrida nível a nível, e o resultado por
+    tópico concreto é guardado em cache. Em conflito, a rota exata vence e,
+    na trie, o nível literal vence '+', que vence '#'.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Route] = {}
+        self._root = _TrieNode()
+        self._patterns: List[str] = []
+        self._cache: Dict[str, Optional[Route]] = {}
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._patterns)
+
+    def add(self, pattern: str, model: Type[BaseModel], handler: RouteHandler, key: Optional[str] = None) -> Route:
+        levels = validate_filter(pattern)
+        route = Route(pattern, model, handler, key)
+        self._cache.clear()
+        if "+" not in levels and "#" not in levels:
+            self._exact[pattern] = route
+            return route
+
+        node = self._root
+        for level in levels:
+            if level == "#":
+                node.hash = route
+                break
+            if level == "+":
+                node.plus = node.plus or _TrieNode()
+                node = node.plus
+            else:
+                node = node.children.setdefault(level, _TrieNode())
+        else:
+            node.route = route
+        self._patterns.append(pattern)
+        return route
+
+    def match(self, topic: str) -> Optional[Route]:
+        route = self._exact.get(topic)
+        if route is not None:
+            return route
+        try:
+            return self._cache[topic]
+        except KeyError:
+            pass
+        route = self._walk(self._root, topic.split("/"), 0) if self._patterns else None
+        if len(self._cache) >= _CACHE_MAX:
+            self._cache.clear()
+        self._cache[topic] = route
+        return route
+
+    def _walk(self, node: _TrieNode, levels: List[str], i: int) -> Optional[Route]:
+        if i == len(levels):
+            # "a/#" também casa "a" (o '#' inclui o nível pai)
+            return node.route or node.hash
+        child = node.children.get(levels[i])
+        if child is not None:
+            found = self._walk(child, levels, i + 1)
+            if found is not None:
+                return found
+        if node.plus is not None:
+            found = self._walk(node.plus, levels, i + 1)
+            if found is not None:
+                return found
+        return node.hash
+
+    def subscriptions(self) -> List[str]:
+        """
+        Filtros para assinar no broker: os padrões registrados, sem os que já são
+        cobertos por outro padrão registrado (ex.: "scgdi/motor/electrical" some
+        se "scgdi/motor/+" também tem rota). Tópicos exatos nunca são agrupados num
+        '+' novo: esse filtro casaria tópicos sem rota, que num broker compartilhado
+        chegariam todos ao servidor. O servidor assina a lista num único SUBSCRIBE.
+        """
+        filters = sorted(set(self._exact) | set(self._patterns))
+        return [f for f in filters if not any(g != f and covers(g, f) for g in filters)]
@@ -1,83 +1,52 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
+import sqlite3
+import time
+from collections import Counter
+from functools import partial
 from datetime import datetime, timezone
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
 
-from asyncua import ua, Server
-from gmqtt import Client as MQTTClient
+from asyncua import ua, Server, __version__ as asyncua_version
+from gmqtt import Client as MQTTClient, Subscription
 from loguru import logger
+from pydantic import ValidationError
 from dotenv import load_dotenv
 from .storage import Storage
+from .address_space import NodeBatch
+from .backfill import Backfill
+from .migrations import from_epoch_us
+from .partitions import EVENTS, RAW, ROLLUP
+from .ingest import IngestQueue
+from .routing import TopicRouter
+from .fleet import Asset, asset_specs
+from .alarms import RAISED, RETURNED, AlarmBlock, AlarmEngine
+from .deadband import DeadbandFilter
+from .registry import VarEntry, VariableRegistry
 from .lds import try_register_with_lds
 
-from asyncua.server.history_sql import HistorySQLite as UAHistorySQLite
+from .history_sqlite import HistorySQLite
 from .utils.net import free_port, split_endpoint
 
 
 from .model import (
-    ElectricalPayload,
-    EnvironmentPayload,
-    VibrationPayload,
+    PAYLOAD_KINDS,
     SEVERITY,
-    NOMINAL_VOLTAGE,
-    NOMINAL_CURRENT,
-    OVER_UNDER_TOL,
-    CASE_TEMP_CRIT,
-    TOPIC_ELEC,
-    TOPIC_ENV,
-    TOPIC_VIB,
-    MOTOR_NODE_NAME,
+    VARIABLES,
+    ALARM_RULES,
+    ALARM_HYSTERESIS,
+    ALARM_ON_DELAY,
+    ALARM_OFF_DELAY,
+    DEADBANDS,
+    HIST_MAX_INTERVAL,
 )
 
 
 # Utilidades
 
-def pct_over(value: float, nominal: float) -> float:
-    return (value - nominal) / nominal
-
-def _normalize_electrical_payload(data: dict) -> dict:
-    if any(k in data for k in ("Voltage", "Current", "Power")):
-        v = data.get("Voltage", 0.0)
-        i = data.get("Current", 0.0)
-        p = data.get("Power", 0.0)
-        return {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "voltage": {"a": v, "b": v, "c": v},
-            "current": {"a": i, "b": i, "c": i},
-            "power": {"active": p, "reactive": 0.0, "apparent": p},
-            "energy": {"active": 0.0, "reactive": 0.0, "apparent": 0.0},
-            "powerFactor": 0.95,
-            "frequency": 60.0,
-        }
-    return data
-
-
-def _normalize_environment_payload(data: dict) -> dict:
-    if any(k in data for k in ("Temperature", "Humidity", "CaseTemperature")):
-        return {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "temperature": data.get("Temperature", 0.0),
-            "humidity": data.get("Humidity", 0.0),
-            "caseTemperature": data.get("CaseTemperature", 0.0),
-        }
-    return data
-
-
-def _normalize_vibration_payload(data: dict) -> dict:
-    if any(k in data for k in ("Accell_X", "Accell_Y", "Accell_Z")):
-        ax = float(data.get("Accell_X", 0.0))
-        ry = float(data.get("Accell_Y", 0.0))
-        return {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "axial": ax,
-            "radial": ry,
-        }
-    return data
-
-
 # Servidor OPC UA + Árvore de Nós
 
 class MotorOPCUAServer:
@@ -88,6 +57,15 @@ class MotorOPCUAServer:
         self.ns_uri = os.getenv("OPCUA_NAMESPACE_URI", "http://scgdi.local/motor50cv")
         self.db_path = os.getenv("DB_PATH", "./scgdi_history.sqlite")
         self.lds_endpoint = os.getenv("LDS_ENDPOINT", "")
+        self.fleet_config = os.getenv("FLEET_CONFIG", "")  # JSON com N ativos; vazio = só MOTOR_NODE_NAME
+        self.backfill_dir = os.getenv("BACKFILL_DIR", "./backfill")  # arquivos aceitos pelo método Backfill
+        self.last_value_interval = float(os.getenv("LAST_VALUE_INTERVAL", "5"))  # s entre snapshots; 0 = só ao encerrar
+        self.aspace_cache = os.getenv("OPCUA_ASPACE_CACHE", "./.opcua_cache")  # address space padrão em cache; vazio = desliga
+        self.alarm_hysteresis = float(os.getenv("ALARM_HYSTERESIS", str(ALARM_HYSTERESIS)))
+        self.alarm_on_delay = float(os.getenv("ALARM_ON_DELAY", str(ALARM_ON_DELAY)))
+        self.alarm_off_delay = float(os.getenv("ALARM_OFF_DELAY", str(ALARM_OFF_DELAY)))
+        self.hist_max_interval = float(os.getenv("HIST_MAX_INTERVAL", str(HIST_MAX_INTERVAL)))  # 0 = sem ponto forçado
+        self.hist_deadband_scale = float(os.getenv("HIST_DEADBAND_SCALE", "1.0"))  # 0 = grava toda mudança
 
         self.mqtt_host = os.getenv("MQTT_HOST", "localhost")
         self.mqtt_port = int(os.getenv("MQTT_PORT", "1883"))
@@ -102,19 +80,87 @@ class MotorOPCUAServer:
         self.opcua_sw_version    = os.getenv("OPCUA_SW_VERSION",    "1.0.0")
         self.opcua_build_number  = os.getenv("OPCUA_BUILD_NUMBER",  "1")
 
-        self.storage = Storage(self.db_path)
+        self.storage = Storage(
+            self.db_path,
+            batch_size=int(os.getenv("STORAGE_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("STORAGE_FLUSH_INTERVAL", "0.5")),
+            max_queue=int(os.getenv("STORAGE_MAX_QUEUE", "10000")),
+            partition_span=int(os.getenv("STORAGE_PARTITION_SPAN", "86400")),  # s por partição
+            # Retenção em dias por classe; 0 = mantém para sempre
+            retention={
+                RAW: float(os.getenv("RETENTION_RAW_DAYS", "30")) * 86400,
+                ROLLUP: float(os.getenv("RETENTION_ROLLUP_DAYS", "365")) * 86400,
+                EVENTS: float(os.getenv("RETENTION_EVENT_DAYS", "90")) * 86400,
+            },
+            # Partições brutas fechadas há HIST_SEAL_AFTER s viram blocos comprimidos; -1 = não sela
+            seal_after=float(os.getenv("HIST_SEAL_AFTER", "600")),
+            chunk_samples=int(os.getenv("HIST_CHUNK_SAMPLES", "1024")),
+            # Últimas amostras de cada série em memória para HistoryRead recente; 0 = desliga
+            recent_samples=int(os.getenv("HIST_RECENT_SAMPLES", "1024")),
+            # SQLite em WAL: conexões só-leitura para HistoryRead e checkpoint periódico fora do writer
+            journal_mode=os.getenv("STORAGE_JOURNAL_MODE", "WAL"),
+            readers=int(os.getenv("STORAGE_READERS", "4")),
+            cache_mb=int(os.getenv("STORAGE_CACHE_MB", "32")),
+            mmap_mb=int(os.getenv("STORAGE_MMAP_MB", "256")),
+            synchronous=os.getenv("STORAGE_SYNCHRONOUS", "NORMAL"),
+            checkpoint_interval=float(os.getenv("STORAGE_CHECKPOINT_INTERVAL", "30")),  # 0 = autocheckpoint
+        )
         self.server = Server()
+        self.history = HistorySQLite(self.storage, self.server)
         self.idx = None  # namespace index
 
-        # Variáveis OPC UA
-        self.vars: Dict[str, Any] = {}
+        # Ativos (motores) hospedados: nome -> Asset, cada um com seu registro de
+        # variáveis montado em init() a partir de model.VARIABLES
+        self.assets: Dict[str, Asset] = {}
+        for name, topics in asset_specs(self.fleet_config):
+            self.assets[name] = Asset(name, topics, VariableRegistry(VARIABLES))
 
         # MQTT client
         self.mqtt: MQTTClient | None = None
+        self.invalid_payloads: Counter[str] = Counter()  # tópico -> payloads rejeitados
+        self.failed_payloads: Counter[str] = Counter()  # tópico -> payloads válidos com erro no handler
+        self.unrouted = 0  # mensagens recebidas (via filtro com '+') sem rota
+
+        # Roteamento tópico -> (modelo, handler do ativo)
+        self.router = TopicRouter()
+        for asset in self.assets.values():
+            for kind, (model, group) in PAYLOAD_KINDS.items():
+                for topic in asset.topics[kind]:
+                    self.router.add(topic, model, partial(self._handle_payload, asset, group), key=asset.name)
+
+        # Estágio de ingestão: o callback MQTT só enfileira; workers processam
+        self.ingest = IngestQueue(
+            self._process_batch,
+            workers=int(os.getenv("INGEST_WORKERS", "4")),
+            max_queue=int(os.getenv("INGEST_MAX_QUEUE", "10000")),
+            policy=os.getenv("INGEST_OVERFLOW", "block"),
+            batch=int(os.getenv("INGEST_BATCH", "64")),
+        )
+
+        # Regras de alarme de todos os ativos, compiladas em arrays após init()
+        self.alarms = AlarmEngine()
+
+        # Eventos: nó-fonte -> nó emissor (preenchido em init) e geradores por (tipo, emissor)
+        self._emitters: Dict[ua.NodeId, Any] = {}
+        self._generators: Dict[Tuple[ua.NodeId, ua.NodeId], Any] = {}
+
+        # Warm start: series_id -> SourceTimestamp (s) já enviado ao snapshot last_value
+        self._saved_t: Dict[int, float] = {}
+
+        # Partida: fase -> duração (s), de main() até o endpoint aceitar conexões
+        self.startup: Dict[str, float] = {}
+
+    def _mark(self, phase: str, t0: float) -> float:
+        """Registra a duração da fase de partida iniciada em t0; devolve o instante atual."""
+        t = time.perf_counter()
+        self.startup[phase] = t - t0
+        return t
 
     async def init(self):
+        t = time.perf_counter()
         await self.storage.init()
-        await self.server.init()
+        t = self._mark("storage", t)
+        await self._init_opcua()
         self.server.set_endpoint(self.endpoint)
         self.server.set_server_name(self.server_name)
         await self.server.set_build_info(
@@ -135,78 +181,160 @@ class MotorOPCUAServer:
        
         objects = self.server.nodes.objects
 
-        # Nó raiz do motor
-        motor = await objects.add_object(self.idx, MOTOR_NODE_NAME)
-
-        # Subnós
-        # Electrical
-        n_elec = await motor.add_object(self.idx, "Electrical")
-        self.vars["VoltageA"] = await n_elec.add_variable(self.idx, "VoltageA", 0.0)
-        self.vars["VoltageB"] = await n_elec.add_variable(self.idx, "VoltageB", 0.0)
-        self.vars["VoltageC"] = await n_elec.add_variable(self.idx, "VoltageC", 0.0)
-        self.vars["CurrentA"] = await n_elec.add_variable(self.idx, "CurrentA", 0.0)
-        self.vars["CurrentB"] = await n_elec.add_variable(self.idx, "CurrentB", 0.0)
-        self.vars["CurrentC"] = await n_elec.add_variable(self.idx, "CurrentC", 0.0)
-        self.vars["PowerActive"] = await n_elec.add_variable(self.idx, "PowerActive", 0.0)
-        self.vars["PowerReactive"] = await n_elec.add_variable(self.idx, "PowerReactive", 0.0)
-        self.vars["PowerApparent"] = await n_elec.add_variable(self.idx, "PowerApparent", 0.0)
-        self.vars["EnergyActive"] = await n_elec.add_variable(self.idx, "EnergyActive", 0.0)
-        self.vars["EnergyReactive"] = await n_elec.add_variable(self.idx, "EnergyReactive", 0.0)
-        self.vars["EnergyApparent"] = await n_elec.add_variable(self.idx, "EnergyApparent", 0.0)
-        self.vars["PowerFactor"] = await n_elec.add_variable(self.idx, "PowerFactor", 0.0)
-        self.vars["Frequency"] = await n_elec.add_variable(self.idx, "Frequency", 0.0)
-
-        # Environment
-        n_env = await motor.add_object(self.idx, "Environment")
-        self.vars["Temperature"] = await n_env.add_variable(self.idx, "Temperature", 0.0)
-        self.vars["Humidity"] = await n_env.add_variable(self.idx, "Humidity", 0.0)
-        self.vars["CaseTemperature"] = await n_env.add_variable(self.idx, "CaseTemperature", 0.0)
-
-        # Vibration
-        n_vib = await motor.add_object(self.idx, "Vibration")
-        self.vars["Axial"] = await n_vib.add_variable(self.idx, "Axial", 0.0)
-        self.vars["Radial"] = await n_vib.add_variable(self.idx, "Radial", 0.0)
-
-        # Tornar variáveis graváveis por servidor
-        for v in self.vars.values():
-            await v.set_writable()
-
-         # --- Habilitar histórico OPC UA (variáveis + eventos) ---
-        # 1) Configura storage de histórico nativo (SQLite) do asyncua
-        hist = UAHistorySQLite(self.db_path)
-        await hist.init()
-        self.server.iserver.history_manager.set_storage(hist)
-
-        # 2) Habilitar historização de DataChange para TODAS as variáveis do address space
-        for node in self.vars.values():
-            await self.server.iserver.enable_history_data_change(node)
-
-        # 3) Habilitar historização de EVENTOS
-        #    3.1 motor e Objects (como você já fazia)
-        await motor.set_event_notifier([ua.EventNotifier.SubscribeToEvents])
-        await self.server.iserver.enable_history_event(motor)
-        objects = self.server.nodes.objects
-        await objects.set_event_notifier([ua.EventNotifier.SubscribeToEvents])
-        await self.server.iserver.enable_history_event(objects)
-
-        #    3.2 Electrical/Environment/Vibration também devem gerar eventos
-        for src_node in (n_elec, n_env, n_vib):
-            await src_node.set_event_notifier([ua.EventNotifier.SubscribeToEvents])
-            await self.server.iserver.enable_history_event(src_node)
-
-        #    3.3 Mapa de fontes por categoria p/ usarmos no fire_event()
-        self.event_sources = {
-            "Electrical": n_elec,
-            "Environment": n_env,
-            "Vibration": n_vib,
-        }
-        # --- fim histórico ---
+        # --- Habilitar histórico OPC UA (variáveis + eventos) ---
+        # 1) Backend único (src/history_sqlite.py): atende HistoryRead (Raw, Processed
+        #    e Event) a partir das tabelas do Storage e grava sempre pelo mesmo writer em lote
+        self.server.iserver.history_manager.set_storage(self.history)
+        self.history.serve_history(self.server.iserver.history_manager)
+        await self.history.init()
+        await objects.set_event_notifier([ua.EventNotifier.SubscribeToEvents, ua.EventNotifier.HistoryRead])
+        self._emitters[objects.nodeid] = objects
+        t = self._mark("opcua", t)
+
+        # 2) Um objeto por ativo, com Electrical/Environment/Vibration e as variáveis
+        paths = [p for a in self.assets.values() for p in a.registry.paths(a.name)]
+        series = dict(zip(paths, await self.storage.series_ids(paths)))
+        for asset in self.assets.values():
+            await self._build_asset(objects, asset, series)
+        self.alarms.compile()
+        t = self._mark("nodes", t)
+        await self._restore_last_values()
+        t = self._mark("restore", t)
+        await objects.add_method(
+            self.idx, "Backfill", self._backfill, [ua.VariantType.String], [ua.VariantType.UInt32],
+        )
+        logger.info(
+            "Address space: {} ativo(s), {} variáveis",
+            len(self.assets), sum(len(a.registry) for a in self.assets.values()),
+        )
 
         # Preparar tipo de evento customizado (necessário antes de disparar eventos)
         await self._prepare_event_type()
+        self.history.bind_event_type(self.evtype.nodeid)
+
+        t = self._mark("events", t)
 
         # Tentativa de registro em LDS (se configurado)
         await try_register_with_lds(self.server, self.lds_endpoint)
+        self._mark("lds", t)
+
+    async def _init_opcua(self):
+        """
+        server.init() com o address space padrão (~5800 nós) lido sob demanda de um
+        shelve em OPCUA_ASPACE_CACHE, gerado na primeira partida (um por versão do
+        asyncua), em vez de recriado nó a nó a cada início.
+        """
+        if not self.aspace_cache:
+            await self.server.init()
+            return
+        shelf = Path(self.aspace_cache) / f"aspace-asyncua-{asyncua_version}"
+        if shelf.is_file():
+            await self.server.init(shelf)
+            return
+        try:
+            shelf.parent.mkdir(parents=True, exist_ok=True)
+        except OSError as exc:
+            logger.warning("Cache do address space desligado ({}): {}", shelf.parent, exc)
+            await self.server.init()
+            return
+        # Gerado com nome temporário e publicado no fim: partida interrompida não deixa cache pela metade
+        tmp = shelf.with_name(f"{shelf.name}.{os.getpid()}")
+        await self.server.init(tmp)
+        for suffix in ("", ".db", ".dat", ".dir", ".bak"):
+            if os.path.exists(f"{tmp}{suffix}"):
+                os.replace(f"{tmp}{suffix}", f"{shelf}{suffix}")
+        # Com dbm.dumb o shelve fica em <nome>.dat/.dir e o asyncua só reconhece <nome>: marcador vazio
+        shelf.touch()
+        logger.info("Address space padrão salvo em {}", shelf)
+
+    async def _build_asset(self, objects, asset: Asset, series: Dict[str, int]):
+        """
+        Objeto do ativo, grupos e variáveis num único AddNodes (src/address_space.py),
+        já com EventNotifier, AccessLevel e Historizing; os NodeIds seguem a numeração
+        da criação nó a nó (as fontes gravadas em event_history continuam válidas).
+        """
+        batch = NodeBatch(self.server, self.idx)
+        asset.node = batch.add_object(objects, asset.name, ua.ObjectIds.Organizes)
+        asset.registry.build(asset.node, asset.name, batch, series)
+        await batch.commit()
+        self.alarms.add_asset(
+            asset.name, asset.registry, ALARM_RULES, SEVERITY,
+            hysteresis=self.alarm_hysteresis, on_delay=self.alarm_on_delay, off_delay=self.alarm_off_delay,
+        )
+        await asset.node.add_method(
+            self.idx, "AcknowledgeAlarms", partial(self._acknowledge_alarms, asset),
+            [ua.VariantType.String], [ua.VariantType.UInt32],
+        )
+
+        # Variáveis: as amostras são gravadas uma única vez por _set_and_store (sem
+        # a assinatura interna de DataChange do asyncua), filtradas pelo deadband
+        deadbands = {name: (abs_db, pct_db) for name, abs_db, pct_db in DEADBANDS}
+        scale = self.hist_deadband_scale
+        for entry in asset.registry:
+            abs_db, pct_db = deadbands.get(entry.name, (0.0, 0.0))
+            entry.filter = DeadbandFilter(abs_db * scale, pct_db * scale, self.hist_max_interval)
+            self.history.bind_series(entry.nodeid, entry.series_id)
+
+        # Eventos: o ativo e seus grupos geram eventos; as variáveis emitem pelo grupo
+        groups = list(asset.registry.group_nodes.values())
+        self.history.register_notifier(asset.node.nodeid, [n.nodeid for n in groups])
+        for src_node in [asset.node, *groups]:
+            self._emitters[src_node.nodeid] = src_node
+        for entry in asset.registry:
+            self._emitters[entry.nodeid] = asset.registry.group_nodes[entry.group]
+
+    async def _restore_last_values(self):
+        """
+        Warm start: popula todas as variáveis num único Write a partir do snapshot
+        last_value (valor e SourceTimestamp gravados, status UncertainLastUsableValue);
+        sem snapshot, BadWaitingForInitialData em vez de um 0.0 válido. A primeira
+        amostra nova de cada variável é escrita com status Good.
+        """
+        t0 = time.perf_counter()
+        snapshot = await self.storage.last_values()
+        server_ts = datetime.now(timezone.utc)
+        uncertain = ua.StatusCode(ua.StatusCodes.UncertainLastUsableValue)
+        waiting = ua.StatusCode(ua.StatusCodes.BadWaitingForInitialData)
+        params = ua.WriteParameters()
+        for asset in self.assets.values():
+            for e in asset.registry:
+                last = snapshot.get(e.series_id)
+                if last is None:
+                    value = ua.DataValue(
+                        ua.Variant(0.0, ua.VariantType.Double), StatusCode_=waiting, ServerTimestamp=server_ts,
+                    )
+                else:
+                    ts_us, v = last
+                    e.filter.restore(ts_us / 1e6)
+                    value = ua.DataValue(
+                        ua.Variant(float(v), ua.VariantType.Double),
+                        StatusCode_=uncertain,
+                        SourceTimestamp=from_epoch_us(ts_us),
+                        ServerTimestamp=server_ts,
+                    )
+                params.NodesToWrite.append(ua.WriteValue(NodeId_=e.nodeid, AttributeId=ua.AttributeIds.Value, Value=value))
+        await self.server.iserver.attribute_service.write(params)
+        restored = sum(1 for a in self.assets.values() for e in a.registry if e.series_id in snapshot)
+        logger.info(
+            "Warm start: {} de {} variáveis restauradas do snapshot em {:.1f} ms",
+            restored, len(params.NodesToWrite), (time.perf_counter() - t0) * 1e3,
+        )
+
+    async def save_last_values(self):
+        """Enfileira no Storage o último valor escrito das variáveis que mudaram desde o snapshot anterior."""
+        rows = []
+        for asset in self.assets.values():
+            for e in asset.registry:
+                f = e.filter
+                if f.sent_v is not None and self._saved_t.get(e.series_id) != f.sent_t:
+                    self._saved_t[e.series_id] = f.sent_t
+                    rows.append((e.series_id, round(f.sent_t * 1e6), f.sent_v))
+        await self.storage.save_last_values(rows)
+
+    async def _last_value_task(self):
+        while True:
+            await asyncio.sleep(self.last_value_interval)
+            await self.save_last_values()
 
     async def _prepare_event_type(self):
         # Cria um tipo de evento customizado com campos adicionais
@@ -221,43 +349,65 @@ class MotorOPCUAServer:
         )
 
     async def fire_event(self, source_node, category: str, message: str, severity: int):
+        """Emite um evento SCGDIEventType e o enfileira para persistência (sem aguardar o disco)."""
+        self.storage.add_events_nowait([await self._emit(source_node, category, message, severity)])
+
+    async def _emit(self, source_node, category: str, message: str, severity: int) -> tuple:
         """
-        Variáveis não têm EventNotifier. Se a fonte for variável,
-        emitimos pelo nó-objeto correspondente à categoria.
+        Dispara o evento pelo nó emissor da fonte e devolve a linha para o Storage.
+        Variáveis não têm EventNotifier: emitem pelo nó-objeto do seu grupo (mapa
+        montado em _build_asset). O EventGenerator de cada (tipo, emissor) é criado
+        uma vez e reaproveitado; trigger() serializa os campos na hora.
         """
-        try:
+        emitting = self._emitters.get(source_node.nodeid)
+        if emitting is None:
+            # Fonte fora do mapa: resolve uma vez pela classe do nó e guarda
             node_class = await source_node.read_node_class()
-            if node_class == ua.NodeClass.Variable:
-                emitting = self.event_sources.get(category) or self.server.nodes.objects
-            else:
-                emitting = source_node
+            emitting = self.server.nodes.objects if node_class == ua.NodeClass.Variable else source_node
+            self._emitters[source_node.nodeid] = emitting
 
-            event = await self.server.get_event_generator(self.evtype, emitting)
-            event.event.Severity = severity
-            event.event.Message = ua.LocalizedText(message)
-            event.event.Category = category
-            await event.trigger()
+        ts = datetime.now(timezone.utc)
+        try:
+            key = (self.evtype.nodeid, emitting.nodeid)
+            gen = self._generators.get(key)
+            if gen is None:
+                gen = self._generators[key] = await self.server.get_event_generator(self.evtype, emitting)
+            gen.event.Severity = severity
+            gen.event.Message = ua.LocalizedText(message)
+            gen.event.Category = category
+            await gen.trigger(time_attr=ts)
         except Exception as e:
-            logger.exception("Falha ao emitir evento (categoria=%s): %s", category, e)
+            logger.exception("Falha ao emitir evento (categoria={}): {}", category, e)
 
         # Persistimos mesmo que o trigger falhe, para debug
-        await self.storage.add_event(
-            ts=datetime.now(timezone.utc).isoformat(),
-            source=str((emitting if 'emitting' in locals() else source_node).nodeid),
-            message=message,
-            severity=severity,
-            category=category,
-        )
+        return ts.isoformat(), emitting.nodeid.to_string(), message, severity, category
 
 
     async def start(self):
         async def _serve():
+            t = time.perf_counter()
             async with self.server:
-                await asyncio.gather(
-                    self._mqtt_loop(),
-                    self._heartbeat_task(self.server.nodes.objects),
+                self._mark("listen", t)
+                logger.info(
+                    "Startup em {:.2f} s ({})",
+                    sum(self.startup.values()), ", ".join(f"{k} {v * 1e3:.0f} ms" for k, v in self.startup.items()),
                 )
+                self.ingest.start()
+                tasks = [self._mqtt_loop(), self._heartbeat_task(self.server.nodes.objects)]
+                if self.last_value_interval > 0:
+                    tasks.append(self._last_value_task())
+                await asyncio.gather(*tasks)
+
+        try:
+            await self._serve_with_port_fallback(_serve)
+        finally:
+            # Processa o que já foi recebido e grava as amostras ainda na fila antes de encerrar
+            await self.ingest.stop()
+            await self.flush_held_samples()
+            await self.save_last_values()
+            await self.storage.close()
 
+    async def _serve_with_port_fallback(self, _serve):
         try:
             await _serve()
         except OSError as e:
@@ -274,7 +424,7 @@ class MotorOPCUAServer:
             base_host = "0.0.0.0"  # bind all interfaces
             for new_port in range(port + 1, port + 6):
                 new_ep = f"opc.tcp://{base_host}:{new_port}{path if isinstance(path, str) else ''}"
-                logger.warning("Porta %s ocupada. Tentando %s ...", port, new_ep)
+                logger.warning("Porta {} ocupada. Tentando {} ...", port, new_ep)
                 self.server.set_endpoint(new_ep)
                 self.endpoint = new_ep
                 try:
@@ -291,6 +441,8 @@ class MotorOPCUAServer:
         # Emite evento informativo periódico para ver atividade
         while True:
             await self.fire_event(source_node, "status", "heartbeat", SEVERITY["INFO"])
+            logger.info("Ingest: {}", self.ingest.stats(reset=True))
+            logger.info("Histórico recente: {}", self.storage.recent.stats(reset=True))
             await asyncio.sleep(30)
 
 
@@ -304,47 +456,19 @@ class MotorOPCUAServer:
 
         def on_connect(c, flags, rc, properties):  # noqa: ANN001
             logger.info("MQTT conectado: {}:{}, rc={} flags={}", self.mqtt_host, self.mqtt_port, rc, flags)
-            c.subscribe(TOPIC_ELEC)
-            c.subscribe(TOPIC_ENV)
-            c.subscribe(TOPIC_VIB)
-
-   
-            c.subscribe("scgdi/sensor/electrical")
-            c.subscribe("scgdi/sensor/environment")
-            c.subscribe("scgdi/sensor/vibration")
-
-      
-            c.subscribe("scgdi/sensor/energia")
-            c.subscribe("scgdi/sensor/ambiente")
-            c.subscribe("scgdi/sensor/vibracao")
+            c.subscribe([Subscription(topic_filter, qos=0) for topic_filter in self.router.subscriptions()])
 
         async def on_message(c, topic, payload, qos, properties):  # noqa: ANN001
             if topic.startswith("$SYS/"):
                 return
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                logger.warning("MQTT payload inválido em {}", topic)
+            # Tópico sem rota (ex.: via filtro '+' de outro padrão) nem entra na fila
+            route = self.router.match(topic)
+            if route is None:
+                self.unrouted += 1
                 return
-
-            if topic in (TOPIC_ELEC, "scgdi/sensor/electrical"):
-                data = _normalize_electrical_payload(data)
-                await self._handle_electrical(ElectricalPayload(**data))
-            elif topic in (TOPIC_ENV, "scgdi/sensor/environment"):
-                data = _normalize_environment_payload(data)
-                await self._handle_environment(EnvironmentPayload(**data))
-            elif topic in (TOPIC_VIB, "scgdi/sensor/vibration"):
-                data = _normalize_vibration_payload(data)
-                await self._handle_vibration(VibrationPayload(**data))
-            elif topic == "scgdi/sensor/energia":
-                data = _normalize_electrical_payload(data)  
-                await self._handle_electrical(ElectricalPayload(**data))
-            elif topic == "scgdi/sensor/ambiente":
-                data = _normalize_environment_payload(data)
-                await self._handle_environment(EnvironmentPayload(**data))
-            elif topic == "scgdi/sensor/vibracao":
-                data = _normalize_vibration_payload(data)
-                await self._handle_vibration(VibrationPayload(**data))
+            # Só enfileira; o processamento (OPC UA, Storage, alarmes) roda nos workers
+            # (shard pelo ativo da rota: aliases de um mesmo ativo nunca rodam em paralelo)
+            await self.ingest.put(topic, payload, time.monotonic(), key=route.key)
 
         client.on_connect = on_connect
         client.on_message = on_message
@@ -359,101 +483,166 @@ class MotorOPCUAServer:
         finally:
             await client.disconnect()
 
-  
+
+    async def _process_batch(self, items):
+        """
+        Processa um lote do IngestQueue; as regras de alarme do lote são avaliadas de
+        uma vez. Um erro numa mensagem (payload inválido ou falha no handler) só
+        descarta essa mensagem: as demais seguem e os alarmes avaliam as processadas.
+        """
+        blocks: List[AlarmBlock] = []
+        for topic, payload, _recv_time in items:
+            route = self.router.match(topic)
+            if route is None:
+                self.unrouted += 1
+                continue
+
+            # Decodifica e valida direto dos bytes (formato legado tratado no model)
+            try:
+                p = route.model.model_validate_json(payload)
+            except ValidationError as exc:
+                self.invalid_payloads[topic] += 1
+                logger.warning(
+                    "MQTT payload inválido em {} ({} erro(s); {} inválidos no tópico)",
+                    topic, exc.error_count(), self.invalid_payloads[topic],
+                )
+                continue
+            try:
+                blocks.append(await route.handler(p))
+            except Exception as e:
+                self.failed_payloads[topic] += 1
+                logger.exception(
+                    "Falha ao processar payload de {} ({} falhas no tópico): {}", topic, self.failed_payloads[topic], e
+                )
+
+        # Alarmes: só transições de estado geram evento (ver src/alarms.py)
+        await self._fire_alarms(self.alarms.evaluate(blocks))
+
     # Handlers de atualização de variáveis + regras de eventos/alarmes
     
 
-    async def _set_and_store(self, name: str, ts: str, value: float, extra: Dict | None = None):
-        node = self.vars[name]
-        await node.write_value(value)
-        path = (
-            f"{MOTOR_NODE_NAME}."
-            + (
-                "Electrical."
-                if name
-                in {
-                    "VoltageA",
-                    "VoltageB",
-                    "VoltageC",
-                    "CurrentA",
-                    "CurrentB",
-                    "CurrentC",
-                    "PowerActive",
-                    "PowerReactive",
-                    "PowerApparent",
-                    "EnergyActive",
-                    "EnergyReactive",
-                    "EnergyApparent",
-                    "PowerFactor",
-                    "Frequency",
-                }
-                else "Environment."
-                if name in {"Temperature", "Humidity", "CaseTemperature"}
-                else "Vibration."
-            )
-            + name
-        )
-        await self.storage.add_var(ts, path, value, extra)
-
-    async def _handle_electrical(self, p: ElectricalPayload):
-        ts = p.timestamp
-        # Atualiza variáveis
-        await self._set_and_store("VoltageA", ts, p.voltage.get("a", 0.0))
-        await self._set_and_store("VoltageB", ts, p.voltage.get("b", 0.0))
-        await self._set_and_store("VoltageC", ts, p.voltage.get("c", 0.0))
-        await self._set_and_store("CurrentA", ts, p.current.get("a", 0.0))
-        await self._set_and_store("CurrentB", ts, p.current.get("b", 0.0))
-        await self._set_and_store("CurrentC", ts, p.current.get("c", 0.0))
-        await self._set_and_store("PowerActive", ts, p.power.get("active", 0.0))
-        await self._set_and_store("PowerReactive", ts, p.power.get("reactive", 0.0))
-        await self._set_and_store("PowerApparent", ts, p.power.get("apparent", 0.0))
-        await self._set_and_store("EnergyActive", ts, p.energy.get("active", 0.0))
-        await self._set_and_store("EnergyReactive", ts, p.energy.get("reactive", 0.0))
-        await self._set_and_store("EnergyApparent", ts, p.energy.get("apparent", 0.0))
-        await self._set_and_store("PowerFactor", ts, p.powerFactor)
-        await self._set_and_store("Frequency", ts, p.frequency)
-
-        # Regras de alarme: tensão ±10%
-        for phase_name, v in {
-            "VoltageA": p.voltage.get("a", 0.0),
-            "VoltageB": p.voltage.get("b", 0.0),
-            "VoltageC": p.voltage.get("c", 0.0),
-        }.items():
-            dev = pct_over(v, NOMINAL_VOLTAGE)
-            src = self.vars[phase_name]
-            if dev > OVER_UNDER_TOL:
-                await self.fire_event(src, "Electrical", "Overvoltage detected", SEVERITY["HIGH"])
-            elif dev < -OVER_UNDER_TOL:
-                await self.fire_event(src, "Electrical", "Undervoltage detected", SEVERITY["HIGH"])
-
-        # Corrente > 10% acima nominal
-        for phase_name, i in {
-            "CurrentA": p.current.get("a", 0.0),
-            "CurrentB": p.current.get("b", 0.0),
-            "CurrentC": p.current.get("c", 0.0),
-        }.items():
-            src = self.vars[phase_name]
-            if pct_over(i, NOMINAL_CURRENT) > OVER_UNDER_TOL:
-                await self.fire_event(src, "Electrical", "Overcurrent detected", SEVERITY["HIGH"])
-
-    async def _handle_environment(self, p: EnvironmentPayload):
-        ts = p.timestamp
-        await self._set_and_store("Temperature", ts, p.temperature)
-        await self._set_and_store("Humidity", ts, p.humidity)
-        await self._set_and_store("CaseTemperature", ts, p.caseTemperature)
-
-        # Alarme crítico: caseTemperature > 60°C
-        if p.caseTemperature > CASE_TEMP_CRIT:
-            await self.fire_event(self.vars["CaseTemperature"], "Environment", "Case temperature critical", SEVERITY["CRIT"])
-
-    async def _handle_vibration(self, p: VibrationPayload):
-        ts = p.timestamp
-        await self._set_and_store("Axial", ts, p.axial)
-        await self._set_and_store("Radial", ts, p.radial)
-        if max(p.axial, p.radial) > 0.2:
-            await self.fire_event(self.vars["Axial"], "Vibration", "Slight vibration increase", SEVERITY["LOW"])
+    async def _set_and_store(self, ts: datetime, entries: Tuple[VarEntry, ...], values: List[float]) -> datetime:
+        """
+        Aplica num único Write (mesmo SourceTimestamp, vindo do payload) os valores
+        que saíram do deadband e enfileira no Storage, como um único item, os pontos
+        que a compressão do histórico manda gravar (src/deadband.py). Os agregados
+        (var_rollup) recebem todos os valores.
+        """
+        src_ts = ts
+        if src_ts.tzinfo is None:
+            src_ts = src_ts.replace(tzinfo=timezone.utc)
+        t = src_ts.timestamp()
+
+        changed = [(e, value) for e, value in zip(entries, values) if e.filter.report(value, t)]
+        if changed:
+            server_ts = datetime.now(timezone.utc)
+            params = ua.WriteParameters()
+            params.NodesToWrite = [
+                ua.WriteValue(
+                    NodeId_=e.nodeid,
+                    AttributeId=ua.AttributeIds.Value,
+                    Value=ua.DataValue(
+                        ua.Variant(float(value), ua.VariantType.Double),
+                        SourceTimestamp=src_ts,
+                        ServerTimestamp=server_ts,
+                    ),
+                )
+                for e, value in changed
+            ]
+            results = await self.server.iserver.attribute_service.write(params)
+            for (e, _), status in zip(changed, results):
+                if not status.is_good():
+                    logger.warning("Write recusado em {}: {}", e.name, status)
+
+        await self.storage.add_samples([
+            (e.series_id, pt, pv) for e, value in zip(entries, values) for pt, pv in e.filter.archive(value, t)
+        ])
+        await self.storage.add_rollup(src_ts, [(e.series_id, value) for e, value in zip(entries, values)])
+        return src_ts
+
+    async def flush_held_samples(self):
+        """Grava o último ponto recebido de cada variável que a compressão ainda retinha."""
+        await self.storage.add_samples([
+            (e.series_id, pt, pv) for asset in self.assets.values() for e in asset.registry for pt, pv in e.filter.pending()
+        ])
+
+    async def _handle_payload(self, asset: Asset, group: str, p) -> AlarmBlock:
+        """Atualiza as variáveis do grupo; devolve o bloco para avaliação de alarmes do lote."""
+        entries = asset.registry.groups[group]
+        values = [e.extract(p) for e in entries]
+        src_ts = await self._set_and_store(p.timestamp, entries, values)
+        return self.alarms.block_id(asset.name, group), values, src_ts.timestamp()
+
+    async def _fire_alarms(self, transitions):
+        """Um evento por transição; as linhas do lote vão ao Storage como um único item."""
+        rows = []
+        for cond, transition in transitions:
+            if transition == RAISED:
+                message, severity = cond.message, cond.severity
+            elif transition == RETURNED:
+                message, severity = cond.clear_message, SEVERITY["INFO"]
+            else:
+                message, severity = f"{cond.message} acknowledged", SEVERITY["INFO"]
+            rows.append(await self._emit(cond.entry.node, cond.entry.group, message, severity))
+        self.storage.add_events_nowait(rows)
+
+    async def _acknowledge_alarms(self, asset: Asset, parent, condition: ua.Variant):
+        """Método OPC UA AcknowledgeAlarms(condição): "" reconhece todas; retorna quantas mudaram."""
+        name = condition.Value if isinstance(condition, ua.Variant) else condition
+        try:
+            transitions = self.alarms.acknowledge(asset.name, name or "")
+        except KeyError:
+            return ua.StatusCode(ua.StatusCodes.BadInvalidArgument)
+        await self._fire_alarms(transitions)
+        return [ua.Variant(len(transitions), ua.VariantType.UInt32)]
 
 
+    async def _backfill(self, parent, path: ua.Variant):
+        """
+        Método OPC UA Backfill(arquivo): carga em massa (src/backfill.py) de um JSONL
+        ou .sqlite de BACKFILL_DIR; retorna as amostras gravadas. Um nó só recebe o
+        valor carregado se ele for mais novo que o atual (e sair do deadband).
+        """
+        name = path.Value if isinstance(path, ua.Variant) else path
+        base = os.path.realpath(self.backfill_dir)
+        full = os.path.realpath(os.path.join(base, name or ""))
+        if os.path.commonpath([base, full]) != base or not os.path.isfile(full):
+            return ua.StatusCode(ua.StatusCodes.BadInvalidArgument)
+
+        loader = Backfill(self.storage, ((a.name, a.topics) for a in self.assets.values()))
+        t0 = time.perf_counter()
+        try:
+            stats = await loader.load(full)
+        except (OSError, ValueError, sqlite3.Error) as exc:
+            logger.warning("Backfill de {} falhou: {}", full, exc)
+            return ua.StatusCode(ua.StatusCodes.BadInvalidArgument)
+
+        entries = {e.series_id: e for a in self.assets.values() for e in a.registry}
+        changed = []
+        for sid, (ts_us, value) in loader.latest.items():
+            e = entries.get(sid)
+            if e is not None and value is not None and e.filter.report(value, ts_us / 1e6):
+                changed.append((e, value, from_epoch_us(ts_us)))
+        if changed:
+            params = ua.WriteParameters()
+            params.NodesToWrite = [
+                ua.WriteValue(
+                    NodeId_=e.nodeid,
+                    AttributeId=ua.AttributeIds.Value,
+                    Value=ua.DataValue(ua.Variant(float(value), ua.VariantType.Double), SourceTimestamp=src_ts),
+                )
+                for e, value, src_ts in changed
+            ]
+            await self.server.iserver.attribute_service.write(params)
+        logger.info(
+            "Backfill de {} em {:.2f} s: {} ({} nó(s) com valor mais novo)",
+            full, time.perf_counter() - t0, stats, len(changed),
+        )
+        await self.fire_event(
+            self.server.nodes.objects, "status", f"backfill {os.path.basename(full)}: {stats['written']} amostras", SEVERITY["INFO"]
+        )
+        return [ua.Variant(stats["written"], ua.VariantType.UInt32)]
+
 
 # Entry point
 
@@ -464,14 +653,17 @@ async def main():
     except Exception:  # noqa: BLE001
         pass
 
+    t = time.perf_counter()
     app = MotorOPCUAServer()
+    t = app._mark("config", t)
 
     # Tenta liberar a porta do endpoint
     _, port, _ = split_endpoint(app.endpoint)
     if free_port(port, name_hint="src.server"):
-        logger.info("Porta %s liberada (ou já estava livre).", port)
+        logger.info("Porta {} liberada (ou já estava livre).", port)
     else:
-        logger.warning("Não consegui liberar a porta %s (talvez permissão). Vou tentar iniciar assim mesmo.", port)
+        logger.warning("Não consegui liberar a porta {} (talvez permissão). Vou tentar iniciar assim mesmo.", port)
+    app._mark("port", t)
 
     await app.init()
     logger.info("OPC UA endpoint: {}", app.endpoint)
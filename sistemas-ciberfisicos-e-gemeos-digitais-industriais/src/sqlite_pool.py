@@ -0,0 +1,117 @@
+"""
+Conexões SQLite do histórico em modo WAL.
+
+- uma conexão de escrita (o writer do Storage), a única que grava;
+- um pool de conexões só-leitura: cada HistoryRead pega uma e lê tudo numa
+  transação de leitura, então vê um único snapshot do banco (catálogo de
+  partições e tabelas coerentes entre si) e nunca bloqueia nem é bloqueado
+  pelo writer;
+- checkpoints do WAL numa conexão própria, em intervalos fixos, em vez do
+  autocheckpoint, que rodaria dentro do commit do writer.
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Iterator, List
+
+import aiosqlite
+
+DEFAULT_READERS = 4                  # conexões só-leitura no pool
+DEFAULT_CACHE_MB = 32                # page cache por conexão
+DEFAULT_MMAP_MB = 256                # leitura das páginas por mmap (0 = desliga)
+DEFAULT_SYNCHRONOUS = "NORMAL"       # em WAL: sem fsync por commit, só no checkpoint
+DEFAULT_CHECKPOINT_INTERVAL = 30.0   # s entre checkpoints PASSIVE
+JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024  # tamanho a que o arquivo -wal volta após reiniciar
+BUSY_TIMEOUT_MS = 5000
+
+_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def pragmas(cache_mb: int = DEFAULT_CACHE_MB, mmap_mb: int = DEFAULT_MMAP_MB) -> List[str]:
+    """PRAGMAs de desempenho comuns a todas as conexões."""
+    return [
+        f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size = {-max(0, cache_mb) * 1024}",  # negativo = KiB
+        f"PRAGMA mmap_size = {max(0, mmap_mb) * 1024 * 1024}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+
+
+def writer_pragmas(synchronous: str = DEFAULT_SYNCHRONOUS, scheduled_checkpoints: bool = True) -> List[str]:
+    """PRAGMAs da conexão de escrita (após journal_mode = WAL)."""
+    synchronous = synchronous.upper()
+    if synchronous not in _SYNCHRONOUS:
+        raise ValueError(f"synchronous inválido: {synchronous}")
+    out = [f"PRAGMA synchronous = {synchronous}", f"PRAGMA journal_size_limit = {JOURNAL_SIZE_LIMIT}"]
+    if scheduled_checkpoints:
+        out.append("PRAGMA wal_autocheckpoint = 0")  # checkpoints só pelo Storage (fora do commit)
+    return out
+
+
+def readonly_uri(db_path: str) -> str:
+    return f"{Path(db_path).absolute().as_uri()}?mode=ro"
+
+
+def connect_readonly(db_path: str, cache_mb: int = DEFAULT_CACHE_MB, mmap_mb: int = DEFAULT_MMAP_MB) -> sqlite3.Connection:
+    """Conexão síncrona só-leitura (scripts), com transações explícitas (ver snapshot())."""
+    conn = sqlite3.connect(readonly_uri(db_path), uri=True, isolation_level=None)
+    for stmt in pragmas(cache_mb, mmap_mb):
+        conn.execute(stmt)
+    return conn
+
+
+@contextmanager
+def snapshot(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Transação de leitura: as consultas do bloco veem o mesmo estado do banco."""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+
+class ReaderPool:
+    """Pool fixo de conexões aiosqlite só-leitura."""
+
+    def __init__(self, db_path: str, size: int = DEFAULT_READERS, cache_mb: int = DEFAULT_CACHE_MB, mmap_mb: int = DEFAULT_MMAP_MB):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.cache_mb = cache_mb
+        self.mmap_mb = mmap_mb
+        self._idle: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._conns: List[aiosqlite.Connection] = []
+
+    async def open(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(readonly_uri(self.db_path), uri=True, isolation_level=None)
+            for stmt in pragmas(self.cache_mb, self.mmap_mb):
+                await conn.execute(stmt)
+            self._conns.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        for conn in self._conns:
+            await conn.close()
+        self._conns = []
+        self._idle = None
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Conexão do pool (aguarda uma livre) numa transação de leitura. O snapshot
+        é fixado na primeira consulta e vale até o fim do bloco.
+        """
+        idle = self._idle
+        conn = await idle.get()
+        try:
+            await conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                await conn.execute("COMMIT")
+        finally:
+            idle.put_nowait(conn)
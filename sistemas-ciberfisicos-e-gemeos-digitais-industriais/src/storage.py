@@ -1,51 +1,673 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Set, Tuple
 
 import aiosqlite
-import json
-from typing import Any, Dict
-
-CREATE_TABLES_SQL = """
-CREATE TABLE IF NOT EXISTS var_history (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    ts TEXT NOT NULL,
-    path TEXT NOT NULL,     -- caminho da variável no address space
-    value REAL,
-    extra TEXT              -- JSON serializado como string
-);
-
-CREATE TABLE IF NOT EXISTS event_history (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    ts TEXT NOT NULL,
-    source TEXT NOT NULL,
-    message TEXT NOT NULL,
-    severity INTEGER NOT NULL,
-    category TEXT
-);
+import numpy as np
+from loguru import logger
+
+from .chunks import DEFAULT_CHUNK_SAMPLES, decode, encode
+
+from .migrations import (
+    ROLLUP_RESOLUTIONS,
+    SCHEMA_VERSION,
+    SERIES_TABLE_SQL,
+    migrate,
+    needs_migration,
+    to_epoch_us,
+)
+from .partitions import (
+    CHUNKS,
+    DEFAULT_PARTITION_SPAN,
+    DELETE_PARTITION_SQL,
+    EVENTS,
+    INSERT_PARTITION_SQL,
+    PARTITIONS_TABLE_SQL,
+    RAW,
+    ROLLUP,
+    SELECT_PARTITIONS_SQL,
+    PartitionCatalog,
+    partition_ddl,
+)
+from .recent import DEFAULT_RECENT_SAMPLES, RecentHistory
+from .sqlite_pool import (
+    BUSY_TIMEOUT_MS,
+    DEFAULT_CACHE_MB,
+    DEFAULT_CHECKPOINT_INTERVAL,
+    DEFAULT_MMAP_MB,
+    DEFAULT_READERS,
+    DEFAULT_SYNCHRONOUS,
+    ReaderPool,
+    pragmas,
+    writer_pragmas,
+)
+
+# Último valor escrito em cada variável, para o warm start do servidor (não particionada)
+LAST_VALUE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS last_value (
+    series_id INTEGER PRIMARY KEY REFERENCES series(id),
+    ts INTEGER NOT NULL,        -- SourceTimestamp, epoch UTC em µs
+    value REAL NOT NULL
+) WITHOUT ROWID;
 """
 
+CREATE_TABLES_SQL = SERIES_TABLE_SQL + PARTITIONS_TABLE_SQL + LAST_VALUE_TABLE_SQL
+
+# Classe da fila para last_value (sem partição nem retenção)
+LAST = "last_value"
+
+# Classe da fila para criação de séries: linhas (caminho, future com o id)
+SERIES = "series"
+
+# Statements por classe; {table} é a partição da linha
 INSERT_VAR_SQL = """
-INSERT INTO var_history (ts, path, value, extra) VALUES (?, ?, ?, ?);
+INSERT OR REPLACE INTO "{table}" (series_id, ts, value, extra) VALUES (?, ?, ?, ?);
 """
 
 INSERT_EVENT_SQL = """
-INSERT INTO event_history (ts, source, message, severity, category) VALUES (?, ?, ?, ?, ?);
+INSERT INTO "{table}" (ts, source, message, severity, category) VALUES (?, ?, ?, ?, ?);
+"""
+
+INSERT_CHUNK_SQL = """
+INSERT INTO "{table}" (series_id, first_ts, last_ts, samples, vmin, vmax, vfirst, vlast, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
 """
 
+UPSERT_ROLLUP_SQL = """
+INSERT INTO "{table}" (resolution, series_id, bucket, samples, total, vmin, vmax) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, series_id, bucket) DO UPDATE SET
+    samples = samples + excluded.samples,
+    total = total + excluded.total,
+    vmin = min(vmin, excluded.vmin),
+    vmax = max(vmax, excluded.vmax);
+"""
+
+UPSERT_LAST_VALUE_SQL = """
+INSERT INTO last_value (series_id, ts, value) VALUES (?, ?, ?)
+ON CONFLICT (series_id) DO UPDATE SET ts = excluded.ts, value = excluded.value
+WHERE excluded.ts >= last_value.ts;
+"""
+
+_MIN_TS = -(2**63)
+
+_ROLLUP_US = tuple((res, res * 1_000_000) for res in ROLLUP_RESOLUTIONS)
+
+# Defaults do writer em lote (write-behind)
+DEFAULT_BATCH_SIZE = 500        # linhas por commit
+DEFAULT_FLUSH_INTERVAL = 0.5    # idade máxima (s) de um lote antes do commit
+DEFAULT_MAX_QUEUE = 10_000      # amostras pendentes antes de aplicar backpressure
+DEFAULT_MAINTENANCE_INTERVAL = 60.0  # s entre verificações de retenção/selagem sem trabalho pendente
+
+
 class Storage:
-    def __init__(self, db_path: str):
+    """
+    Persistência em SQLite (modo WAL) com uma única conexão de escrita de longa
+    duração e um pool de conexões só-leitura (`readers`, src/sqlite_pool.py) para
+    as consultas de histórico, que leem snapshots e não disputam lock com o writer.
+    O WAL é transferido para o banco por checkpoints PASSIVE a cada
+    `checkpoint_interval` s, numa conexão própria (0 = autocheckpoint do SQLite,
+    dentro do commit do writer). `journal_mode` diferente de WAL (ex.: DELETE em
+    sistemas de arquivos sem memória compartilhada) volta ao journal de rollback,
+    em que leituras e commits se bloqueiam.
+
+    add_samples/add_rollup/add_bulk/add_events_nowait apenas enfileiram as
+    linhas; uma task de fundo drena a fila com executemany e faz um commit por
+    lote. O lote é gravado quando atinge `batch_size` linhas ou `flush_interval`
+    segundos, o que vier primeiro. Com a fila cheia, os add_* aguardam
+    (backpressure); add_events_nowait nunca aguarda.
+
+    Cada amostra recebida também entra nos agregados de var_rollup (1 min / 1 h),
+    atualizados no mesmo commit do lote: o writer soma o lote em memória e faz
+    um upsert por (resolução, série, intervalo).
+
+    Amostras, agregados e eventos vão para partições por tempo (src/partitions.py),
+    criadas pelo writer quando chega a primeira linha da faixa. `retention` dá,
+    por classe (RAW, ROLLUP, EVENTS), quantos segundos manter (0/ausente = para
+    sempre); o próprio writer, entre lotes, remove uma partição vencida por vez
+    com DROP TABLE, então a expiração nunca segura a ingestão por mais que isso.
+
+    Com `seal_after` (s), partições brutas fechadas há esse tempo são seladas:
+    as amostras de cada série viram blocos comprimidos (src/chunks.py) em
+    var_chunks, uma série por passo do writer, e a partição bruta é removida.
+    Linhas brutas ficam só na partição aberta (e em linhas com `extra`).
+    Os blocos seguem a retenção de RAW, salvo valor próprio para CHUNKS.
+
+    As amostras enfileiradas para var_history também entram em `recent`
+    (src/recent.py): as últimas `recent_samples` de cada série ficam em memória
+    para o HistoryRead das telas de tendência.
+
+    last_value guarda o último valor de cada variável (uma linha por série,
+    gravada pelo writer com save_last_values): o servidor a lê inteira com
+    last_values() para popular o address space no init().
+
+    Séries novas (series_id/series_ids) também são criadas pelo writer, dentro
+    do lote: nenhuma transação é aberta ou commitada na conexão de escrita fora
+    dele (um commit externo fecharia pela metade um lote ou uma selagem em curso).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        partition_span: int = DEFAULT_PARTITION_SPAN,
+        retention: Dict[str, float] | None = None,
+        seal_after: float | None = None,
+        chunk_samples: int = DEFAULT_CHUNK_SAMPLES,
+        maintenance_interval: float = DEFAULT_MAINTENANCE_INTERVAL,
+        recent_samples: int = DEFAULT_RECENT_SAMPLES,
+        readers: int = DEFAULT_READERS,
+        cache_mb: int = DEFAULT_CACHE_MB,
+        mmap_mb: int = DEFAULT_MMAP_MB,
+        synchronous: str = DEFAULT_SYNCHRONOUS,
+        checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+        journal_mode: str = "WAL",
+    ):
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.partition_span = partition_span
+        retention = dict(retention or {})
+        retention.setdefault(CHUNKS, retention.get(RAW))
+        self.retention = {cls: keep for cls, keep in retention.items() if keep and keep > 0}
+        self.seal_after = seal_after if seal_after is not None and seal_after >= 0 else None
+        self.chunk_samples = chunk_samples
+        self.maintenance_interval = maintenance_interval
+        self.partitions = PartitionCatalog(partition_span)
+        self.expired_rows = 0  # linhas recebidas já fora da retenção (descartadas)
+        self.lost_rows = 0  # linhas de itens que falharam mesmo gravados sozinhos
+        self.recent = RecentHistory(recent_samples)
+        self.readers = ReaderPool(db_path, readers, cache_mb, mmap_mb)
+        self.cache_mb = cache_mb
+        self.mmap_mb = mmap_mb
+        self.synchronous = synchronous
+        self.checkpoint_interval = checkpoint_interval
+        self.journal_mode = journal_mode.upper()
+
+        self._db: aiosqlite.Connection | None = None
+        self._queue: asyncio.Queue[Tuple[str, List[tuple]]] | None = None
+        self._writer: asyncio.Task | None = None
+        self._series: Dict[str, int] = {}  # path -> series.id
+        self._pending_puts: Set[asyncio.Task] = set()  # add_events_nowait com a fila cheia
+        self._checkpoint_db: aiosqlite.Connection | None = None
+        self._checkpointer: asyncio.Task | None = None
 
     async def init(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.executescript(CREATE_TABLES_SQL)
-            await db.commit()
-
-    async def add_var(self, ts: str, path: str, value: float | None, extra: Dict[str, Any] | None = None):
-        extra_json = json.dumps(extra or {})  # <-- serialize para string
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(INSERT_VAR_SQL, (ts, path, value, extra_json))
-            await db.commit()
-
-    async def add_event(self, ts: str, source: str, message: str, severity: int, category: str):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(INSERT_EVENT_SQL, (ts, source, message, severity, category))
-            await db.commit()
+        await asyncio.to_thread(self._migrate_legacy)
+
+        self._db = await aiosqlite.connect(self.db_path)
+        async with self._db.execute(f"PRAGMA journal_mode = {self.journal_mode}") as cur:
+            (mode,) = await cur.fetchone()
+        if mode.upper() != self.journal_mode:
+            logger.warning("Storage: {} ficou em journal_mode={} (pedido {})", self.db_path, mode, self.journal_mode)
+        scheduled = mode.upper() == "WAL" and self.checkpoint_interval > 0
+        for stmt in pragmas(self.cache_mb, self.mmap_mb) + writer_pragmas(self.synchronous, scheduled):
+            await self._db.execute(stmt)
+        await self._db.executescript(CREATE_TABLES_SQL)
+        await self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        await self._db.commit()
+        async with self._db.execute("SELECT path, id FROM series") as cur:
+            self._series = {path: sid async for path, sid in cur}
+        async with self._db.execute(SELECT_PARTITIONS_SQL) as cur:
+            self.partitions.load(await cur.fetchall())
+        if self.recent.enabled:
+            self.recent.set_floors(await self._disk_floors())
+
+        await self.readers.open()
+        if scheduled:
+            self._checkpoint_db = await aiosqlite.connect(self.db_path)
+            await self._checkpoint_db.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            self._checkpointer = asyncio.create_task(self._checkpoint_loop(), name="storage-checkpoint")
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._writer = asyncio.create_task(self._writer_loop(), name="storage-writer")
+
+    def _migrate_legacy(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            legacy = needs_migration(conn)
+        finally:
+            conn.close()
+        if legacy:
+            logger.warning("Storage: {} está em um schema antigo; migrando para v{} ...", self.db_path, SCHEMA_VERSION)
+            rows = migrate(self.db_path, partition_span=self.partition_span)
+            logger.info("Storage: migração concluída ({} amostras).", rows)
+
+    async def _disk_floors(self) -> Dict[int, int]:
+        """
+        Por série, o primeiro instante sem amostras no disco: 1 µs após a mais nova
+        nas partições mais novas de var_history e var_chunks (seek no PK/índice de
+        cada série). Série sem linhas ali só tem dados antes do início delas.
+        """
+        floors = {sid: _MIN_TS for sid in self._series.values()}
+        for cls, column in ((RAW, "ts"), (CHUNKS, "last_ts")):
+            newest = self.partitions.newest(cls)
+            if newest is None:
+                continue
+            name, start, _ = newest
+            async with self._db.execute(
+                f'SELECT s.id, (SELECT MAX({column}) FROM "{name}" WHERE series_id = s.id) FROM series s'
+            ) as cur:
+                async for sid, last in cur:
+                    floors[sid] = max(floors[sid], start if last is None else last + 1)
+        return floors
+
+    async def series_id(self, path: str) -> int:
+        """Id da série no dicionário `series` (criada na primeira vez que o caminho aparece)."""
+        sid = self._series.get(path)
+        if sid is None:
+            (sid,) = await self.series_ids([path])
+        return sid
+
+    async def series_ids(self, paths: Iterable[str]) -> List[int]:
+        """
+        Ids de várias séries; as novas são criadas pelo writer num único item da
+        fila (mesma transação do lote), na ordem de `paths`.
+        """
+        paths = list(paths)
+        new = [p for p in dict.fromkeys(paths) if p not in self._series]
+        if new:
+            loop = asyncio.get_running_loop()
+            rows = [(p, loop.create_future()) for p in new]
+            await self._queue.put((SERIES, rows))
+            for path, fut in rows:
+                self._series[path] = await fut
+        return [self._series[p] for p in paths]
+
+    async def add_rollup(self, ts: str | datetime | int, values: List[Tuple[int, float | None]]):
+        """
+        Só os agregados (var_rollup), para amostras que não vão todas para var_history
+        (ex.: descartadas pela compressão). `ts` inteiro = epoch µs.
+        """
+        ts_us = ts if isinstance(ts, int) else to_epoch_us(ts)
+        await self._queue.put((ROLLUP, [(sid, ts_us, value) for sid, value in values]))
+
+    async def add_samples(self, samples: List[Tuple[int, float, float | None]]):
+        """
+        Amostras (series_id, ts epoch s, valor) com timestamps próprios, num único
+        item da fila. Só o histórico bruto: os agregados vêm de add_rollup.
+        """
+        if samples:
+            rows = [(sid, round(ts * 1e6), value, None) for sid, ts, value in samples]
+            for sid, ts_us, value, _ in rows:
+                self.recent.append(sid, ts_us, value)
+            await self._queue.put((RAW, rows))
+
+    async def add_bulk(self, samples: List[Tuple[int, int, float | None]]):
+        """
+        Carga em massa (src/backfill.py): amostras (series_id, ts epoch µs, valor)
+        para o histórico bruto e para os agregados, cada um num único item da fila.
+        Um item da fila nunca é dividido: a transação do writer tem o tamanho do
+        lote recebido, não `batch_size`.
+        """
+        if samples:
+            for sid, ts_us, value in samples:
+                self.recent.append(sid, ts_us, value)
+            await self._queue.put((RAW, [(sid, ts_us, value, None) for sid, ts_us, value in samples]))
+            await self._queue.put((ROLLUP, samples))
+
+    async def save_last_values(self, rows: List[Tuple[int, int, float]]):
+        """
+        Snapshot (series_id, ts epoch µs, valor) do último valor de cada variável,
+        num único item da fila; uma linha por série, mantida só se for mais nova.
+        """
+        if rows:
+            await self._queue.put((LAST, rows))
+
+    async def last_values(self) -> Dict[int, Tuple[int, float]]:
+        """series_id -> (ts epoch µs, valor) do snapshot, numa única leitura."""
+        async with self.readers.snapshot() as db:
+            async with db.execute("SELECT series_id, ts, value FROM last_value") as cur:
+                return {sid: (ts, value) async for sid, ts, value in cur}
+
+    def add_events_nowait(self, rows: List[Tuple[str, str, str, int, str]]):
+        """
+        Enfileira eventos (ts, source, message, severity, category) como um único
+        item, sem aguardar: com a fila cheia o item entra por uma task de fundo,
+        que flush() também espera. Quem emite eventos nunca fica preso no disco.
+        """
+        if not rows:
+            return
+        item = (EVENTS, rows)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            task = asyncio.create_task(self._queue.put(item))
+            self._pending_puts.add(task)
+            task.add_done_callback(self._pending_puts.discard)
+
+    async def flush(self) -> int:
+        """
+        Aguarda até que tudo que já foi enfileirado esteja commitado (ou descartado
+        por falha). Devolve quantas linhas se perderam enquanto esperava.
+        """
+        lost0 = self.lost_rows
+        if self._queue is not None:
+            while self._pending_puts:
+                await asyncio.gather(*self._pending_puts)
+            await self._queue.join()
+        return self.lost_rows - lost0
+
+    async def close(self):
+        """Grava o que estiver pendente e fecha a conexão."""
+        if self._writer is None:
+            return
+        await self.flush()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        if self._checkpointer is not None:
+            self._checkpointer.cancel()
+            await asyncio.gather(self._checkpointer, return_exceptions=True)
+            self._checkpointer = None
+            await self._checkpoint_db.close()
+            self._checkpoint_db = None
+        await self.readers.close()
+        # Sem leitores: o WAL inteiro volta para o banco e o arquivo -wal é zerado
+        # (sem efeito fora do modo WAL)
+        await self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        await self._db.close()
+        self._db = None
+
+    async def checkpoint(self, mode: str = "PASSIVE") -> Tuple[int, int, int]:
+        """
+        Checkpoint do WAL na conexão própria (não segura o writer). Devolve
+        (busy, páginas no WAL, páginas transferidas); PASSIVE nunca espera por
+        leitores nem pelo writer, só copia o que já pode.
+        """
+        async with self._checkpoint_db.execute(f"PRAGMA wal_checkpoint({mode})") as cur:
+            busy, frames, done = await cur.fetchone()
+        return busy, frames, done
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                busy, frames, done = await self.checkpoint()
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Storage: falha no checkpoint do WAL: {}", exc)
+                continue
+            if done < frames:
+                # Leitor ainda num snapshot antigo: o resto vai no próximo checkpoint
+                logger.debug("Storage: checkpoint parcial ({} de {} páginas do WAL)", done, frames)
+
+    # Writer em lote
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        next_maintenance = loop.time()
+        while True:
+            if loop.time() >= next_maintenance:
+                # Um passo por vez (uma partição expirada ou uma série selada); se sobrou
+                # trabalho, o próximo passo vem logo após o próximo lote
+                busy = await self._maintenance_step()
+                next_maintenance = loop.time() + (0 if busy else self.maintenance_interval)
+            try:
+                first = await asyncio.wait_for(queue.get(), max(0.0, next_maintenance - loop.time()))
+            except asyncio.TimeoutError:
+                continue
+            batch = [first]
+            rows = len(batch[0][1])
+            deadline = loop.time() + self.flush_interval
+            # Criação de série tem alguém esperando o id: o lote fecha sem aguardar flush_interval
+            while rows < self.batch_size and batch[-1][0] != SERIES:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                rows += len(item[1])
+
+            try:
+                await self._write_batch(batch)
+            except Exception as exc:  # noqa: BLE001
+                # Nada do lote fica pendente para o próximo commit; um item ruim não leva os outros
+                logger.warning("Storage: falha ao gravar lote de {} linhas ({}); regravando item a item", rows, exc)
+                await self._rollback()
+                for item in batch:
+                    await self._retry_item(item)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _retry_item(self, item: Tuple[str, List[tuple]]):
+        """Grava um item sozinho; se falhar de novo, as linhas contam em lost_rows."""
+        try:
+            await self._write_batch([item])
+        except Exception as exc:  # noqa: BLE001
+            await self._rollback()
+            kind, rows = item
+            if kind == SERIES:
+                for _, fut in rows:
+                    if not fut.done():
+                        fut.set_exception(exc)
+            else:
+                self.lost_rows += len(rows)
+            logger.exception("Storage: {} linhas de {} perdidas: {}", len(rows), kind, exc)
+
+    async def _write_batch(self, batch: List[Tuple[str, List[tuple]]]):
+        # Agrupa por classe preservando a ordem de chegada dentro de cada tabela
+        grouped: Dict[str, List[tuple]] = {}
+        for kind, rows in batch:
+            grouped.setdefault(kind, []).extend(rows)
+        series = grouped.pop(SERIES, [])
+        # Em caso de erro os futures ficam pendentes: o writer ainda regrava o item sozinho
+        ids = await self._create_series([path for path, _ in series]) if series else {}
+        await self._write_rows(grouped)
+        for path, fut in series:
+            if not fut.done():
+                fut.set_result(ids[path])
+
+    async def _create_series(self, paths: List[str]) -> Dict[str, int]:
+        """INSERT das séries novas na transação do lote; devolve caminho -> id."""
+        await self._db.executemany("INSERT OR IGNORE INTO series (path) VALUES (?)", [(p,) for p in paths])
+        wanted = set(paths)
+        async with self._db.execute("SELECT path, id FROM series") as cur:
+            return {path: sid async for path, sid in cur if path in wanted}
+
+    async def _write_rows(self, grouped: Dict[str, List[tuple]]):
+        rollup = grouped.pop(ROLLUP, None)
+        if rollup:
+            grouped[ROLLUP] = _rollup_rows(rollup)
+        last = grouped.pop(LAST, None)
+        if last:
+            await self._db.executemany(UPSERT_LAST_VALUE_SQL, last)
+
+        now_us = self._now_us()
+        for kind, rows in grouped.items():
+            keep = self.retention.get(kind)
+            cutoff = now_us - int(keep * 1_000_000) if keep else None
+            by_table: Dict[str, List[tuple]] = {}
+            table, start, end = None, 0, 0
+            for row in rows:
+                ts_us = _ROW_TS[kind](row)
+                if cutoff is not None and ts_us < cutoff:
+                    self.expired_rows += 1
+                    continue
+                if not start <= ts_us < end:
+                    table, start, end = await self._partition(kind, ts_us)
+                by_table.setdefault(table, []).append(row)
+            for table, part in by_table.items():
+                await self._db.executemany(_SQL[kind].format(table=table), part)
+        await self._db.commit()
+
+    def _now_us(self) -> int:
+        """Relógio da retenção (epoch µs)."""
+        return to_epoch_us(datetime.now(timezone.utc))
+
+    async def _rollback(self):
+        """
+        Desfaz a transação aberta. Partições criadas nela já estavam no catálogo
+        em memória: ele volta a espelhar a tabela `partitions` commitada.
+        """
+        await self._db.rollback()
+        async with self._db.execute(SELECT_PARTITIONS_SQL) as cur:
+            self.partitions.reload(await cur.fetchall())
+
+    async def _partition(self, cls: str, ts_us: int) -> Tuple[str, int, int]:
+        """Partição de `cls` que contém ts_us (criada se preciso, na transação do lote)."""
+        found = self.partitions.locate(cls, ts_us)
+        if found is not None:
+            return found
+        start, end, name = self.partitions.new_range(cls, ts_us)
+        for stmt in partition_ddl(cls, name):
+            await self._db.execute(stmt)
+        await self._db.execute(INSERT_PARTITION_SQL, (cls, start, end, name))
+        self.partitions.add(cls, start, end, name)
+        logger.debug("Storage: partição {} criada", name)
+        return name, start, end
+
+    async def _maintenance_step(self) -> bool:
+        """Expiração antes da selagem (não comprime o que já venceu). True se fez algo."""
+        try:
+            return await self._expire_one() or await self._seal_one()
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Storage: falha na manutenção das partições: {}", exc)
+            await self._rollback()
+            return False
+
+    async def _drop_partition(self, cls: str, name: str):
+        # O DELETE abre a transação; o DROP entra nela (catálogo e tabela somem juntos)
+        await self._db.execute(DELETE_PARTITION_SQL, (name,))
+        await self._db.execute(f'DROP TABLE IF EXISTS "{name}"')
+        await self._db.commit()
+        # Só some do catálogo em memória depois do commit: leituras em curso
+        # que já listaram a partição tratam a tabela inexistente como vazia
+        self.partitions.remove(cls, name)
+
+    async def _expire_one(self) -> bool:
+        """Remove a partição vencida mais antiga (se houver). True se removeu alguma."""
+        now_us = self._now_us()
+        for cls, keep in self.retention.items():
+            cutoff = now_us - int(keep * 1_000_000)
+            expired = self.partitions.expired(cls, cutoff)
+            if expired:
+                await self._drop_partition(cls, expired[0])
+                if cls in (RAW, CHUNKS):
+                    self.recent.trim(cutoff)
+                logger.info("Storage: partição {} expirada (retenção de {:.0f} dias)", expired[0], keep / 86400)
+                return True
+        return False
+
+    async def _seal_one(self) -> bool:
+        """
+        Sela uma série da partição bruta fechada mais antiga: amostras -> blocos
+        em var_chunks (mescladas com os blocos que já cobrem a faixa, _merge_sealed)
+        e DELETE das linhas, na mesma transação. A partição some
+        quando fica vazia. True se fez algo.
+        """
+        if self.seal_after is None:
+            return False
+        for name in self.partitions.expired(RAW, self._now_us() - int(self.seal_after * 1_000_000)):
+            async with self._db.execute(f'SELECT series_id FROM "{name}" WHERE extra IS NULL LIMIT 1') as cur:
+                row = await cur.fetchone()
+            if row is None:
+                async with self._db.execute(f'SELECT 1 FROM "{name}" LIMIT 1') as cur:
+                    if await cur.fetchone() is not None:
+                        continue  # só linhas com extra: ficam como estão
+                await self._drop_partition(RAW, name)
+                logger.info("Storage: partição {} selada", name)
+                return True
+
+            (sid,) = row
+            async with self._db.execute(
+                f'SELECT ts, value FROM "{name}" WHERE series_id = ? AND extra IS NULL ORDER BY ts', (sid,)
+            ) as cur:
+                rows = await cur.fetchall()
+            # µs de epoch cabem exatos em float64 (< 2**53); NULL vira NaN
+            grid = np.array(rows, dtype=np.float64).reshape(-1, 2)
+            ts, values = await self._merge_sealed(sid, grid[:, 0].astype(np.int64), grid[:, 1])
+            i = 0
+            while i < len(ts):
+                # Um bloco nunca atravessa a faixa da sua partição de var_chunks
+                table, _, end = await self._partition(CHUNKS, int(ts[i]))
+                j = min(i + self.chunk_samples, int(np.searchsorted(ts, end)))
+                await self._db.execute(INSERT_CHUNK_SQL.format(table=table), _chunk_row(sid, ts[i:j], values[i:j]))
+                i = j
+            await self._db.execute(f'DELETE FROM "{name}" WHERE series_id = ? AND extra IS NULL', (sid,))
+            await self._db.commit()
+            return True
+        return False
+
+    async def _merge_sealed(self, sid: int, ts: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Amostras atrasadas (ou do backfill) numa faixa já selada: os blocos da série
+        que cruzam [ts[0], ts[-1]] saem e voltam mesclados com elas, então os blocos
+        de uma série nunca se sobrepõem. Em ts repetido fica a amostra nova.
+        """
+        lo, hi = int(ts[0]), int(ts[-1])
+        old_ts, old_values = [], []
+        for table in self.partitions.overlapping(CHUNKS, lo, hi):
+            async with self._db.execute(
+                f'SELECT id, data FROM "{table}" WHERE series_id = ? AND last_ts >= ? AND first_ts <= ?', (sid, lo, hi)
+            ) as cur:
+                found = await cur.fetchall()
+            for _, data in found:
+                t, v = decode(data)
+                old_ts.append(t)
+                old_values.append(v)
+            if found:
+                await self._db.executemany(f'DELETE FROM "{table}" WHERE id = ?', [(cid,) for cid, _ in found])
+        if not old_ts:
+            return ts, values
+        ts = np.concatenate([*old_ts, ts])
+        values = np.concatenate([*old_values, values])
+        # Ordenação estável: em ts repetido a amostra nova (no fim) vem por último e é a que fica
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        keep = np.r_[ts[1:] != ts[:-1], True]
+        return ts[keep], values[keep]
+
+
+_SQL = {RAW: INSERT_VAR_SQL, EVENTS: INSERT_EVENT_SQL, ROLLUP: UPSERT_ROLLUP_SQL}
+
+# Timestamp (µs) que decide a partição de cada linha
+_ROW_TS = {
+    RAW: lambda row: row[1],
+    EVENTS: lambda row: to_epoch_us(row[0]),
+    ROLLUP: lambda row: row[2],
+}
+
+
+def _chunk_row(sid: int, ts: np.ndarray, values: np.ndarray) -> tuple:
+    """Linha de var_chunks: cabeçalho (faixa, mín/máx, primeiro/último) + bloco codificado."""
+    present = values[~np.isnan(values)]
+    vmin, vmax = (float(present.min()), float(present.max())) if len(present) else (None, None)
+    first, last = (None if np.isnan(v) else float(v) for v in (values[0], values[-1]))
+    return (sid, int(ts[0]), int(ts[-1]), len(ts), vmin, vmax, first, last, encode(ts, values))
+
+
+def _rollup_rows(samples: List[tuple]) -> List[tuple]:
+    """Agrega (series_id, ts µs, valor) por (resolução, série, intervalo) para o upsert."""
+    acc: Dict[Tuple[int, int, int], List[float]] = {}
+    for sid, ts_us, value in samples:
+        if value is None:
+            continue
+        for res, res_us in _ROLLUP_US:
+            key = (res, sid, ts_us - ts_us % res_us)
+            a = acc.get(key)
+            if a is None:
+                acc[key] = [1, value, value, value]
+            else:
+                a[0] += 1
+                a[1] += value
+                if value < a[2]:
+                    a[2] = value
+                elif value > a[3]:
+                    a[3] = value
+    return [(*key, *a) for key, a in acc.items()]
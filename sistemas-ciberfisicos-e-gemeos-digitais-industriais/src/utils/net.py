@@ -1,12 +1,64 @@
 # src/utils/net.py
 from __future__ import annotations
 
+import glob
 import os
 import signal
-import subprocess
+import socket
 import time
 from typing import Optional
 
+# Estado TCP_LISTEN em /proc/net/tcp(6)
+_TCP_LISTEN = "0A"
+
+
+def port_in_use(port: int, host: str = "") -> bool:
+    """True se algum socket já escuta em 'port' (tentativa de bind no próprio processo, sem subprocessos)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # SO_REUSEADDR: conexões em TIME_WAIT de um servidor já encerrado não contam como porta ocupada
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind((host, port))
+        except OSError:
+            return True
+    return False
+
+
+def _listening_inodes(port: int) -> set[str]:
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f, None)  # cabeçalho
+                for line in f:
+                    fields = line.split()
+                    # local_address = IP:PORTA em hexadecimal; fields[9] = inode do socket
+                    if fields[3] == _TCP_LISTEN and int(fields[1].rpartition(":")[2], 16) == port:
+                        inodes.add(fields[9])
+        except OSError:
+            continue
+    return inodes
+
+
+def _pids_listening(port: int) -> list[int]:
+    """PIDs com socket em LISTEN na porta, pelo /proc (Linux); processos sem permissão de leitura ficam de fora."""
+    targets = {f"socket:[{inode}]" for inode in _listening_inodes(port)}
+    if not targets:
+        return []
+    pids = []
+    for fd_dir in glob.glob("/proc/[0-9]*/fd"):
+        try:
+            if any(os.readlink(os.path.join(fd_dir, fd)) in targets for fd in os.listdir(fd_dir)):
+                pids.append(int(fd_dir.split("/")[2]))
+        except OSError:
+            continue
+    return pids
+
+
+def _cmdline(pid: int) -> str:
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+
 
 def free_port(port: int, name_hint: Optional[str] = None, timeout: float = 3.0) -> bool:
     """
@@ -14,34 +66,21 @@ def free_port(port: int, name_hint: Optional[str] = None, timeout: float = 3.0)
     - Se name_hint for passado (ex.: "src.server"), só mata PIDs cujo comando contém esse texto.
     - Tenta SIGTERM, espera, e se ainda estiver ocupada, SIGKILL.
     Retorna True se a porta ficou livre (ou já estava), False se não foi possível.
+    Tudo no próprio processo: bind de teste e /proc, sem lsof/ps.
     """
-    def _pids_listening(p: int) -> list[int]:
-        # -t : apenas PIDs; -iTCP:PORT; -sTCP:LISTEN
-        proc = subprocess.run(
-            ["bash", "-lc", f"lsof -tiTCP:{p} -sTCP:LISTEN"],
-            capture_output=True, text=True, check=False,
-        )
-        out = proc.stdout.strip()
-        return [int(x) for x in out.split()] if out else []
-
-    def _cmdline(pid: int) -> str:
-        proc = subprocess.run(["ps", "-p", str(pid), "-o", "args="],
-                              capture_output=True, text=True, check=False)
-        return (proc.stdout or "").strip()
+    if not port_in_use(port):
+        return True
 
     pids = _pids_listening(port)
-    if not pids:
-        return True
 
     # filtra por name_hint, se fornecido
     if name_hint:
         filtered = []
         for pid in pids:
             try:
-                cmd = _cmdline(pid)
-                if name_hint in cmd:
+                if name_hint in _cmdline(pid):
                     filtered.append(pid)
-            except Exception:
+            except OSError:
                 pass
         pids = filtered
 
@@ -53,34 +92,28 @@ def free_port(port: int, name_hint: Optional[str] = None, timeout: float = 3.0)
         # Nada elegível para matar (outra app na porta); não force
         return False
 
-    # SIGTERM
-    for pid in pids:
-        try:
-            os.kill(pid, signal.SIGTERM)
-        except ProcessLookupError:
-            pass
-        except PermissionError:
-            # sem permissão para esse PID
-            pass
-
-    # espera liberar
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        if not _pids_listening(port):
-            return True
-        time.sleep(0.1)
+    def _signal_all(sig: int):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def _wait_free(seconds: float) -> bool:
+        deadline = time.monotonic() + seconds
+        while port_in_use(port):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    _signal_all(signal.SIGTERM)
+    if _wait_free(timeout):
+        return True
 
     # SIGKILL como último recurso
-    for pid in pids:
-        try:
-            os.kill(pid, signal.SIGKILL)
-        except ProcessLookupError:
-            pass
-        except PermissionError:
-            pass
-
-    # checa de novo
-    return not _pids_listening(port)
+    _signal_all(signal.SIGKILL)
+    return _wait_free(1.0)
 
 
 def split_endpoint(ep: str) -> tuple[str, int, str]:
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from src.alarms import ACKED, ACKNOWLEDGED, ACTIVE, CLEARED, INACTIVE, RAISED, RETURNED, VECTOR_MIN_RULES, AlarmEngine
+from src.model import ALARM_RULES, SEVERITY, VARIABLES
+from src.registry import VarEntry
+
+HYSTERESIS = 0.02
+ON_DELAY = 2.0
+OFF_DELAY = 3.0
+
+
+class _Registry:
+    """Só o que AlarmEngine.add_asset usa de VariableRegistry (sem nós OPC UA)."""
+
+    def __init__(self, asset: str):
+        self.groups = {}
+        for group, name, field, key, low, high in VARIABLES:
+            e = VarEntry(name, group, f"{asset}.{group}.{name}", field, key, SimpleNamespace(nodeid=None), 0, low, high)
+            self.groups.setdefault(group, []).append(e)
+        self.groups = {g: tuple(es) for g, es in self.groups.items()}
+
+
+class _Reference:
+    """Uma condição avaliada sozinha: histerese, atrasos on/off e reconhecimento (máquina de estados escalar)."""
+
+    def __init__(self, pos: int, side: str, limit: float):
+        self.pos, self.side, self.limit, self.hysteresis = pos, side, limit, abs(limit) * HYSTERESIS
+        self.state = INACTIVE
+        self._violating_since: Optional[float] = None
+        self._normal_since: Optional[float] = None
+
+    def update(self, value: float, ts: float) -> Optional[str]:
+        if self.side == "high":
+            violating, normal = value > self.limit, value < self.limit - self.hysteresis
+        else:
+            violating, normal = value < self.limit, value > self.limit + self.hysteresis
+
+        if self.state not in (ACTIVE, ACKNOWLEDGED):
+            if not violating:
+                self._violating_since = None
+                return None
+            if self._violating_since is None:
+                self._violating_since = ts
+            if ts - self._violating_since < ON_DELAY:
+                return None
+            self.state, self._violating_since, self._normal_since = ACTIVE, None, None
+            return RAISED
+
+        if not normal:
+            self._normal_since = None
+            return None
+        if self._normal_since is None:
+            self._normal_since = ts
+        if ts - self._normal_since < OFF_DELAY:
+            return None
+        self.state = INACTIVE if self.state == ACKNOWLEDGED else CLEARED
+        self._normal_since = None
+        return RETURNED
+
+    def acknowledge(self) -> Optional[str]:
+        if self.state == ACTIVE:
+            self.state = ACKNOWLEDGED
+        elif self.state == CLEARED:
+            self.state = INACTIVE
+        else:
+            return None
+        return ACKED
+
+
+def _build(n_assets: int):
+    engine = AlarmEngine()
+    reference = {}
+    for i in range(n_assets):
+        asset = f"Motor{i:03d}"
+        registry = _Registry(asset)
+        engine.add_asset(asset, registry, ALARM_RULES, SEVERITY, HYSTERESIS, ON_DELAY, OFF_DELAY)
+        for group, entries in registry.groups.items():
+            names = [e.name for e in entries]
+            conds = []
+            for var, side, *_ in ALARM_RULES:
+                if var in names:
+                    pos = names.index(var)
+                    limit = entries[pos].high if side == "high" else entries[pos].low
+                    conds.append((f"{var}.{side.capitalize()}", _Reference(pos, side, limit)))
+            reference[(asset, group)] = conds
+    engine.compile()
+    return engine, reference
+
+
+def _value(rnd: random.Random, low: Optional[float], high: Optional[float]) -> float:
+    # Em torno de um dos limites: acima, abaixo e dentro da banda de histerese
+    center = rnd.choice([x for x in (low, high) if x is not None] or [1.0])
+    return center * (1 + rnd.uniform(-0.04, 0.04))
+
+
+@pytest.mark.parametrize("n_assets", [1, 40])
+def test_vectorized_matches_per_condition_reference(n_assets):
+    rnd = random.Random(n_assets)
+    engine, reference = _build(n_assets)
+    assets = [f"Motor{i:03d}" for i in range(n_assets)]
+    groups = {}
+    for group, name, _field, _key, low, high in VARIABLES:
+        groups.setdefault(group, []).append((low, high))
+    if n_assets > 1:
+        assert len(engine.conditions) >= VECTOR_MIN_RULES  # o lote inteiro passa pelo caminho NumPy
+
+    ts = 0.0
+    for cycle in range(300):
+        ts += rnd.choice([0.5, 1.0, 1.0, 2.5])
+        batch, expected = [], []
+        for asset in assets:
+            for group, limits in groups.items():
+                values = [_value(rnd, low, high) for low, high in limits]
+                batch.append((engine.block_id(asset, group), values, ts))
+                for name, cond in reference[(asset, group)]:
+                    t = cond.update(values[cond.pos], ts)
+                    if t is not None:
+                        expected.append((asset, name, t))
+        got = [(c.asset, c.name, t) for c, t in engine.evaluate(batch)]
+        assert got == expected, f"ciclo {cycle}"
+
+        if cycle % 7 == 3:
+            asset = rnd.choice(assets)
+            acked = [(c.asset, c.name, t) for c, t in engine.acknowledge(asset)]
+            expected = [
+                (asset, name, t)
+                for group in groups
+                for name, cond in reference[(asset, group)]
+                if (t := cond.acknowledge()) is not None
+            ]
+            assert sorted(acked) == sorted(expected), f"ciclo {cycle}"
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from src.chunks import decode, encode
+
+T0 = 1_700_000_000_000_000  # epoch µs
+
+
+def roundtrip(ts, values):
+    out_ts, out_values = decode(encode(np.asarray(ts, dtype=np.int64), np.asarray(values, dtype=np.float64)))
+    assert out_ts.dtype == np.int64 and out_values.dtype == np.float64
+    np.testing.assert_array_equal(out_ts, ts)
+    # assert_array_equal trata NaN na mesma posição como igual; compara também os bits
+    np.testing.assert_array_equal(out_values.view(np.uint64), np.asarray(values, dtype=np.float64).view(np.uint64))
+
+
+def test_single_sample():
+    roundtrip([T0], [3.25])
+
+
+def test_two_samples():
+    roundtrip([T0, T0 + 1_000_000], [1.0, -1.0])
+
+
+def test_regular_sampling():
+    ts = T0 + np.arange(1024, dtype=np.int64) * 1_000_000
+    roundtrip(ts, np.sin(np.arange(1024) / 10.0))
+
+
+def test_nan_values():
+    values = [np.nan, 1.5, np.nan, np.nan, 2.0, np.nan]
+    roundtrip(T0 + np.arange(6, dtype=np.int64) * 500_000, values)
+
+
+def test_all_nan():
+    roundtrip(T0 + np.arange(4, dtype=np.int64), [np.nan] * 4)
+
+
+def test_equal_timestamps():
+    # Delta zero (e delta-of-delta negativo na volta ao passo normal)
+    roundtrip([T0, T0, T0, T0 + 10, T0 + 20, T0 + 20], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+
+@pytest.mark.parametrize("step", [1, 255, 70_000, 2**40])
+def test_irregular_deltas(step):
+    # Cada largura do delta-of-delta (1, 2, 4 e 8 bytes)
+    rng = np.random.default_rng(step)
+    ts = T0 + np.cumsum(rng.integers(1, step + 2, size=50))
+    roundtrip(ts, rng.normal(size=50))
+
+
+def test_repeated_and_extreme_values():
+    values = [0.0, 0.0, -0.0, np.inf, -np.inf, 5e-324, 1.7976931348623157e308, 0.0]
+    roundtrip(T0 + np.arange(len(values), dtype=np.int64), values)
+
+
+def test_empty_block_rejected():
+    with pytest.raises(ValueError):
+        encode(np.array([], dtype=np.int64), np.array([], dtype=np.float64))
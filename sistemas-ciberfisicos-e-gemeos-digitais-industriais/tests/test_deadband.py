@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+import pytest
+
+from src.deadband import DeadbandFilter
+
+
+def _archive_all(f: DeadbandFilter, points):
+    out = []
+    for t, v in points:
+        out += f.archive(v, t)
+    return out + f.pending()
+
+
+# report(): escrita no nó
+
+def test_report_first_sample_always_written():
+    assert DeadbandFilter(abs_deadband=10.0).report(1.0, 0.0)
+
+
+def test_report_boundary_is_inside_deadband():
+    f = DeadbandFilter(abs_deadband=1.0)
+    assert f.report(10.0, 0.0)
+    assert not f.report(11.0, 1.0)   # |Δ| == deadband: não escreve
+    assert not f.report(9.0, 2.0)
+    assert f.report(11.25, 3.0)      # passou do deadband do último escrito (10.0)
+    assert not f.report(10.25, 4.0)  # referência agora é 11.25
+
+
+def test_report_pct_deadband_uses_last_written_value():
+    f = DeadbandFilter(abs_deadband=0.5, pct_deadband=10.0)
+    assert f.report(100.0, 0.0)
+    assert not f.report(110.0, 1.0)  # 10% de 100
+    assert f.report(110.5, 2.0)
+    f = DeadbandFilter(abs_deadband=0.5, pct_deadband=10.0)
+    assert f.report(1.0, 0.0)
+    assert not f.report(1.5, 1.0)    # perto de zero vale o absoluto
+    assert f.report(1.75, 2.0)
+
+
+def test_report_never_goes_back_in_time():
+    f = DeadbandFilter(abs_deadband=1.0)
+    assert f.report(0.0, 10.0)
+    assert not f.report(50.0, 9.0)
+    assert not f.report(0.5, 10.0)   # mesmo ts, dentro do deadband
+    assert f.report(50.0, 10.0)      # mesmo ts, fora do deadband
+
+
+def test_report_max_interval_forces_write_at_exact_age():
+    f = DeadbandFilter(abs_deadband=1.0, max_interval=5.0)
+    assert f.report(0.0, 0.0)
+    assert not f.report(0.0, 4.999)
+    assert f.report(0.0, 5.0)
+    assert not f.report(0.0, 9.0)
+
+
+def test_restore_writes_next_newer_sample():
+    f = DeadbandFilter(abs_deadband=100.0)
+    f.restore(10.0)
+    assert not f.report(1.0, 9.0)
+    assert f.report(1.0, 11.0)
+    assert not f.report(2.0, 12.0)
+
+
+# archive(): swinging door
+
+def test_archive_constant_signal_keeps_first_and_last():
+    f = DeadbandFilter(abs_deadband=0.1)
+    assert _archive_all(f, [(t, 5.0) for t in range(100)]) == [(0, 5.0), (99, 5.0)]
+
+
+def test_archive_linear_ramp_keeps_first_and_last():
+    f = DeadbandFilter(abs_deadband=0.01)
+    assert _archive_all(f, [(float(t), 2.0 * t) for t in range(50)]) == [(0.0, 0.0), (49.0, 98.0)]
+
+
+def test_archive_door_boundary_is_inclusive():
+    # Reta (0,0) -> (2,2) passa a exatamente um deadband de (1,0): a porta continua aberta
+    f = DeadbandFilter(abs_deadband=1.0)
+    assert _archive_all(f, [(0.0, 0.0), (1.0, 0.0), (2.0, 2.0)]) == [(0.0, 0.0), (2.0, 2.0)]
+    # Um pouco além: a porta fecha e o ponto retido (1,0) é arquivado
+    f = DeadbandFilter(abs_deadband=1.0)
+    assert _archive_all(f, [(0.0, 0.0), (1.0, 0.0), (2.0, 2.0625)]) == [(0.0, 0.0), (1.0, 0.0), (2.0, 2.0625)]
+
+
+def test_archive_out_of_order_passes_through():
+    f = DeadbandFilter(abs_deadband=1.0)
+    assert f.archive(0.0, 10.0) == [(10.0, 0.0)]
+    assert f.archive(0.5, 11.0) == []
+    assert f.archive(7.0, 5.0) == [(5.0, 7.0)]
+    assert f.archive(7.0, 11.0) == [(11.0, 7.0)]  # repetido: grava como veio
+    assert f.pending() == [(11.0, 0.5)]
+
+
+def test_archive_max_interval_forces_point():
+    f = DeadbandFilter(abs_deadband=1.0, max_interval=10.0)
+    out = _archive_all(f, [(float(t), 0.0) for t in range(0, 25)])
+    assert out == [(0.0, 0.0), (10.0, 0.0), (20.0, 0.0), (24.0, 0.0)]
+
+
+def test_pending_is_empty_right_after_a_pivot():
+    f = DeadbandFilter(abs_deadband=1.0)
+    assert f.pending() == []
+    f.archive(1.0, 0.0)
+    assert f.pending() == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_archive_error_bounded_by_deadband(seed):
+    rnd = random.Random(seed)
+    e = 0.5
+    ts = np.cumsum([rnd.uniform(0.1, 2.0) for _ in range(2000)])
+    vs = np.cumsum([rnd.gauss(0.0, 0.3) for _ in range(2000)])
+    f = DeadbandFilter(abs_deadband=e)
+    kept = _archive_all(f, zip(ts.tolist(), vs.tolist()))
+    assert len(kept) < len(ts) / 2
+    kt, kv = np.array(kept).T
+    assert np.all(np.diff(kt) > 0)
+    assert kt[0] == ts[0] and kt[-1] == ts[-1]
+    assert np.max(np.abs(np.interp(ts, kt, kv) - vs)) <= e + 1e-9
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from src.migrations import SCHEMA_VERSION, asyncua_tables, migrate, needs_migration, to_epoch_us
+from src.partitions import EVENTS, RAW, ROLLUP, load_catalog
+
+VOLTAGE_A = "Motor50CV.Electrical.VoltageA"  # tabela "2_3" do asyncua
+VOLTAGE_B = "Motor50CV.Electrical.VoltageB"
+
+# Schema v1 (legado), como gravado pelas primeiras versões do servidor
+V1_SQL = """
+CREATE TABLE var_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    path TEXT NOT NULL,
+    value REAL,
+    extra TEXT
+);
+CREATE TABLE event_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    source TEXT NOT NULL,
+    message TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    category TEXT
+);
+"""
+ASYNCUA_SQL = """
+CREATE TABLE "{name}" (_Id INTEGER PRIMARY KEY NOT NULL, ServerTimestamp TIMESTAMP, SourceTimestamp TIMESTAMP,
+                       StatusCode INTEGER, Value TEXT, VariantType TEXT, VariantBinary BLOB)
+"""
+SERVER_NODE = "NodeId(Identifier=85, NamespaceIndex=0, NodeIdType=<NodeIdType.TwoByte: 0>)"
+MOTOR_NODE = "NodeId(Identifier=1, NamespaceIndex=2, NodeIdType=<NodeIdType.Numeric: 2>)"
+
+VARS = [
+    ("2025-08-13T14:55:00.500000+00:00", VOLTAGE_A, 380.0, "{}"),
+    ("2025-08-13T14:55:00.500000+00:00", VOLTAGE_B, 381.0, "{}"),
+    ("2025-08-13T14:55:30.500000+00:00", VOLTAGE_A, 390.0, '{"q": 1}'),
+    ("2025-08-13T14:56:10", VOLTAGE_A, None, None),  # sem fuso => UTC
+    ("not a timestamp", VOLTAGE_A, 1.0, "{}"),  # ilegível: descartada
+    ("2025-08-14T00:00:05+00:00", VOLTAGE_B, 382.0, "{}"),  # outro dia => outra partição
+]
+# Histórico do asyncua de VoltageA: só o que fica fora da faixa de var_history (± 1 s) é importado
+ASYNCUA_ROWS = [
+    ("2025-08-13 14:50:00+00:00", "370.0", "Double"),
+    ("2025-08-13 14:55:00.600000+00:00", "380.0", "Double"),  # mesma leitura de var_history
+    ("2025-08-13 14:55:59+00:00", "999.0", "Double"),  # dentro da faixa coberta
+    ("2025-08-13 14:57:00+00:00", "True", "Boolean"),
+    ("2025-08-13 14:58:00+00:00", "abc", "String"),  # não numérica
+]
+
+
+@pytest.fixture
+def v1_db(tmp_path):
+    path = str(tmp_path / "v1.sqlite")
+    conn = sqlite3.connect(path)
+    conn.executescript(V1_SQL)
+    conn.executemany("INSERT INTO var_history (ts, path, value, extra) VALUES (?, ?, ?, ?)", VARS)
+    conn.executemany(
+        "INSERT INTO event_history (ts, source, message, severity, category) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-08-13T14:54:59.376337+00:00", SERVER_NODE, "heartbeat", 100, "status"),
+            ("2025-08-13T14:55:31+00:00", MOTOR_NODE, "Overvoltage detected", 700, "alarm"),
+        ],
+    )
+    for name in ("2_3", "2_999"):
+        conn.execute(ASYNCUA_SQL.format(name=name))
+    conn.executemany(
+        'INSERT INTO "2_3" (ServerTimestamp, SourceTimestamp, StatusCode, Value, VariantType) VALUES (?, ?, 0, ?, ?)',
+        [(ts, ts, value, vtype) for ts, value, vtype in ASYNCUA_ROWS],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _partitioned(conn: sqlite3.Connection, cls: str, cols: str, order: str):
+    catalog = load_catalog(conn)
+    rows = []
+    for table in catalog.tables(cls):
+        rows += conn.execute(f'SELECT {cols} FROM "{table}" ORDER BY {order}').fetchall()
+    return catalog.tables(cls), rows
+
+
+def test_migrate_v1_to_current(v1_db):
+    # 5 amostras legíveis de var_history + 2 do asyncua (370.0 e o Boolean)
+    assert migrate(v1_db, chunk_size=2, vacuum=False) == 7
+
+    conn = sqlite3.connect(v1_db)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert not needs_migration(conn)
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert not tables & {"var_history", "var_history_v1", "var_rollup", "event_history"}
+        # Sem caminho conhecido: fica até drop_legacy
+        assert asyncua_tables(conn) == ["2_999"]
+
+        series = dict(conn.execute("SELECT path, id FROM series"))
+        a, b = series[VOLTAGE_A], series[VOLTAGE_B]
+        raw_tables, raw = _partitioned(conn, RAW, "series_id, ts, value, extra", "series_id, ts")
+        assert len(raw_tables) == 2
+        assert raw == sorted([
+            (a, to_epoch_us("2025-08-13T14:50:00+00:00"), 370.0, None),
+            (a, to_epoch_us("2025-08-13T14:55:00.5+00:00"), 380.0, None),
+            (a, to_epoch_us("2025-08-13T14:55:30.5+00:00"), 390.0, '{"q": 1}'),
+            (a, to_epoch_us("2025-08-13T14:56:10+00:00"), None, None),
+            (a, to_epoch_us("2025-08-13T14:57:00+00:00"), 1.0, None),
+            (b, to_epoch_us("2025-08-13T14:55:00.5+00:00"), 381.0, None),
+            (b, to_epoch_us("2025-08-14T00:00:05+00:00"), 382.0, None),
+        ])
+
+        # Agregados de 1 min recalculados de var_history (NULL não conta)
+        _, rollup = _partitioned(conn, ROLLUP, "series_id, bucket, samples, total, vmin, vmax",
+                                 "series_id, bucket")
+        minute = [row for row in rollup if row[0] == a and row[1] == to_epoch_us("2025-08-13T14:55:00+00:00")]
+        assert minute == [(a, to_epoch_us("2025-08-13T14:55:00+00:00"), 2, 770.0, 380.0, 390.0)]
+
+        _, events = _partitioned(conn, EVENTS, "source, message", "id")
+        assert events == [("i=85", "heartbeat"), ("ns=2;i=1", "Overvoltage detected")]
+    finally:
+        conn.close()
+
+    # Já no schema atual: nada a fazer; drop_legacy remove o que sobrou do asyncua
+    assert migrate(v1_db, vacuum=False) == 0
+    migrate(v1_db, vacuum=False, drop_legacy=True)
+    conn = sqlite3.connect(v1_db)
+    try:
+        assert asyncua_tables(conn) == []
+    finally:
+        conn.close()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+
+from src.history_sqlite import HistorySQLite
+from src.partitions import CHUNKS
+from src.storage import Storage
+
+T0 = 1_700_000_000_000_000  # epoch µs, bem antes do seal_after
+
+
+@pytest.mark.asyncio
+async def test_late_samples_merge_into_sealed_chunks(tmp_path):
+    storage = Storage(str(tmp_path / "h.sqlite"), seal_after=0, maintenance_interval=3600, chunk_samples=8)
+    await storage.init()
+    try:
+        sid = await storage.series_id("Motor.Electrical.VoltageA")
+        await storage.add_bulk([(sid, T0 + i * 10, float(i)) for i in range(0, 40, 2)])
+        await storage.flush()
+        while await storage._maintenance_step():
+            pass
+        # Atrasadas dentro da faixa selada; 4 repete um ts já selado com outro valor
+        late = {1: -1.0, 3: -3.0, 4: -4.0, 21: -21.0, 39: -39.0}
+        await storage.add_bulk([(sid, T0 + i * 10, v) for i, v in late.items()])
+        await storage.flush()
+        expected = {i: float(i) for i in range(0, 40, 2)} | late
+
+        history = HistorySQLite(storage)
+        for sealed in (False, True):
+            async with storage.readers.snapshot() as db:
+                points = await history._points(db, sid, T0, T0 + 1000)
+                newest = await history._points(db, sid, T0, T0 + 1000, descending=True, limit=3)
+            assert points == [(T0 + i * 10, v) for i, v in sorted(expected.items())], sealed
+            assert [ts for ts, _ in newest] == [T0 + 390, T0 + 380, T0 + 360]
+            while await storage._maintenance_step():
+                pass
+
+        async with storage.readers.snapshot() as db:
+            ranges = []
+            for table in storage.partitions.tables(CHUNKS):
+                async with db.execute(f'SELECT first_ts, last_ts FROM "{table}" ORDER BY first_ts') as cur:
+                    ranges += await cur.fetchall()
+        assert all(prev[1] < nxt[0] for prev, nxt in zip(ranges, ranges[1:]))
+    finally:
+        await storage.close()